@@ -1,11 +1,26 @@
-import subprocess
 import sys
 import os
 import json
 import shutil
 import csv
+import re
+import math
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
 from get_keyword_qms_joins import create_keyword_qms_unit_joins
+from csv_utils import postprocess_csv, count_csv_rows
+from export_cache import write_sidecar
+from run_manifest import RunManifest, load_manifest
+from runtime_model import RuntimeModel, BatchProgress, print_prediction, format_duration
+from run_ledger import RunLedger, LEDGER_FILE, connect as connect_ledger, export_csv_logs
+from vault_loader_process import run_loader_process, create_work_dir, DEFAULT_FAILURE_MARKERS, DEFAULT_BUFFER_LINES, DEFAULT_WORK_ROOT
+from vault_loader_worker import LoaderWorkerPool, EXECUTION_MODES, worker_java_supported
+from jvm_options import build_jvm_options, get_xmx_mb, add_gc_log, read_gc_log_heap_mb
+from job_history import JobHistory
+from memory_admission import MemoryAdmission, expected_job_memory_mb, auto_parallel_limit, DEFAULT_JOB_MEMORY_MB, \
+    DEFAULT_MEMORY_RESERVE_MB, DEFAULT_PARALLEL_CEILING
 
 class VaultLoaderRunner:
     def __init__(self, config_file=None):
@@ -22,14 +37,34 @@ class VaultLoaderRunner:
         self.config_file = os.path.join(self.script_dir, config_file)
         self.config = {}
         self.run_timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        # Warm VaultDataLoader JVMs (general.execution_mode = worker), created on first use
+        self.worker_pool = None
+        self.pool_lock = threading.Lock()
+        # Peak memory and CPU of earlier runs per job, used to size -Xmx and pick the GC
+        self.job_history = JobHistory(os.path.join(self.script_dir, 'logs', 'export_job_history.json'))
+        self.watermark_lock = threading.Lock()
+        # Exports expanded into key-range partitions in this run (see expand_partitioned_exports)
+        self.partitioned_exports = []
         self.load_config()
         self.setup_log_directories()
+        # Starts VaultDataLoader processes only while the host has memory for them (general.memory_admission)
+        self.memory_admission = None
+        if self.config.get('general', {}).get('memory_admission', True):
+            self.memory_admission = MemoryAdmission(self.config['general'].get('memory_reserve_mb', DEFAULT_MEMORY_RESERVE_MB))
+        # Per-run manifest: final path, rows, size, checksum and timings of every export
+        self.manifest = RunManifest(
+            os.path.join(self.script_dir, 'logs', 'manifest', f'export_manifest_{self.run_timestamp}.json'),
+            'export',
+            self.run_timestamp,
+            config_file=config_file
+        )
+        # Run ledger (logs/run_ledger.db): jobs, loader attempts and timings of all runs (run opened in start_ledger)
+        self.ledger = RunLedger(os.path.join(self.script_dir, LEDGER_FILE))
         
     def setup_log_directories(self):
         """Create log directories if they don't exist"""
         logs_dir = os.path.join(self.script_dir, 'logs')
-        os.makedirs(os.path.join(logs_dir, 'success'), exist_ok=True)
-        os.makedirs(os.path.join(logs_dir, 'failure'), exist_ok=True)
+        os.makedirs(os.path.join(logs_dir, 'manifest'), exist_ok=True)
     
     def select_config_file(self):
         """Let user select a JSON configuration file from the config directory"""
@@ -103,9 +138,7 @@ class VaultLoaderRunner:
             return password_param
     
     def log_skipped(self, export_config):
-        """Log skipped export to success log"""
-        success_log = os.path.join(self.script_dir, 'logs', 'success', f'success_{self.run_timestamp}.csv')
-        
+        """Record a skipped export in the run ledger and the run manifest"""
         # Extract object name from params
         params = export_config['params'].split()
         object_name = ""
@@ -113,23 +146,17 @@ class VaultLoaderRunner:
             export_index = params.index('-export')
             if export_index + 1 < len(params):
                 object_name = params[export_index + 1]
-        
-        # Create directory if it doesn't exist
-        os.makedirs(os.path.dirname(success_log), exist_ok=True)
-        
-        # Check if file exists to determine if we need to write headers
-        file_exists = os.path.exists(success_log)
-        
-        with open(success_log, 'a', newline='', encoding='utf-8') as f:
-            writer = csv.writer(f)
-            if not file_exists:
-                writer.writerow(['file_name', 'object_name', 'row_count', 'timestamp'])
-            
-            timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-            writer.writerow(['SKIPPED', object_name, 'N/A', timestamp])
+
+        self.ledger.record_job(export_config['name'], 'skipped', object_name=object_name)
+        self.manifest.add_entry(name=export_config['name'], object_name=object_name, status='skipped')
     
-    def run_java_command(self, export_config, export_settings=None):
-        """Execute the Java VaultLoader with given parameters and export_settings"""
+    def run_java_command(self, export_config, export_settings=None, work_dir=None):
+        """
+        Execute the Java VaultLoader with given parameters and export_settings.
+
+        With work_dir (a scratch directory owned by the caller) the exported file
+        stays there and the job is not recorded as an export (used for key samples).
+        """
         # Check if export is active
         active = export_config.get('active', 1)  # Default to 1 (active) if not specified
         if active == 0:
@@ -154,12 +181,23 @@ class VaultLoaderRunner:
         password = self.load_password(password_param)
 
         # Build export destination folder: exports/<dns-folder>
-        dns_folder = dns.replace('https://', '').replace('/', '_')
-        downloadpath = os.path.join(self.script_dir, 'exports', dns_folder)
+        downloadpath = self.get_downloadpath(export_settings)
         os.makedirs(downloadpath, exist_ok=True)
 
+        # Delta mode: export only records changed since the stored watermark
+        snapshot_config = export_config
+        delta_watermark = self.get_delta_watermark(export_config, downloadpath)
+        if delta_watermark:
+            export_config = self.build_delta_export_config(export_config, delta_watermark)
+
+        # Vault Loader runs in its own scratch directory, so concurrent jobs cannot clobber each other's files
+        record_export = work_dir is None
+        work_dir = work_dir or create_work_dir(self.get_work_root(), export_config['name'], self.script_dir)
+
         # Build Java command with dns, username and password parameters
-        java_command = [java_exe, '-jar', vault_loader]
+        # JVM options: general.jvm_options, per-job jvm_options and the CDS archive if one was built
+        jvm_options = build_jvm_options(general, export_config, vault_loader, self.get_job_history(export_config['name']))
+        java_command = [java_exe] + jvm_options + ['-jar', vault_loader]
 
         # Add DNS parameter if present
         if dns:
@@ -177,9 +215,8 @@ class VaultLoaderRunner:
         if where_clause:
             java_command.extend(['-where', where_clause])
 
-        # Add downloadpath parameter if present
-        if downloadpath:
-            java_command.extend(['-downloadpath', downloadpath])
+        # The export is written to the scratch directory and moved to downloadpath afterwards
+        java_command.extend(['-downloadpath', work_dir])
 
         # Add optional columns parameter if present
         columns = export_config.get('columns', [])
@@ -191,121 +228,86 @@ class VaultLoaderRunner:
         display_params = params.copy()
         if where_clause:
             display_params.extend(['-where', where_clause])
-        if downloadpath:
-            display_params.extend(['-downloadpath', downloadpath])
+        display_params.extend(['-downloadpath', work_dir])
         if columns:
             display_params.extend(['-columns', ','.join(columns)])
 
         dns_display = f"-dns {dns} " if dns else ""
-        command_display = f"{java_exe} -jar {vault_loader} {dns_display}-u {username} -p [HIDDEN] {' '.join(display_params)}"
+        jvm_display = ' '.join(jvm_options) + ' ' if jvm_options else ''
+        command_display = f"{java_exe} {jvm_display}-jar {vault_loader} {dns_display}-u {username} -p [HIDDEN] {' '.join(display_params)}"
         print(f"Command: {command_display}")
         
-        # Start process
+        # Start process; output is streamed and checked for failure markers while it runs
+        timeout_val = general.get('export_time_out', 6000)  # 100 minute default timeout
+        timing = {'start_time': datetime.now().strftime("%Y-%m-%d %H:%M:%S"), 'jvm_seconds': None}
+        jvm_start = time.monotonic()
         try:
-            process = subprocess.Popen(
-                java_command,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                text=True,
-                cwd=self.script_dir
-            )
-            
-            # Get output
-            stdout, stderr = process.communicate(timeout=6000)  # 100 minute timeout
-            
-            print("Output:")
-            print(stdout)
-            if stderr:
-                print("Errors:")
-                print(stderr)
-            
-            return_code = process.returncode
+            result = self.run_loader(java_command, work_dir, timeout_val, export_config['name'], own_process=bool(export_config.get('jvm_options')))
+            timing['jvm_seconds'] = round(time.monotonic() - jvm_start, 3)
+
+            if result.timed_out:
+                print(f"Process timed out after {timeout_val} seconds")
+                if record_export:
+                    self.log_failure(snapshot_config, f"Process timed out after {timeout_val} seconds", timing)
+                    print(f"ℹ️ Working directory kept for inspection: {work_dir}")
+                return False
+
+            return_code = result.return_code
             print(f"Process completed with return code: {return_code}")
             
             # Determine success by return code and explicit failure markers.
             # Vault Loader may write informational content to stdout in successful runs.
-            combined_output = f"{stdout}\n{stderr}".lower()
-            failure_markers = [
-                "failure:",
-                "error making request",
-                "exception",
-                "unknown relationship",
-            ]
-            has_failure_marker = any(marker in combined_output for marker in failure_markers)
-            is_success = return_code == 0 and not has_failure_marker
+            is_success = return_code == 0 and result.failure_marker is None
+            if not record_export:
+                if not is_success:
+                    print(f"❌ {export_config['name']} failed: {(result.stderr or result.stdout or 'Unknown error').strip()}")
+                return is_success
 
             # If export was successful, move the CSV file to downloadpath
             if is_success and downloadpath:
-                row_count = self.move_exported_file(export_config, downloadpath)
-                self.log_success(export_config, row_count)
+                file_stats = self.move_exported_file(export_config, downloadpath, work_dir)
+                row_count = file_stats.row_count if file_stats else 0
+                if self.get_delta_options(snapshot_config):
+                    row_count = self.finish_delta_export(snapshot_config, export_config, downloadpath, delta_watermark, row_count)
+                    if row_count is None:
+                        self.log_failure(snapshot_config, "Delta merge into previous snapshot failed", timing)
+                        return False
+                    # The merged snapshot is the final file; collect its statistics once
+                    _, csv_filename = self.get_export_object_and_csv(snapshot_config)
+                    snapshot_file = os.path.join(downloadpath, csv_filename)
+                    file_stats = postprocess_csv(snapshot_file, snapshot_file)
+                self.log_success(snapshot_config, row_count, file_stats, timing)
+                # Optional columnar sidecar for fast downstream loading
+                cache_format = general.get('columnar_cache')
+                if cache_format and file_stats:
+                    sidecar = write_sidecar(file_stats.path, cache_format)
+                    if sidecar:
+                        print(f"✓ Columnar cache written: {os.path.basename(sidecar)}")
             else:
+                stdout = result.stdout
+                stderr = result.stderr
                 failure_reason = stderr.strip() if stderr and stderr.strip() else (stdout.strip() if stdout and stdout.strip() else "Unknown error")
-                self.log_failure(export_config, failure_reason)
-            
+                self.log_failure(snapshot_config, failure_reason, timing)
+
+            if is_success:
+                shutil.rmtree(work_dir, ignore_errors=True)
+            else:
+                print(f"ℹ️ Working directory kept for inspection: {work_dir}")
             return is_success
             
-        except subprocess.TimeoutExpired:
-            process.kill()
-            print("Process timed out after 5 minutes")
-            self.log_failure(export_config, "Process timed out after 5 minutes")
-            return False
         except Exception as e:
             print(f"Error running process: {e}")
-            self.log_failure(export_config, f"Error running process: {e}")
+            if record_export:
+                self.log_failure(snapshot_config, f"Error running process: {e}", timing)
+                print(f"ℹ️ Working directory kept for inspection: {work_dir}")
             return False
     
-    def process_ignore_columns(self, export_config, csv_file_path):
-        """Rename columns specified in ignore_column parameter to ignore.columnname"""
-        try:
-            ignore_columns = export_config.get('ignore_column', [])
-            
-            if not ignore_columns:
-                return  # No columns to ignore
-            
-            if not os.path.exists(csv_file_path):
-                print(f"Warning: CSV file {csv_file_path} not found for column processing")
-                return
-            
-            # Read the CSV file
-            with open(csv_file_path, 'r', encoding='utf-8', newline='') as f:
-                reader = csv.reader(f)
-                rows = list(reader)
-            
-            if not rows:
-                print(f"Warning: CSV file {csv_file_path} is empty")
-                return
-            
-            # Process header row
-            header = rows[0]
-            updated_header = []
-            columns_renamed = []
-            
-            for col in header:
-                if col in ignore_columns:
-                    new_col_name = f"ignore.{col}"
-                    updated_header.append(new_col_name)
-                    columns_renamed.append(f"{col} -> {new_col_name}")
-                else:
-                    updated_header.append(col)
-            
-            if columns_renamed:
-                # Update the header row
-                rows[0] = updated_header
-                
-                # Write the updated CSV back
-                with open(csv_file_path, 'w', encoding='utf-8', newline='') as f:
-                    writer = csv.writer(f)
-                    writer.writerows(rows)
-                
-                print(f"✓ Renamed columns: {', '.join(columns_renamed)}")
-            else:
-                print(f"ℹ️ No columns found to rename in {os.path.basename(csv_file_path)}")
-                
-        except Exception as e:
-            print(f"Error processing ignore columns for {csv_file_path}: {e}")
-    
-    def move_exported_file(self, export_config, downloadpath):
-        """Move the exported CSV file to the specified download path and return row count"""
+    def get_ignore_column_renames(self, export_config):
+        """Map columns from the ignore_column parameter to ignore.columnname"""
+        return {col: f"ignore.{col}" for col in export_config.get('ignore_column', [])}
+
+    def move_exported_file(self, export_config, downloadpath, work_dir):
+        """Move the exported CSV file from the job's working directory to the download path and return its PostprocessResult (None if missing)"""
         try:
             # Extract CSV filename from params
             params = export_config['params'].split()
@@ -319,60 +321,39 @@ class VaultLoaderRunner:
             
             if not csv_filename:
                 print("Warning: Could not find CSV filename in export parameters")
-                return 0
+                return None
             
-            # Source file (script directory)
-            source_file = os.path.join(self.script_dir, csv_filename)
+            # Source file (job working directory, used as -downloadpath and as cwd)
+            source_file = os.path.join(work_dir, csv_filename)
             
             # Create destination directory if it doesn't exist
             os.makedirs(downloadpath, exist_ok=True)
             
             # Destination file
             dest_file = os.path.join(downloadpath, csv_filename)
-            
-            # Move the file if it exists and count rows
-            if os.path.exists(source_file):
-                # Count rows (excluding header)
-                row_count = 0
-                try:
-                    with open(source_file, 'r', encoding='utf-8') as f:
-                        reader = csv.reader(f)
-                        row_count = sum(1 for row in reader) - 1  # Subtract header row
-                        row_count = max(0, row_count)  # Ensure non-negative
-                except Exception as e:
-                    print(f"Warning: Could not count rows in {csv_filename}: {e}")
-                    row_count = 0
-                
-                shutil.move(source_file, dest_file)
-                print(f"✓ Moved {csv_filename} to {downloadpath} ({row_count} rows)")
-                
-                # Process ignore columns after moving the file
-                self.process_ignore_columns(export_config, dest_file)
-                
-                return row_count
-            else:
-                # Some Vault Loader versions may write directly to downloadpath.
-                if os.path.exists(dest_file):
-                    row_count = 0
-                    try:
-                        with open(dest_file, 'r', encoding='utf-8') as f:
-                            reader = csv.reader(f)
-                            row_count = max(0, sum(1 for _ in reader) - 1)
-                    except Exception as e:
-                        print(f"Warning: Could not count rows in {csv_filename}: {e}")
-                    print(f"✓ File already in destination: {dest_file} ({row_count} rows)")
-                    self.process_ignore_columns(export_config, dest_file)
-                    return row_count
 
+            if not os.path.exists(source_file):
                 print(f"Warning: Export file {source_file} not found")
-                return 0
+                return None
+
+            # Move (os.replace), rename ignore columns and count rows in a single streaming pass
+            ignore_renames = self.get_ignore_column_renames(export_config)
+            result = postprocess_csv(source_file, dest_file, ignore_renames)
+
+            print(f"✓ Moved {csv_filename} to {downloadpath} ({result.row_count} rows)")
+            if result.renamed_columns:
+                print(f"✓ Renamed columns: {', '.join(result.renamed_columns)}")
+            elif ignore_renames:
+                print(f"ℹ️ No columns found to rename in {csv_filename}")
+
+            return result
                 
         except Exception as e:
             print(f"Error moving exported file: {e}")
-            return 0
+            return None
     
-    def log_success(self, export_config, row_count):
-        """Log successful export to logs/success directory"""
+    def log_success(self, export_config, row_count, file_stats=None, timing=None):
+        """Record a successful export in the run ledger and the run manifest"""
         try:
             # Extract CSV filename and object name
             params = export_config['params'].split()
@@ -389,28 +370,36 @@ class VaultLoaderRunner:
                 print("Warning: Could not extract filename or object name for success log")
                 return
             
-            # Create success log file path with run timestamp
-            log_file = os.path.join(self.script_dir, 'logs', 'success', f'success_{self.run_timestamp}.csv')
-            
-            # Check if file exists to determine if we need headers
-            file_exists = os.path.exists(log_file)
-            
-            # Write to log file
-            with open(log_file, 'a', newline='', encoding='utf-8') as f:
-                writer = csv.writer(f)
-                
-                # Write header if file is new
-                if not file_exists:
-                    writer.writerow(['file_name', 'object_name', 'row_count', 'timestamp'])
-                
-                # Write success record
-                writer.writerow([csv_filename, object_name, row_count, datetime.now().strftime("%Y-%m-%d %H:%M:%S")])
+            timing = timing or {}
+            self.ledger.record_job(
+                export_config['name'], 'success',
+                object_name=object_name,
+                file_name=csv_filename,
+                row_count=row_count,
+                byte_size=file_stats.byte_size if file_stats else None,
+                start_time=timing.get('start_time'),
+                duration_seconds=timing.get('jvm_seconds')
+            )
+            self.manifest.add_entry(
+                name=export_config['name'],
+                object_name=object_name,
+                status='success',
+                file_name=csv_filename,
+                path=file_stats.path if file_stats else None,
+                row_count=row_count,
+                byte_size=file_stats.byte_size if file_stats else None,
+                sha256=file_stats.sha256 if file_stats else None,
+                start_time=timing.get('start_time'),
+                end_time=datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+                jvm_seconds=timing.get('jvm_seconds'),
+                partition=export_config.get('partition_range')
+            )
                 
         except Exception as e:
             print(f"Error logging success: {e}")
     
-    def log_failure(self, export_config, failure_description):
-        """Log failed export to logs/failure directory"""
+    def log_failure(self, export_config, failure_description, timing=None):
+        """Record a failed export in the run ledger and the run manifest"""
         try:
             # Extract object name
             params = export_config['params'].split()
@@ -424,26 +413,631 @@ class VaultLoaderRunner:
             if not object_name:
                 object_name = "Unknown"
             
-            # Create failure log file path with run timestamp
-            log_file = os.path.join(self.script_dir, 'logs', 'failure', f'failure_{self.run_timestamp}.csv')
-            
-            # Check if file exists to determine if we need headers
-            file_exists = os.path.exists(log_file)
-            
-            # Write to log file
-            with open(log_file, 'a', newline='', encoding='utf-8') as f:
-                writer = csv.writer(f)
-                
-                # Write header if file is new
-                if not file_exists:
-                    writer.writerow(['name', 'object_name', 'failure_description', 'timestamp'])
-                
-                # Write failure record
-                writer.writerow([export_config['name'], object_name, failure_description, datetime.now().strftime("%Y-%m-%d %H:%M:%S")])
+            timing = timing or {}
+            self.ledger.record_job(
+                export_config['name'], 'failure',
+                object_name=object_name,
+                start_time=timing.get('start_time'),
+                duration_seconds=timing.get('jvm_seconds'),
+                failure_description=failure_description
+            )
+            self.manifest.add_entry(
+                name=export_config['name'],
+                object_name=object_name,
+                status='failure',
+                failure_description=failure_description,
+                start_time=timing.get('start_time'),
+                end_time=datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+                jvm_seconds=timing.get('jvm_seconds')
+            )
                 
         except Exception as e:
             print(f"Error logging failure: {e}")
     
+    def get_downloadpath(self, export_settings):
+        """Return the export destination folder exports/<dns-folder> for the given export_settings"""
+        dns = export_settings.get('dns', '')
+        dns_folder = dns.replace('https://', '').replace('/', '_')
+        return os.path.join(self.script_dir, 'exports', dns_folder)
+
+    def get_export_object_and_csv(self, export_config):
+        """Extract (object_name, csv_filename) from the export params"""
+        params = export_config['params'].split()
+        object_name = None
+        csv_filename = None
+        for i, param in enumerate(params):
+            if param == '-export' and i + 1 < len(params):
+                object_name = params[i + 1]
+            elif param == '-csv' and i + 1 < len(params):
+                csv_filename = params[i + 1]
+        return object_name, csv_filename
+
+    def read_key_column(self, csv_file_path, key):
+        """Read all non-empty values of column key (or ignore.key) from a CSV file"""
+        values = []
+        with open(csv_file_path, 'r', encoding='utf-8', newline='') as f:
+            reader = csv.reader(f)
+            header = next(reader, None)
+            if not header:
+                return None
+            if key in header:
+                key_index = header.index(key)
+            elif f"ignore.{key}" in header:
+                key_index = header.index(f"ignore.{key}")
+            else:
+                return None
+            for row in reader:
+                if key_index < len(row) and row[key_index] != '':
+                    values.append(row[key_index])
+        return values
+
+    def load_previous_partition_ranges(self, export_config):
+        """
+        Return [(upper bound, row count), ...] of the last complete partitioned run of this export, or None.
+
+        Taken from the partition ranges and row counts in the export manifests
+        (newest first); the exported files are not read.
+        """
+        key = export_config['partition']['key']
+        manifest_dir = os.path.dirname(self.manifest.manifest_file)
+        if not os.path.isdir(manifest_dir):
+            return None
+        part_pattern = re.compile(rf"^{re.escape(export_config['name'])}_\d+$")
+        manifests = sorted(f for f in os.listdir(manifest_dir) if f.startswith('export_manifest_') and f.endswith('.json'))
+        for manifest_name in reversed(manifests):
+            try:
+                manifest = load_manifest(os.path.join(manifest_dir, manifest_name))
+            except (OSError, ValueError):
+                continue
+            parts = {}
+            for entry in manifest.get('entries', []):
+                partition = entry.get('partition')
+                if entry.get('status') == 'success' and partition and part_pattern.match(entry.get('name', '')):
+                    parts[entry['name']] = entry
+            if not parts:
+                continue
+            ranges = []
+            lower = None
+            for name in sorted(parts, key=lambda part: int(part.rsplit('_', 1)[1])):
+                partition = parts[name]['partition']
+                row_count = parts[name].get('row_count')
+                # Only a gapless chain of ranges on the same key describes the whole object
+                if partition.get('key') != key or partition.get('lower') != lower or not isinstance(row_count, int):
+                    return None
+                ranges.append((partition.get('upper'), row_count))
+                lower = partition.get('upper')
+            if lower is not None:
+                return None
+            print(f"ℹ️ Using partition ranges of previous export ({manifest_name}, {len(ranges)} partitions, "
+                  f"{sum(rows for _, rows in ranges)} rows)")
+            return ranges
+        return None
+
+    def compute_bounds_from_ranges(self, ranges, target_rows, max_partitions=None):
+        """
+        Return upper bounds for partitions of about target_rows each, chosen among the previous bounds.
+
+        Each new bound is the previous bound whose cumulative row count is closest
+        to k * rows / partitions, so previous partitions are merged, never split.
+        """
+        total = sum(rows for _, rows in ranges)
+        partition_count = max(1, math.ceil(total / target_rows)) if target_rows > 0 else 1
+        if max_partitions:
+            partition_count = min(partition_count, max_partitions)
+        cumulative = []
+        for _, rows in ranges[:-1]:
+            cumulative.append((cumulative[-1] if cumulative else 0) + rows)
+        bounds = []
+        last_index = -1
+        for k in range(1, partition_count):
+            if not cumulative:
+                break
+            target = k * total / partition_count
+            index = min(range(len(cumulative)), key=lambda i: abs(cumulative[i] - target))
+            if index > last_index:
+                bounds.append(ranges[index][0])
+                last_index = index
+        return bounds
+
+    def sample_partition_keys(self, export_config, export_settings):
+        """
+        Run a key-only export (single column) to obtain the current key distribution.
+
+        The sample stays in its own working directory, which is removed afterwards;
+        it is not an export and is not recorded in the ledger or manifest.
+        """
+        partition = export_config['partition']
+        key = partition['key']
+        object_name, csv_filename = self.get_export_object_and_csv(export_config)
+        keys_filename = f"{os.path.splitext(csv_filename)[0]}_keys.csv"
+        sample_config = {
+            'name': f"{export_config['name']}_keys",
+            'params': f"-export {object_name} -csv {keys_filename}",
+            'where': export_config.get('where', ''),
+            'columns': [key],
+        }
+        print(f"🔑 Sampling partition key '{key}' for: {export_config['name']}")
+        work_dir = create_work_dir(self.get_work_root(), sample_config['name'], self.script_dir)
+        try:
+            if not self.run_java_command(sample_config, export_settings, work_dir=work_dir):
+                return None
+            keys_file = os.path.join(work_dir, keys_filename)
+            if not os.path.exists(keys_file):
+                print(f"Warning: Key sample file {keys_file} not found")
+                return None
+            return self.read_key_column(keys_file, key)
+        finally:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    def compute_partition_bounds(self, keys, target_rows, max_partitions=None):
+        """
+        Return sorted upper bounds that split keys into partitions of about target_rows each.
+
+        Keys are ordered case-insensitively like VQL compares text, so keys that
+        differ only in case never straddle a bound.
+        """
+        keys = sorted(keys, key=str.lower)
+        if not keys or target_rows <= 0:
+            return []
+        partition_count = math.ceil(len(keys) / target_rows)
+        if max_partitions:
+            partition_count = min(partition_count, max_partitions)
+        bounds = []
+        for k in range(1, partition_count):
+            bound = keys[(k * len(keys)) // partition_count - 1]
+            # Duplicate keys cannot be split; skip bounds that would create empty partitions
+            if not bounds or bound.lower() > bounds[-1].lower():
+                bounds.append(bound)
+        if bounds and bounds[-1].lower() >= keys[-1].lower():
+            bounds.pop()
+        return bounds
+
+    def build_partition_where(self, key, lower, upper):
+        """Build the VQL range predicate (lower, upper] for one partition"""
+        def quote(value):
+            return "'" + value.replace("\\", "\\\\").replace("'", "\\'") + "'"
+
+        clauses = []
+        if lower is not None:
+            clauses.append(f"{key} > {quote(lower)}")
+        if upper is not None:
+            clauses.append(f"{key} <= {quote(upper)}")
+        predicate = " and ".join(clauses)
+        if lower is None:
+            # Records without a key value belong to the first partition
+            predicate = f"({predicate} or {key} = null)" if predicate else ""
+        return predicate
+
+    def expand_partitioned_exports(self, exports, export_settings):
+        """Replace exports that define a 'partition' option with one export per key range"""
+        expanded = []
+        downloadpath = self.get_downloadpath(export_settings)
+        for export_config in exports:
+            partition = export_config.get('partition')
+            if not partition or export_config.get('active', 1) == 0:
+                expanded.append(export_config)
+                continue
+
+            key = partition.get('key')
+            target_rows = int(partition.get('target_rows', 0) or 0)
+            _, csv_filename = self.get_export_object_and_csv(export_config)
+            if not key or target_rows <= 0 or not csv_filename:
+                print(f"Warning: Invalid partition option for '{export_config['name']}', exporting unpartitioned")
+                expanded.append(export_config)
+                continue
+
+            # 'previous' = partition ranges of the last export, 'sample' = key-only export, 'auto' = previous if usable
+            source = partition.get('source', 'auto')
+            bounds = None
+            if source in ('auto', 'previous'):
+                previous = self.load_previous_partition_ranges(export_config)
+                # Previous partitions can only be merged; if one has grown too large a fresh sample splits it
+                if previous and source == 'auto' and max(rows for _, rows in previous) > 2 * target_rows:
+                    print(f"ℹ️ A previous partition of '{export_config['name']}' has more than twice {target_rows} rows, sampling keys")
+                    previous = None
+                if previous:
+                    bounds = self.compute_bounds_from_ranges(previous, target_rows, partition.get('max_partitions'))
+                    row_total = sum(rows for _, rows in previous)
+            sampled = False
+            if bounds is None and source in ('auto', 'sample'):
+                keys = self.sample_partition_keys(export_config, export_settings)
+                if keys is not None:
+                    bounds = self.compute_partition_bounds(keys, target_rows, partition.get('max_partitions'))
+                    row_total = len(keys)
+                    sampled = True
+            if bounds is None:
+                print(f"Warning: No key distribution for '{export_config['name']}', exporting unpartitioned")
+                expanded.append(export_config)
+                continue
+
+            ranges = list(zip([None] + bounds, bounds + [None]))
+            base = os.path.splitext(csv_filename)[0]
+            base_where = export_config.get('where', '')
+            print(f"🧩 Partitioning '{export_config['name']}' on {key}: {row_total} rows -> {len(ranges)} partitions")
+            self.partitioned_exports.append({
+                'name': export_config['name'],
+                'downloadpath': downloadpath,
+                'base': base,
+                'parts': [f"{export_config['name']}_{number:02d}" for number in range(1, len(ranges) + 1)],
+                # Row count the partitions must add up to (only known from a fresh key sample)
+                'expected_rows': row_total if sampled else None,
+            })
+
+            for number, (lower, upper) in enumerate(ranges, 1):
+                suffix = f"{number:02d}"
+                part_where = self.build_partition_where(key, lower, upper)
+                if base_where and part_where:
+                    where = f"({base_where}) and {part_where}"
+                else:
+                    where = base_where or part_where
+                part_config = dict(export_config)
+                part_config.pop('partition', None)
+                # Partition boundaries move between runs, so partition snapshots cannot be merged
+                part_config.pop('delta', None)
+                part_config['name'] = f"{export_config['name']}_{suffix}"
+                part_config['params'] = export_config['params'].replace(
+                    f"-csv {csv_filename}", f"-csv {base}_{suffix}.csv"
+                )
+                part_config['where'] = where
+                # Recorded in the manifest; the next run takes its ranges and row counts from there
+                part_config['partition_range'] = {'key': key, 'lower': lower, 'upper': upper}
+                expanded.append(part_config)
+        return expanded
+
+    def finish_partitioned_exports(self):
+        """
+        Clean up after partitioned exports whose partitions all succeeded.
+
+        Partition files above the current partition count (left from a run with more
+        partitions) and their sidecars are removed, so they are not picked up
+        downstream. With a fresh key sample the
+        partition rows are checked against the sampled keys: a difference means the
+        ranges overlap or leave gaps (e.g. a key whose ordering differs in VQL).
+        """
+        succeeded = {entry.get('name'): entry for entry in self.manifest.entries if entry.get('status') == 'success'}
+        for partitioned in self.partitioned_exports:
+            if not all(part in succeeded for part in partitioned['parts']):
+                continue
+            count = len(partitioned['parts'])
+            stale_pattern = re.compile(rf"^{re.escape(partitioned['base'])}_(\d+)\.(csv|parquet|feather)$")
+            downloadpath = partitioned['downloadpath']
+            for file_name in sorted(os.listdir(downloadpath)) if os.path.isdir(downloadpath) else []:
+                match = stale_pattern.match(file_name)
+                if match and int(match.group(1)) > count:
+                    os.remove(os.path.join(downloadpath, file_name))
+                    print(f"🧹 Removed stale partition file {file_name}")
+            expected = partitioned['expected_rows']
+            rows = [succeeded[part].get('row_count') for part in partitioned['parts']]
+            if expected is not None and all(isinstance(row, int) for row in rows) and sum(rows) != expected:
+                print(f"⚠️ Partitions of '{partitioned['name']}' contain {sum(rows)} rows, the key sample {expected}: "
+                      "ranges may overlap or miss keys (data changed, or the key compares differently in VQL)")
+
+    def get_delta_options(self, export_config):
+        """Return the delta settings of an export ('delta': 1 or {'column': ..., 'key': ...}) or None"""
+        delta = export_config.get('delta')
+        if not delta:
+            return None
+        options = delta if isinstance(delta, dict) else {}
+        return {
+            'column': options.get('column', 'modified_date__v'),
+            'key': options.get('key', 'id'),
+        }
+
+    def get_watermark_file(self, downloadpath):
+        """Per-vault watermark store inside exports/<dns-folder>"""
+        return os.path.join(downloadpath, 'delta_watermarks.json')
+
+    def load_watermarks(self, downloadpath):
+        """Load all stored delta watermarks of a vault"""
+        watermark_file = self.get_watermark_file(downloadpath)
+        if not os.path.exists(watermark_file):
+            return {}
+        try:
+            with open(watermark_file, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except Exception as e:
+            print(f"Warning: Could not read watermark file {watermark_file}: {e}")
+            return {}
+
+    def save_watermark(self, export_config, downloadpath, column, watermark):
+        """Store (or clear with watermark=None) the delta watermark of one export"""
+        with self.watermark_lock:
+            watermarks = self.load_watermarks(downloadpath)
+            if watermark is None:
+                watermarks.pop(export_config['name'], None)
+            else:
+                watermarks[export_config['name']] = {
+                    'column': column,
+                    'watermark': watermark,
+                    'updated': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+                }
+            watermark_file = self.get_watermark_file(downloadpath)
+            tmp_file = watermark_file + '.tmp'
+            with open(tmp_file, 'w', encoding='utf-8') as f:
+                json.dump(watermarks, f, indent=4)
+            os.replace(tmp_file, watermark_file)
+
+    def get_delta_watermark(self, export_config, downloadpath):
+        """Return the watermark for a delta run, or None if a full export is required"""
+        delta = self.get_delta_options(export_config)
+        if not delta:
+            return None
+        entry = self.load_watermarks(downloadpath).get(export_config['name'])
+        if not entry or entry.get('column') != delta['column'] or not entry.get('watermark'):
+            print(f"ℹ️ No watermark for '{export_config['name']}', running full export")
+            return None
+        _, csv_filename = self.get_export_object_and_csv(export_config)
+        if not csv_filename or not os.path.exists(os.path.join(downloadpath, csv_filename)):
+            print(f"ℹ️ No previous snapshot for '{export_config['name']}', running full export")
+            return None
+        return entry['watermark']
+
+    def build_delta_export_config(self, export_config, watermark):
+        """Derive the delta job: same export, changed records only, written to <file>__delta.csv"""
+        delta = self.get_delta_options(export_config)
+        _, csv_filename = self.get_export_object_and_csv(export_config)
+        delta_filename = f"{os.path.splitext(csv_filename)[0]}__delta.csv"
+        escaped = watermark.replace("'", "\\'")
+        # >= instead of > so records sharing the watermark timestamp are never missed; the merge is idempotent
+        delta_predicate = f"{delta['column']} >= '{escaped}'"
+        base_where = export_config.get('where', '')
+        delta_config = dict(export_config)
+        delta_config['params'] = export_config['params'].replace(f"-csv {csv_filename}", f"-csv {delta_filename}")
+        delta_config['where'] = f"({base_where}) and {delta_predicate}" if base_where else delta_predicate
+        print(f"🔁 Delta export for '{export_config['name']}' since {delta['column']} >= {watermark}")
+        return delta_config
+
+    def find_column(self, header, column):
+        """Index of column or ignore.column in a header row, None if absent"""
+        if column in header:
+            return header.index(column)
+        if f"ignore.{column}" in header:
+            return header.index(f"ignore.{column}")
+        return None
+
+    def get_max_column_value(self, csv_file_path, column):
+        """Return the maximum non-empty value of a column in a CSV file"""
+        with open(csv_file_path, 'r', encoding='utf-8', newline='') as f:
+            reader = csv.reader(f)
+            header = next(reader, [])
+            index = self.find_column(header, column)
+            if index is None:
+                return None
+            return max((row[index] for row in reader if index < len(row) and row[index]), default=None)
+
+    def merge_delta_file(self, snapshot_file, delta_file, key, column):
+        """Merge delta rows by key into the snapshot; return (row_count, max column value)"""
+        with open(delta_file, 'r', encoding='utf-8', newline='') as f:
+            reader = csv.reader(f)
+            delta_header = next(reader, [])
+            delta_key_index = self.find_column(delta_header, key)
+            if delta_key_index is None:
+                raise ValueError(f"Key column '{key}' not found in {os.path.basename(delta_file)}")
+            delta_rows = {row[delta_key_index]: row for row in reader if delta_key_index < len(row)}
+
+        tmp_file = snapshot_file + '.tmp'
+        row_count = 0
+        max_value = None
+        with open(snapshot_file, 'r', encoding='utf-8', newline='') as src, \
+                open(tmp_file, 'w', encoding='utf-8', newline='') as dst:
+            reader = csv.reader(src)
+            writer = csv.writer(dst)
+            header = next(reader, [])
+            key_index = self.find_column(header, key)
+            column_index = self.find_column(header, column)
+            if key_index is None:
+                raise ValueError(f"Key column '{key}' not found in {os.path.basename(snapshot_file)}")
+            # Delta rows are written in snapshot column order
+            missing = [col for col in header if col not in delta_header]
+            if missing:
+                raise ValueError(f"Delta file lacks snapshot columns: {', '.join(missing)}")
+            order = [delta_header.index(col) for col in header]
+            writer.writerow(header)
+
+            def emit(row):
+                nonlocal row_count, max_value
+                writer.writerow(row)
+                row_count += 1
+                if column_index is not None and column_index < len(row) and row[column_index]:
+                    if max_value is None or row[column_index] > max_value:
+                        max_value = row[column_index]
+
+            for row in reader:
+                changed = delta_rows.pop(row[key_index], None) if key_index < len(row) else None
+                emit([changed[i] for i in order] if changed is not None else row)
+            # Remaining delta rows are new records
+            for changed in delta_rows.values():
+                emit([changed[i] for i in order])
+        os.replace(tmp_file, snapshot_file)
+        return row_count, max_value
+
+    def finish_delta_export(self, snapshot_config, export_config, downloadpath, delta_watermark, row_count):
+        """Merge a delta export into its snapshot (if any) and advance the watermark; return total rows"""
+        delta = self.get_delta_options(snapshot_config)
+        _, csv_filename = self.get_export_object_and_csv(snapshot_config)
+        snapshot_file = os.path.join(downloadpath, csv_filename)
+        try:
+            if delta_watermark:
+                _, delta_filename = self.get_export_object_and_csv(export_config)
+                delta_file = os.path.join(downloadpath, delta_filename)
+                if os.path.exists(delta_file):
+                    print(f"🔀 Merging {row_count} changed rows into {csv_filename}")
+                    row_count, max_value = self.merge_delta_file(snapshot_file, delta_file, delta['key'], delta['column'])
+                    os.remove(delta_file)
+                    print(f"✓ Snapshot {csv_filename} updated ({row_count} rows)")
+                else:
+                    # No delta file written: nothing changed since the watermark
+                    print(f"ℹ️ No changes since {delta_watermark}, snapshot {csv_filename} unchanged")
+                    row_count = count_csv_rows(snapshot_file)
+                    max_value = delta_watermark
+            else:
+                max_value = self.get_max_column_value(snapshot_file, delta['column'])
+        except Exception as e:
+            print(f"Error merging delta export for {snapshot_config['name']}: {e}")
+            # Force a full export next time
+            self.save_watermark(snapshot_config, downloadpath, delta['column'], None)
+            return None
+
+        if max_value is None:
+            if delta_watermark:
+                max_value = delta_watermark
+            else:
+                print(f"Warning: Column '{delta['column']}' not exported for '{snapshot_config['name']}', no watermark stored")
+                return row_count
+        self.save_watermark(snapshot_config, downloadpath, delta['column'], max_value)
+        print(f"✓ Watermark for '{snapshot_config['name']}': {delta['column']} = {max_value}")
+        return row_count
+
+    def get_work_root(self):
+        """Return the root folder for per-job working directories (general.work_root, default work/)"""
+        work_root = self.config.get('general', {}).get('work_root', DEFAULT_WORK_ROOT)
+        if not os.path.isabs(work_root):
+            work_root = os.path.join(self.script_dir, work_root)
+        return work_root
+
+    def get_execution_mode(self):
+        """
+        Return general.execution_mode: 'process' (one java -jar per job, default) or 'worker' (warm JVM pool).
+
+        'worker' falls back to 'process' on Java versions the worker does not support (see worker_java_supported).
+        """
+        general = self.config.get('general', {})
+        mode = str(general.get('execution_mode', 'process')).lower()
+        if mode not in EXECUTION_MODES:
+            print(f"Warning: Unknown execution_mode '{mode}' (use {', '.join(EXECUTION_MODES)}), using 'process'")
+            return 'process'
+        if mode == 'worker' and not worker_java_supported(general.get('java_exe', 'java')):
+            return 'process'
+        return mode
+
+    def get_worker_pool(self):
+        """Return the warm JVM worker pool of this run (created on first use), or None in 'process' mode"""
+        if self.get_execution_mode() != 'worker':
+            return None
+        with self.pool_lock:
+            if self.worker_pool is None:
+                general = self.config['general']
+                vault_loader = general['vault_loader']
+                if not os.path.isabs(vault_loader):
+                    vault_loader = os.path.join(self.script_dir, vault_loader)
+                size = general.get('worker_pool_size', self.get_max_parallel_exports())
+                print(f"♨️ Using up to {size} warm VaultDataLoader worker JVM(s)")
+                self.worker_pool = LoaderWorkerPool(
+                    general['java_exe'], vault_loader, int(size), self.get_work_root(), self.script_dir,
+                    jvm_options=build_jvm_options(general)
+                )
+            return self.worker_pool
+
+    def close_worker_pool(self):
+        """Stop the worker JVMs of this run"""
+        with self.pool_lock:
+            if self.worker_pool is not None:
+                self.worker_pool.close()
+                self.worker_pool = None
+
+    def run_loader(self, java_command, cwd, timeout, label, own_process=False):
+        """
+        Run a VaultDataLoader command in a warm worker JVM or as its own process; returns a LoaderProcessResult.
+
+        Jobs with their own JVM options (own_process) always get a separate process.
+        """
+        general = self.config['general']
+        options = dict(
+            timeout=timeout,
+            label=label,
+            failure_markers=general.get('failure_markers', DEFAULT_FAILURE_MARKERS),
+            fatal_markers=general.get('fatal_markers'),
+            buffer_lines=general.get('output_buffer_lines', DEFAULT_BUFFER_LINES)
+        )
+        pool = None if own_process else self.get_worker_pool()
+        xmx_mb = get_xmx_mb(java_command[:java_command.index('-jar')])
+        gc_log = None
+        if pool is None and general.get('auto_jvm_sizing', True):
+            # The GC log tells how much heap the job really used (RSS also contains the unused part of -Xmx)
+            java_command, gc_log = add_gc_log(java_command, cwd)
+        run = pool.run if pool is not None else run_loader_process
+        if self.memory_admission is not None:
+            # Start the job only when its expected peak fits into the free memory of the host
+            expected_mb = expected_job_memory_mb(
+                self.job_history.get(label), xmx_mb, general.get('default_job_memory_mb', DEFAULT_JOB_MEMORY_MB)
+            )
+            ticket = self.memory_admission.acquire(expected_mb, label)
+            start = time.monotonic()
+            try:
+                result = run(java_command, cwd, on_start=lambda pid: self.memory_admission.set_pid(ticket, pid), **options)
+            finally:
+                self.memory_admission.release(ticket)
+        else:
+            start = time.monotonic()
+            result = run(java_command, cwd, **options)
+        duration = time.monotonic() - start
+        heap_used_mb = read_gc_log_heap_mb(gc_log)
+        if gc_log and os.path.exists(gc_log):
+            os.remove(gc_log)
+        if result.peak_rss_mb is not None:
+            heap_text = f", heap used {heap_used_mb} MB" if heap_used_mb is not None else ""
+            print(f"[{label}] Peak RSS {result.peak_rss_mb} MB{heap_text}, CPU {result.cpu_seconds} s")
+        self.job_history.record(label, result, duration, xmx_mb, heap_used_mb)
+        self.ledger.record_attempt(label, result, duration, xmx_mb)
+        return result
+
+    def start_ledger(self):
+        """Open this run in the ledger; called when a batch starts, so leaving the menu records no unfinished run"""
+        if self.ledger.run_id is None:
+            self.ledger.start_run('export', self.run_timestamp, config_file=self.manifest.data['config_file'],
+                                  dns=self.manifest.data['dns'])
+
+    def finish_ledger(self):
+        """Mark the run as finished in the ledger; with general.csv_logs the success/failure CSV logs are written too"""
+        self.ledger.finish_run()
+        if not self.config.get('general', {}).get('csv_logs', False):
+            print(f"📒 Run ledger: {self.ledger.ledger_file} (CSV logs: python run_ledger.py export-csv {self.run_timestamp} --type export)")
+            return
+        connection = connect_ledger(self.ledger.ledger_file)
+        try:
+            for log_file in export_csv_logs(connection, self.ledger.run_id, os.path.join(self.script_dir, 'logs')):
+                print(f"📁 Log file written: {log_file}")
+        finally:
+            connection.close()
+
+    def get_job_history(self, name):
+        """
+        Return the recorded runs of a job for automatic -Xmx/GC sizing.
+
+        Only jobs that get their own JVM are sized; warm workers share one heap.
+        """
+        if self.get_execution_mode() != 'process':
+            return None
+        return self.job_history.get(name)
+
+    def get_auto_parallel(self):
+        """Return the concurrency for max_parallel_exports = "auto" (see memory_admission.auto_parallel_limit)"""
+        general = self.config.get('general', {})
+        ceiling = general.get('max_parallel_ceiling', DEFAULT_PARALLEL_CEILING)
+        try:
+            ceiling = max(1, int(ceiling))
+        except (TypeError, ValueError):
+            print(f"Warning: Invalid max_parallel_ceiling '{ceiling}', using {DEFAULT_PARALLEL_CEILING}")
+            ceiling = DEFAULT_PARALLEL_CEILING
+        admission = self.memory_admission is not None
+        return auto_parallel_limit(
+            ceiling,
+            general.get('memory_reserve_mb', DEFAULT_MEMORY_RESERVE_MB),
+            general.get('default_job_memory_mb', DEFAULT_JOB_MEMORY_MB),
+            admission
+        )
+
+    def get_max_parallel_exports(self):
+        """Return the number of concurrent VaultDataLoader processes (general.max_parallel_exports, "auto": from the free memory)"""
+        value = self.config.get('general', {}).get('max_parallel_exports', 1)
+        if value == 'auto':
+            return self.get_auto_parallel()
+        try:
+            return max(1, int(value))
+        except (TypeError, ValueError):
+            print(f"Warning: Invalid max_parallel_exports '{value}', running exports sequentially")
+            return 1
+
     def run_all_exports(self):
         """Execute all configured exports, prompting for export_settings if multiple exist"""
         exports = self.config.get('exports', [])
@@ -475,68 +1069,121 @@ class VaultLoaderRunner:
         else:
             export_settings = export_settings_list[0]
 
+        self.manifest.data['dns'] = export_settings.get('dns', '')
+        self.start_ledger()
+
+        # Expand exports with a 'partition' option into one job per key range
+        exports = self.expand_partitioned_exports(exports, export_settings)
+
+        max_parallel = self.get_max_parallel_exports()
+
         print(f"🏁 Starting VaultLoader batch process with {len(exports)} exports")
         print(f"📅 Run timestamp: {self.run_timestamp}")
+        if max_parallel > 1:
+            print(f"⚙️ Parallel exports: up to {max_parallel} VaultDataLoader processes")
         print("-" * 80)
 
         success_count = 0
         failure_count = 0
         skipped_count = 0
 
+        # Skipped exports are logged up front; active ones are queued for execution
+        pending = []
         for i, export_config in enumerate(exports, 1):
-            print(f"\n[{i}/{len(exports)}] Processing export: {export_config['name']}")
-
             # Check if export is active
             active = export_config.get('active', 1)
             if active == 0:
+                print(f"\n[{i}/{len(exports)}] Processing export: {export_config['name']}")
                 print(f"⏭️ Skipping '{export_config['name']}' (inactive)")
                 self.log_skipped(export_config)
                 skipped_count += 1
                 continue
+            pending.append((i, export_config))
 
-            success = self.run_java_command(export_config, export_settings)
-            if success:
-                success_count += 1
-            else:
-                failure_count += 1
+        # Predict every job's duration from the run ledger; parallel runs start the longest jobs first
+        model = RuntimeModel(self.ledger.ledger_file, 'export')
+        predictions = {export_config['name']: model.predict(export_config['name']) for _, export_config in pending}
+        if max_parallel > 1:
+            pending.sort(key=lambda item: predictions[item[1]['name']][0], reverse=True)
+        progress = BatchProgress({name: seconds for name, (seconds, _) in predictions.items()}, max_parallel)
+        print_prediction(
+            {export_config['name']: predictions[export_config['name']][0] for _, export_config in pending},
+            sum(1 for _, known in predictions.values() if known),
+            max_parallel
+        )
+
+        def run_export(export_config):
+            progress.start(export_config['name'])
+            return self.run_java_command(export_config, export_settings)
+
+        if max_parallel <= 1:
+            for i, export_config in pending:
+                print(f"\n[{i}/{len(exports)}] Processing export: {export_config['name']}")
+                success = run_export(export_config)
+                if success:
+                    success_count += 1
+                else:
+                    failure_count += 1
+                progress.finish(export_config['name'])
+                print(progress.eta_line())
+
+                print("-" * 40)
+        else:
+            with ThreadPoolExecutor(max_workers=max_parallel) as executor:
+                futures = {}
+                for i, export_config in pending:
+                    seconds, known = predictions[export_config['name']]
+                    estimate = f" (~{format_duration(seconds)}{'' if known else ', no history'})"
+                    print(f"\n[{i}/{len(exports)}] Queued export: {export_config['name']}{estimate}")
+                    future = executor.submit(run_export, export_config)
+                    futures[future] = export_config
+
+                done_count = 0
+                for future in as_completed(futures):
+                    export_config = futures[future]
+                    done_count += 1
+                    try:
+                        success = future.result()
+                    except Exception as e:
+                        print(f"Error running export '{export_config['name']}': {e}")
+                        self.log_failure(export_config, f"Error running export: {e}")
+                        success = False
+                    if success:
+                        success_count += 1
+                    else:
+                        failure_count += 1
+                    status = "✅" if success else "❌"
+                    progress.finish(export_config['name'])
+                    print(f"{status} [{done_count}/{len(pending)}] Finished export: {export_config['name']}")
+                    print(progress.eta_line())
+                    print("-" * 40)
 
-            print("-" * 40)
+        self.close_worker_pool()
+        self.finish_partitioned_exports()
 
         # Print summary
         print(f"\n📊 Batch Export Summary:")
         print(f"✅ Successful exports: {success_count}")
-        # List successful export files and line counts
-        success_log = os.path.join(self.script_dir, 'logs', 'success', f'success_{self.run_timestamp}.csv')
-        if os.path.exists(success_log):
+        # List successful export files with the statistics recorded in the run manifest
+        exported = [entry for entry in self.manifest.entries if entry.get('status') == 'success']
+        if exported:
             print("Exported files:")
-            with open(success_log, 'r', encoding='utf-8') as f:
-                reader = csv.DictReader(f)
-                for row in reader:
-                    file_name = row['file_name']
-                    if file_name != 'SKIPPED' and file_name != '':
-                        # Count lines in exported file (excluding header)
-                        file_path = os.path.join(self.script_dir, file_name) if not os.path.isabs(file_name) else file_name
-                        line_count = 0
-                        try:
-                            with open(file_path, 'r', encoding='utf-8') as expf:
-                                line_count = sum(1 for _ in expf) - 1  # exclude header
-                                if line_count < 0:
-                                    line_count = 0
-                        except Exception:
-                            line_count = 'N/A'
-                        print(f"- {file_name}: {line_count} lines")
+            for entry in exported:
+                size_mb = entry['byte_size'] / (1024 * 1024) if entry.get('byte_size') is not None else None
+                size_display = f", {size_mb:.1f} MB" if size_mb is not None else ""
+                jvm_display = f", JVM {entry['jvm_seconds']:.0f} s" if entry.get('jvm_seconds') is not None else ""
+                print(f"- {entry.get('path') or entry.get('file_name')}: {entry.get('row_count', 'N/A')} rows{size_display}{jvm_display}")
         print(f"❌ Failed exports: {failure_count}")
         # List failed exports (object names)
-        failure_log = os.path.join(self.script_dir, 'logs', 'failure', f'failure_{self.run_timestamp}.csv')
-        if os.path.exists(failure_log):
+        failed = [entry for entry in self.manifest.entries if entry.get('status') == 'failure']
+        if failed:
             print("Failed objects:")
-            with open(failure_log, 'r', encoding='utf-8') as f:
-                reader = csv.DictReader(f)
-                for row in reader:
-                    object_name = row.get('object_name', '')
-                    print(f"- {object_name}")
+            for entry in failed:
+                print(f"- {entry.get('object_name', '')}")
         print(f"⏭️ Skipped exports: {skipped_count}")
-        print(f"📁 Log files created in logs/success/ and logs/failure/")
+        self.manifest.finish()
+        self.finish_ledger()
+        print(f"🧾 Run manifest: {self.manifest.manifest_file}")
         print(f"🕒 Run completed at: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
 
 def main():
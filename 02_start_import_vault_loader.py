@@ -1,12 +1,27 @@
-import subprocess
 import sys
 import os
 import json
 import shutil
 import csv
 import shlex
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
 from datetime import datetime
 from urllib.parse import urlparse
+from csv_utils import split_csv, merge_csv_files, replace_file, count_csv_rows, iter_csv_records
+from run_manifest import RunManifest
+from runtime_model import RuntimeModel, BatchProgress, print_prediction, format_duration
+from run_ledger import RunLedger, LEDGER_FILE, connect as connect_ledger, export_csv_logs
+from import_preflight import PREFLIGHT_MODES, DEFAULT_KEY_COLUMNS, find_export_files, read_column_values, find_duplicate_keys, \
+    check_loader_row
+from vault_loader_process import run_loader_process, create_work_dir, DEFAULT_FAILURE_MARKERS, DEFAULT_BUFFER_LINES, DEFAULT_WORK_ROOT, \
+    LOADER_HEADER
+from vault_loader_worker import LoaderWorkerPool, EXECUTION_MODES, worker_java_supported
+from jvm_options import build_jvm_options, get_xmx_mb, add_gc_log, read_gc_log_heap_mb
+from job_history import JobHistory
+from memory_admission import MemoryAdmission, expected_job_memory_mb, auto_parallel_limit, DEFAULT_JOB_MEMORY_MB, \
+    DEFAULT_MEMORY_RESERVE_MB, DEFAULT_PARALLEL_CEILING
 
 class VaultImportRunner:
     def __init__(self, config_file=None):
@@ -23,14 +38,34 @@ class VaultImportRunner:
         self.config_file = os.path.join(self.script_dir, config_file)
         self.config = {}
         self.run_timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        # Warm VaultDataLoader JVMs (general.execution_mode = worker), created on first use
+        self.worker_pool = None
+        self.pool_lock = threading.Lock()
+        # Peak memory and CPU of earlier runs per job, used to size -Xmx and pick the GC
+        self.job_history = JobHistory(os.path.join(self.script_dir, 'logs', 'import_job_history.json'))
+        # Import name -> loader file to use instead of the configured one (quarantined rows removed)
+        self.loader_overrides = {}
         self.load_config()
         self.setup_log_directories()
+        # Starts VaultDataLoader processes only while the host has memory for them (general.memory_admission)
+        self.memory_admission = None
+        if self.config.get('general', {}).get('memory_admission', True):
+            self.memory_admission = MemoryAdmission(self.config['general'].get('memory_reserve_mb', DEFAULT_MEMORY_RESERVE_MB))
+        # Per-run manifest: exact result log paths of every VaultDataLoader invocation
+        self.manifest = RunManifest(
+            os.path.join(self.script_dir, 'logs', 'manifest', f'import_manifest_{self.run_timestamp}.json'),
+            'import',
+            self.run_timestamp,
+            config_file=config_file,
+            dns=self.config.get('import_settings', {}).get('dns', '')
+        )
+        # Run ledger (logs/run_ledger.db): jobs, loader attempts and timings of all runs (run opened in start_ledger)
+        self.ledger = RunLedger(os.path.join(self.script_dir, LEDGER_FILE))
         
     def setup_log_directories(self):
         """Create log directories if they don't exist"""
         logs_dir = os.path.join(self.script_dir, 'logs')
-        os.makedirs(os.path.join(logs_dir, 'success'), exist_ok=True)
-        os.makedirs(os.path.join(logs_dir, 'failure'), exist_ok=True)
+        os.makedirs(os.path.join(logs_dir, 'manifest'), exist_ok=True)
     
     def select_config_file(self):
         """Let user select a JSON configuration file from the config directory"""
@@ -128,9 +163,7 @@ class VaultImportRunner:
         return normalized
     
     def log_skipped(self, import_config):
-        """Log skipped import to success log"""
-        success_log = os.path.join(self.script_dir, 'logs', 'success', f'success_{self.run_timestamp}.csv')
-        
+        """Record a skipped import in the run ledger"""
         # Extract object name from params
         params = import_config['params'].split()
         object_name = ""
@@ -138,23 +171,18 @@ class VaultImportRunner:
             import_index = params.index('-import')
             if import_index + 1 < len(params):
                 object_name = params[import_index + 1]
-        
-        # Create directory if it doesn't exist
-        os.makedirs(os.path.dirname(success_log), exist_ok=True)
-        
-        # Check if file exists to determine if we need to write headers
-        file_exists = os.path.exists(success_log)
-        
-        with open(success_log, 'a', newline='', encoding='utf-8') as f:
-            writer = csv.writer(f)
-            if not file_exists:
-                writer.writerow(['file_name', 'object_name', 'row_count', 'timestamp'])
-            
-            timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-            writer.writerow(['SKIPPED', object_name, 'N/A', timestamp])
+
+        self.ledger.record_job(import_config['name'], 'skipped', object_name=object_name)
     
-    def run_java_command(self, import_config):
-        """Execute the Java VaultLoader with given import parameters"""
+    def run_java_command(self, import_config, loader_file=None, work_dir=None):
+        """
+        Execute the Java VaultLoader with given import parameters.
+
+        Every invocation runs in its own scratch directory under the work root, so
+        concurrent jobs cannot pick up each other's result logs. loader_file replaces
+        the file given with -csv (used for chunks) and work_dir passes a scratch
+        directory owned by the caller, where the result logs then stay.
+        """
         
         # Check if import is active
         active = import_config.get('active', 1)  # Default to 1 (active) if not specified
@@ -162,6 +190,13 @@ class VaultImportRunner:
             print(f"⏭️ Skipping '{import_config['name']}' (inactive)")
             self.log_skipped(import_config)
             return True  # Return True to indicate successful skip
+
+        # Large loader files are split and imported chunk by chunk
+        if loader_file is None and self.get_chunk_rows(import_config):
+            return self.run_chunked_import(import_config)
+        # Chunk and retry files are not archived in imports/<dns>/
+        archive_loader_file = loader_file is None
+        loader_file = loader_file or self.loader_overrides.get(import_config['name'])
         
         # Get general configuration
         general = self.config['general']
@@ -182,7 +217,9 @@ class VaultImportRunner:
         base_import_path = import_settings.get('import_path', '')
         
         # Build Java command with dns, username and password parameters
-        java_command = [java_exe, '-jar', vault_loader]
+        # JVM options: general.jvm_options, per-job jvm_options and the CDS archive if one was built
+        jvm_options = build_jvm_options(general, import_config, vault_loader, self.get_job_history(import_config['name']))
+        java_command = [java_exe] + jvm_options + ['-jar', vault_loader]
         
         # Add DNS parameter if present
         if dns:
@@ -199,7 +236,8 @@ class VaultImportRunner:
         
         # Build full import path by combining base path with filename from params
         import_path_full = None
-        if base_import_path:
+        # A loader_file override (chunk, retry or quarantined file) replaces the -csv file, which need not exist in import_path
+        if base_import_path and not loader_file:
             if not os.path.isabs(base_import_path):
                 base_path_full = os.path.abspath(os.path.join(self.script_dir, base_import_path))
             else:
@@ -209,6 +247,7 @@ class VaultImportRunner:
             if not os.path.exists(base_path_full):
                 print(f"❌ Warning: Import path does not exist: {base_path_full}")
                 self.log_failure(import_config, f"Import path not found: {base_path_full}")
+                self.record_invocation(import_config, 'failure', description=f"Import path not found: {base_path_full}")
                 return False
             
             # Find and replace CSV filename in params list
@@ -227,10 +266,18 @@ class VaultImportRunner:
                 if not os.path.exists(import_path_full):
                     print(f"❌ Warning: Import file does not exist: {import_path_full}")
                     self.log_failure(import_config, f"Import file not found: {import_path_full}")
+                    self.record_invocation(import_config, 'failure', import_path_full, description="Import file not found")
                     return False
                 
                 # Replace filename in params list with full path
                 params[csv_index] = import_path_full
+
+        if loader_file:
+            for i, param in enumerate(params):
+                if param == '-csv' and i + 1 < len(params):
+                    params[i + 1] = loader_file
+                    break
+            import_path_full = loader_file
         
         java_command.extend(params)
         
@@ -238,52 +285,49 @@ class VaultImportRunner:
         # Build display command (hide password)
         display_params = params.copy()
         dns_display = f"-dns {dns} " if dns else ""
-        command_display = f"{java_exe} -jar {vault_loader} {dns_display}-u {username} -p [HIDDEN] {' '.join(display_params)}"
+        jvm_display = ' '.join(jvm_options) + ' ' if jvm_options else ''
+        command_display = f"{java_exe} {jvm_display}-jar {vault_loader} {dns_display}-u {username} -p [HIDDEN] {' '.join(display_params)}"
         print(f"Command: {command_display}")
         if import_path_full:
             print(f"Used file for import: {import_path_full}")
         
-        # Start process
+        # Result logs already in the working directory belong to other (earlier) jobs
+        log_dir = work_dir or create_work_dir(self.get_work_root(), import_config['name'], self.script_dir)
+        existing_logs = {f: os.path.getmtime(os.path.join(log_dir, f)) for f in os.listdir(log_dir) if self.is_result_log(f)}
+        start_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+        # Start process; output is streamed and checked for failure markers while it runs
+        # Get timeout from import_settings (default 1800 seconds)
+        timeout_val = import_settings.get('time_out', 1800)
         try:
-            process = subprocess.Popen(
-                java_command,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                text=True,
-                cwd=self.script_dir
-            )
-            # Get output
-            # Get timeout from import_settings (default 1800 seconds)
-            import_settings = self.config.get('import_settings', {})
-            timeout_val = import_settings.get('time_out', 1800)
-            stdout, stderr = process.communicate(timeout=timeout_val)
-            print("Output:")
-            print(stdout)
-            if stderr:
-                print("Errors:")
-                print(stderr)
-            return_code = process.returncode
+            result = self.run_loader(java_command, log_dir, timeout_val, import_config['name'], own_process=bool(import_config.get('jvm_options')))
+            if result.timed_out:
+                print(f"Process timed out after {timeout_val} seconds")
+                self.log_failure(import_config, f"Process timed out after {timeout_val} seconds", start_time)
+                self.record_invocation(import_config, 'failure', import_path_full, start_time=start_time,
+                                       description=f"Process timed out after {timeout_val} seconds")
+                return False
+            stderr = result.stderr
+            return_code = result.return_code
             print(f"Process completed with return code: {return_code}")
-            # Check if stdout contains more than the standard header
-            expected_header = "Vault Loader. (c)Veeva Systems 2014-2021. All rights reserved."
-            error_detected = False
-            if stdout and stdout.strip() != expected_header:
-                additional_output = stdout.strip()
-                if additional_output.startswith(expected_header):
-                    remaining_output = additional_output[len(expected_header):].strip()
-                    if remaining_output:
-                        print(f"Warning: Additional output detected: {remaining_output}")
-                        self.log_failure(import_config, f"Additional output: {remaining_output}")
-                        error_detected = True
-                elif additional_output != expected_header:
+            if result.killed_on_marker:
+                print(f"Warning: Process stopped on fatal output: {result.failure_line}")
+            # Anything on stdout besides the Vault Loader header counts as an error (flags set while streaming)
+            failure_description = None
+            if result.extra_stdout_lines:
+                additional_output = '\n'.join(line for line in result.stdout_tail if line.strip() != LOADER_HEADER).strip()
+                if result.header_seen:
+                    print(f"Warning: Additional output detected: {additional_output}")
+                    failure_description = f"Additional output: {additional_output}"
+                else:
                     print(f"Warning: Unexpected output: {additional_output}")
-                    self.log_failure(import_config, f"Unexpected output: {additional_output}")
-                    error_detected = True
+                    failure_description = f"Unexpected output: {additional_output}"
+            error_detected = failure_description is not None
             # If import was successful, log it
             if return_code == 0 and not error_detected:
-                self.log_success(import_config)
+                self.log_success(import_config, start_time, import_path_full)
             else:
-                self.log_failure(import_config, stderr or "Unknown error")
+                self.log_failure(import_config, failure_description or stderr or "Unknown error", start_time)
             # --- Post-import file management ---
             # Prepare destination folder name from DNS
             import_settings = self.config.get('import_settings', {})
@@ -291,43 +335,90 @@ class VaultImportRunner:
             dns_folder = dns.replace('https://', '').replace('/', '_')
             dest_folder = os.path.join(self.script_dir, 'imports', dns_folder)
             os.makedirs(dest_folder, exist_ok=True)
-            # Copy imported CSV file
-            if import_path_full and os.path.exists(import_path_full):
+            # Copy imported CSV file (chunk files are not archived, their logs stay in work_dir)
+            if archive_loader_file and import_path_full and os.path.exists(import_path_full):
                 shutil.copy2(import_path_full, dest_folder)
                 print(f"Copied imported file to {dest_folder}")
-            # Move and rename Java log file if present
-            # Find log file in working directory matching *_FAILURE.csv or *_SUCCESS.csv
-            log_candidates = [f for f in os.listdir(self.script_dir) if f.upper().endswith('_FAILURE.CSV') or f.upper().endswith('_SUCCESS.CSV')]
+            if work_dir:
+                dest_folder = work_dir
+            # Move and rename the Java log files written by this process
+            # (new or changed *_FAILURE.csv / *_SUCCESS.csv in the working directory)
+            log_candidates = [
+                f for f in os.listdir(log_dir)
+                if self.is_result_log(f) and existing_logs.get(f) != os.path.getmtime(os.path.join(log_dir, f))
+            ]
+            import_base = os.path.splitext(os.path.basename(import_path_full))[0] if import_path_full else 'import'
+            result_logs = {}
+            if log_candidates:
+                # Logs of an earlier run of this loader file are replaced, not mixed with the new ones
+                for status in ('_SUCCESS.csv', '_FAILURE.csv'):
+                    stale_log = os.path.join(dest_folder, import_base + status)
+                    if os.path.exists(stale_log):
+                        os.remove(stale_log)
             for log_file in log_candidates:
-                log_path = os.path.join(self.script_dir, log_file)
+                log_path = os.path.join(log_dir, log_file)
                 # Determine new log file name: use import file name (without extension) + STATUS
                 status = '_FAILURE.csv' if log_file.upper().endswith('_FAILURE.CSV') else '_SUCCESS.csv'
-                import_base = os.path.splitext(os.path.basename(import_path_full))[0] if import_path_full else 'import'
                 new_log_name = import_base + status
                 new_log_path = os.path.join(dest_folder, new_log_name)
-                shutil.move(log_path, new_log_path)
+                replace_file(log_path, new_log_path)
+                result_logs[status] = new_log_path
                 # Print file path in blue
                 BLUE = '\033[94m'
                 RESET = '\033[0m'
                 print(f"Moved and renamed log file to: {BLUE}{new_log_path}{RESET}")
-            return return_code == 0 and not error_detected
+            succeeded = return_code == 0 and not error_detected
+            self.record_invocation(
+                import_config,
+                'success' if succeeded else 'failure',
+                import_path_full,
+                success_log=result_logs.get('_SUCCESS.csv'),
+                failure_log=result_logs.get('_FAILURE.csv'),
+                return_code=return_code,
+                start_time=start_time
+            )
+            return succeeded
         except KeyboardInterrupt:
-            process.kill()
             print("\nImport interrupted by user.")
-            self.log_failure(import_config, "Import interrupted by user")
-            return False
-        except subprocess.TimeoutExpired:
-            process.kill()
-            print(f"Process timed out after {timeout_val} seconds")
-            self.log_failure(import_config, f"Process timed out after {timeout_val} seconds")
+            self.log_failure(import_config, "Import interrupted by user", start_time)
+            self.record_invocation(import_config, 'failure', import_path_full, start_time=start_time,
+                                   description="Import interrupted by user")
             return False
         except Exception as e:
             print(f"Error running process: {e}")
-            self.log_failure(import_config, f"Error running process: {e}")
+            self.log_failure(import_config, f"Error running process: {e}", start_time)
+            self.record_invocation(import_config, 'failure', import_path_full, start_time=start_time,
+                                   description=f"Error running process: {e}")
             return False
+        finally:
+            if work_dir is None:
+                shutil.rmtree(log_dir, ignore_errors=True)
+
+    def is_result_log(self, file_name):
+        """Return True for Vault Loader result logs (*_SUCCESS.csv / *_FAILURE.csv)"""
+        upper = file_name.upper()
+        return upper.endswith('_FAILURE.CSV') or upper.endswith('_SUCCESS.CSV')
+
+    def record_invocation(self, import_config, status, loader_file=None, success_log=None, failure_log=None,
+                          return_code=None, start_time=None, description=None):
+        """Record one VaultDataLoader invocation and the exact paths of its result logs in the run manifest"""
+        _, object_name, _ = self.get_import_action_and_object(import_config)
+        self.manifest.add_entry(
+            name=import_config['name'],
+            object_name=object_name,
+            run_timestamp=self.run_timestamp,
+            status=status,
+            loader_file=loader_file,
+            success_log=success_log,
+            failure_log=failure_log,
+            return_code=return_code,
+            start_time=start_time,
+            end_time=datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            description=description
+        )
     
-    def log_success(self, import_config):
-        """Log successful import to logs/success directory"""
+    def log_success(self, import_config, start_time=None, loader_file=None):
+        """Record a successful import (and the size of its loader file) in the run ledger"""
         try:
             # Extract CSV filename and object name from params
             params_str = import_config['params']
@@ -348,28 +439,15 @@ class VaultImportRunner:
                 print("Warning: Could not extract filename or object name for success log")
                 return
             
-            # Create success log file path with run timestamp
-            log_file = os.path.join(self.script_dir, 'logs', 'success', f'success_{self.run_timestamp}.csv')
-            
-            # Check if file exists to determine if we need headers
-            file_exists = os.path.exists(log_file)
-            
-            # Write to log file
-            with open(log_file, 'a', newline='', encoding='utf-8') as f:
-                writer = csv.writer(f)
-                
-                # Write header if file is new
-                if not file_exists:
-                    writer.writerow(['file_name', 'object_name', 'row_count', 'timestamp'])
-                
-                # Write success record
-                writer.writerow([csv_filename, object_name, 'N/A', datetime.now().strftime("%Y-%m-%d %H:%M:%S")])
+            byte_size = os.path.getsize(loader_file) if loader_file and os.path.exists(loader_file) else None
+            self.ledger.record_job(import_config['name'], 'success', object_name=object_name, file_name=csv_filename,
+                                   byte_size=byte_size, start_time=start_time)
                 
         except Exception as e:
             print(f"Error logging success: {e}")
     
-    def log_failure(self, import_config, failure_description):
-        """Log failed import to logs/failure directory"""
+    def log_failure(self, import_config, failure_description, start_time=None):
+        """Record a failed import in the run ledger"""
         try:
             # Extract object name
             params = import_config['params'].split()
@@ -383,26 +461,785 @@ class VaultImportRunner:
             if not object_name:
                 object_name = "Unknown"
             
-            # Create failure log file path with run timestamp
-            log_file = os.path.join(self.script_dir, 'logs', 'failure', f'failure_{self.run_timestamp}.csv')
-            
-            # Check if file exists to determine if we need headers
-            file_exists = os.path.exists(log_file)
-            
-            # Write to log file
-            with open(log_file, 'a', newline='', encoding='utf-8') as f:
-                writer = csv.writer(f)
-                
-                # Write header if file is new
-                if not file_exists:
-                    writer.writerow(['name', 'object_name', 'failure_description', 'timestamp'])
-                
-                # Write failure record
-                writer.writerow([import_config['name'], object_name, failure_description, datetime.now().strftime("%Y-%m-%d %H:%M:%S")])
+            self.ledger.record_job(import_config['name'], 'failure', object_name=object_name, start_time=start_time,
+                                   failure_description=failure_description)
                 
         except Exception as e:
             print(f"Error logging failure: {e}")
     
+    def get_execution_mode(self):
+        """
+        Return general.execution_mode: 'process' (one java -jar per job, default) or 'worker' (warm JVM pool).
+
+        'worker' falls back to 'process' on Java versions the worker does not support (see worker_java_supported).
+        """
+        general = self.config.get('general', {})
+        mode = str(general.get('execution_mode', 'process')).lower()
+        if mode not in EXECUTION_MODES:
+            print(f"Warning: Unknown execution_mode '{mode}' (use {', '.join(EXECUTION_MODES)}), using 'process'")
+            return 'process'
+        if mode == 'worker' and not worker_java_supported(general.get('java_exe', 'java')):
+            return 'process'
+        return mode
+
+    def get_worker_pool(self):
+        """Return the warm JVM worker pool of this run (created on first use), or None in 'process' mode"""
+        if self.get_execution_mode() != 'worker':
+            return None
+        with self.pool_lock:
+            if self.worker_pool is None:
+                general = self.config['general']
+                vault_loader = general['vault_loader']
+                if not os.path.isabs(vault_loader):
+                    vault_loader = os.path.join(self.script_dir, vault_loader)
+                size = general.get('worker_pool_size', self.get_max_parallel_imports())
+                print(f"♨️ Using up to {size} warm VaultDataLoader worker JVM(s)")
+                self.worker_pool = LoaderWorkerPool(
+                    general['java_exe'], vault_loader, int(size), self.get_work_root(), self.script_dir,
+                    jvm_options=build_jvm_options(general)
+                )
+            return self.worker_pool
+
+    def close_worker_pool(self):
+        """Stop the worker JVMs of this run"""
+        with self.pool_lock:
+            if self.worker_pool is not None:
+                self.worker_pool.close()
+                self.worker_pool = None
+
+    def run_loader(self, java_command, cwd, timeout, label, own_process=False):
+        """
+        Run a VaultDataLoader command in a warm worker JVM or as its own process; returns a LoaderProcessResult.
+
+        Jobs with their own JVM options (own_process) always get a separate process.
+        """
+        general = self.config['general']
+        options = dict(
+            timeout=timeout,
+            label=label,
+            failure_markers=general.get('failure_markers', DEFAULT_FAILURE_MARKERS),
+            fatal_markers=general.get('fatal_markers'),
+            buffer_lines=general.get('output_buffer_lines', DEFAULT_BUFFER_LINES)
+        )
+        pool = None if own_process else self.get_worker_pool()
+        xmx_mb = get_xmx_mb(java_command[:java_command.index('-jar')])
+        gc_log = None
+        if pool is None and general.get('auto_jvm_sizing', True):
+            # The GC log tells how much heap the job really used (RSS also contains the unused part of -Xmx)
+            java_command, gc_log = add_gc_log(java_command, cwd)
+        run = pool.run if pool is not None else run_loader_process
+        if self.memory_admission is not None:
+            # Start the job only when its expected peak fits into the free memory of the host
+            expected_mb = expected_job_memory_mb(
+                self.job_history.get(label), xmx_mb, general.get('default_job_memory_mb', DEFAULT_JOB_MEMORY_MB)
+            )
+            ticket = self.memory_admission.acquire(expected_mb, label)
+            start = time.monotonic()
+            try:
+                result = run(java_command, cwd, on_start=lambda pid: self.memory_admission.set_pid(ticket, pid), **options)
+            finally:
+                self.memory_admission.release(ticket)
+        else:
+            start = time.monotonic()
+            result = run(java_command, cwd, **options)
+        duration = time.monotonic() - start
+        heap_used_mb = read_gc_log_heap_mb(gc_log)
+        if gc_log and os.path.exists(gc_log):
+            os.remove(gc_log)
+        if result.peak_rss_mb is not None:
+            heap_text = f", heap used {heap_used_mb} MB" if heap_used_mb is not None else ""
+            print(f"[{label}] Peak RSS {result.peak_rss_mb} MB{heap_text}, CPU {result.cpu_seconds} s")
+        self.job_history.record(label, result, duration, xmx_mb, heap_used_mb)
+        self.ledger.record_attempt(label, result, duration, xmx_mb)
+        return result
+
+    def start_ledger(self):
+        """Open this run in the ledger; called when a batch starts, so leaving the menu records no unfinished run"""
+        if self.ledger.run_id is None:
+            self.ledger.start_run('import', self.run_timestamp, config_file=self.manifest.data['config_file'],
+                                  dns=self.manifest.data['dns'])
+
+    def finish_ledger(self):
+        """Mark the run as finished in the ledger; with general.csv_logs the success/failure CSV logs are written too"""
+        self.ledger.finish_run()
+        if not self.config.get('general', {}).get('csv_logs', False):
+            print(f"📒 Run ledger: {self.ledger.ledger_file} (CSV logs: python run_ledger.py export-csv {self.run_timestamp} --type import)")
+            return
+        connection = connect_ledger(self.ledger.ledger_file)
+        try:
+            for log_file in export_csv_logs(connection, self.ledger.run_id, os.path.join(self.script_dir, 'logs')):
+                print(f"📁 Log file written: {log_file}")
+        finally:
+            connection.close()
+
+    def get_job_history(self, name):
+        """
+        Return the recorded runs of a job for automatic -Xmx/GC sizing.
+
+        Only jobs that get their own JVM are sized; warm workers share one heap.
+        """
+        if self.get_execution_mode() != 'process':
+            return None
+        return self.job_history.get(name)
+
+    def get_auto_parallel(self):
+        """Return the concurrency for max_parallel_imports = "auto" (see memory_admission.auto_parallel_limit)"""
+        general = self.config.get('general', {})
+        ceiling = general.get('max_parallel_ceiling', DEFAULT_PARALLEL_CEILING)
+        try:
+            ceiling = max(1, int(ceiling))
+        except (TypeError, ValueError):
+            print(f"Warning: Invalid max_parallel_ceiling '{ceiling}', using {DEFAULT_PARALLEL_CEILING}")
+            ceiling = DEFAULT_PARALLEL_CEILING
+        admission = self.memory_admission is not None
+        return auto_parallel_limit(
+            ceiling,
+            general.get('memory_reserve_mb', DEFAULT_MEMORY_RESERVE_MB),
+            general.get('default_job_memory_mb', DEFAULT_JOB_MEMORY_MB),
+            admission
+        )
+
+    def get_max_parallel_imports(self):
+        """Return the number of concurrent VaultDataLoader imports (general.max_parallel_imports, "auto": from the free memory)"""
+        value = self.config.get('general', {}).get('max_parallel_imports', 1)
+        if value == 'auto':
+            return self.get_auto_parallel()
+        try:
+            return max(1, int(value))
+        except (TypeError, ValueError):
+            print(f"Warning: Invalid max_parallel_imports '{value}', running imports sequentially")
+            return 1
+
+    def get_import_folder(self):
+        """Return imports/<dns>/, where loader files and their result logs are kept after an import"""
+        dns_folder = self.config.get('import_settings', {}).get('dns', '').replace('https://', '').replace('/', '_')
+        return os.path.join(self.script_dir, 'imports', dns_folder)
+
+    def get_work_root(self):
+        """Return the root folder for per-job working directories (general.work_root, default work/)"""
+        work_root = self.config.get('general', {}).get('work_root', DEFAULT_WORK_ROOT)
+        if not os.path.isabs(work_root):
+            work_root = os.path.join(self.script_dir, work_root)
+        return work_root
+
+    def get_chunk_rows(self, import_config):
+        """Return the chunk size in rows for an import (per import or import_settings.chunk_rows), 0 = no chunking"""
+        value = import_config.get('chunk_rows', self.config.get('import_settings', {}).get('chunk_rows', 0))
+        try:
+            return max(0, int(value or 0))
+        except (TypeError, ValueError):
+            print(f"Warning: Invalid chunk_rows '{value}', importing the file in one piece")
+            return 0
+
+    def get_chunk_parallel(self, import_config):
+        """Return how many chunks of one loader file are imported at the same time (1 = sequential)"""
+        value = import_config.get('chunk_parallel', self.config.get('import_settings', {}).get('chunk_parallel', 1))
+        try:
+            return max(1, int(value))
+        except (TypeError, ValueError):
+            print(f"Warning: Invalid chunk_parallel '{value}', importing chunks sequentially")
+            return 1
+
+    def run_chunked_import(self, import_config):
+        """
+        Split a loader file into chunk_rows-row chunks and import them as separate jobs.
+
+        Every chunk runs in its own working directory under work/, so chunks can run
+        in parallel without mixing up their result logs. Afterwards the per-chunk
+        *_SUCCESS.csv / *_FAILURE.csv logs are merged into one pair in imports/<dns>/.
+        """
+        loader_file = self.resolve_import_file(import_config)
+        if not loader_file or not os.path.exists(loader_file):
+            print(f"❌ Warning: Import file does not exist: {loader_file}")
+            self.log_failure(import_config, f"Import file not found: {loader_file}")
+            return False
+
+        chunk_rows = self.get_chunk_rows(import_config)
+        start_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        loader_base = os.path.splitext(os.path.basename(loader_file))[0]
+        chunk_root = create_work_dir(self.get_work_root(), f"{import_config['name']}_chunks")
+        chunk_files = split_csv(loader_file, chunk_root, chunk_rows, prefix=loader_base)
+        if len(chunk_files) <= 1:
+            # Small enough for a single VaultDataLoader run
+            shutil.rmtree(chunk_root, ignore_errors=True)
+            return self.run_java_command(dict(import_config, chunk_rows=0))
+
+        max_parallel = min(self.get_chunk_parallel(import_config), len(chunk_files))
+        print(f"✂️ Split {os.path.basename(loader_file)} into {len(chunk_files)} chunks of up to {chunk_rows} rows"
+              f" ({'up to ' + str(max_parallel) + ' in parallel' if max_parallel > 1 else 'sequential'})")
+
+        chunk_dirs = {}
+
+        def run_chunk(index, chunk_file):
+            chunk_config = dict(import_config, name=f"{import_config['name']}_part{index:03d}")
+            work_dir = create_work_dir(chunk_root, f"part{index:03d}", self.script_dir)
+            chunk_dirs[index] = work_dir
+            return self.run_java_command(chunk_config, loader_file=chunk_file, work_dir=work_dir)
+
+        chunks = list(enumerate(chunk_files, 1))
+        if max_parallel <= 1:
+            results = [run_chunk(index, chunk_file) for index, chunk_file in chunks]
+        else:
+            with ThreadPoolExecutor(max_workers=max_parallel) as executor:
+                results = list(executor.map(lambda chunk: run_chunk(*chunk), chunks))
+
+        # Merge the chunk logs into one SUCCESS/FAILURE pair named after the loader file
+        dest_folder = self.get_import_folder()
+        os.makedirs(dest_folder, exist_ok=True)
+        shutil.copy2(loader_file, dest_folder)
+        print(f"Copied imported file to {dest_folder}")
+        merged_logs = {}
+        for status in ('_SUCCESS.csv', '_FAILURE.csv'):
+            chunk_logs = []
+            for index, chunk_file in chunks:
+                chunk_base = os.path.splitext(os.path.basename(chunk_file))[0]
+                chunk_logs.append(os.path.join(chunk_dirs.get(index, chunk_root), chunk_base + status))
+            merged_path = os.path.join(dest_folder, loader_base + status)
+            if os.path.exists(merged_path):
+                # Replace the result of an earlier run of this loader file
+                os.remove(merged_path)
+            merged = merge_csv_files(chunk_logs, merged_path)
+            if merged:
+                merged_logs[status] = merged_path
+                BLUE = '\033[94m'
+                RESET = '\033[0m'
+                print(f"Merged {merged} chunk log(s) into: {BLUE}{merged_path}{RESET}")
+        shutil.rmtree(chunk_root, ignore_errors=True)
+
+        succeeded = sum(1 for result in results if result)
+        print(f"✂️ Chunks imported without errors: {succeeded}/{len(chunk_files)}")
+        self.record_invocation(
+            import_config,
+            'success' if succeeded == len(chunk_files) else 'failure',
+            loader_file,
+            success_log=merged_logs.get('_SUCCESS.csv'),
+            failure_log=merged_logs.get('_FAILURE.csv'),
+            description=f"{len(chunk_files)} chunks, {succeeded} without errors"
+        )
+        # The whole loader file as one job, so its duration can be predicted for the next run
+        if succeeded == len(chunk_files):
+            self.log_success(import_config, start_time, loader_file)
+        else:
+            self.log_failure(import_config, f"{len(chunk_files) - succeeded} of {len(chunk_files)} chunks with errors", start_time)
+        return succeeded == len(chunk_files)
+
+    def get_import_action_and_object(self, import_config):
+        """Extract (action, object_name, csv_filename) from the import params"""
+        params = import_config['params'].split()
+        action = None
+        object_name = None
+        csv_filename = None
+        for i, param in enumerate(params):
+            if param in ('-create', '-update', '-upsert', '-delete', '-import') and i + 1 < len(params):
+                action = param[1:]
+                object_name = params[i + 1]
+            elif param == '-csv' and i + 1 < len(params):
+                csv_filename = params[i + 1]
+        return action, object_name, csv_filename
+
+    def resolve_import_file(self, import_config):
+        """Return the full path of the loader file of an import (import_settings.import_path + -csv), or None"""
+        if import_config['name'] in self.loader_overrides:
+            return self.loader_overrides[import_config['name']]
+        _, _, csv_filename = self.get_import_action_and_object(import_config)
+        if not csv_filename:
+            return None
+        base_import_path = self.config.get('import_settings', {}).get('import_path', '')
+        if not base_import_path:
+            return csv_filename if os.path.isabs(csv_filename) else os.path.join(self.script_dir, csv_filename)
+        if not os.path.isabs(base_import_path):
+            base_import_path = os.path.abspath(os.path.join(self.script_dir, base_import_path))
+        return os.path.join(base_import_path, csv_filename)
+
+    def read_loader_header(self, loader_file):
+        """Return the header row of a loader file, or [] if it cannot be read"""
+        try:
+            with open(loader_file, 'r', encoding='utf-8-sig', newline='') as f:
+                return next(csv.reader(f), [])
+        except Exception:
+            return []
+
+    def build_import_dependencies(self, imports):
+        """
+        Derive the dependency DAG of the given imports from their loader file headers.
+
+        A column 'field.attribute' (or a plain column named like an object) depends on
+        the earlier import that produces that object. Field names that differ from the
+        object name can be mapped with import_settings.reference_objects, and explicit
+        dependencies can be added per import with 'depends_on'. Imports of the same
+        object keep their list order. A 'field.attribute' column whose field is neither
+        mapped nor the name of an imported object may point to any object, so its import
+        depends on all earlier imports (list order). Returns {import name: set of import names}.
+        """
+        reference_objects = self.config.get('import_settings', {}).get('reference_objects', {})
+        dependencies = {}
+        producers = {}  # object name -> names of earlier imports producing it
+        names = {import_config['name'] for import_config in imports}
+        imported_objects = {self.get_import_action_and_object(import_config)[1] for import_config in imports}
+        earlier = []
+        for import_config in imports:
+            name = import_config['name']
+            _, object_name, _ = self.get_import_action_and_object(import_config)
+            # Explicit dependencies on imports that are not part of this run are already loaded
+            deps = {dep for dep in import_config.get('depends_on', []) if dep in names and dep != name}
+
+            # Same object: keep the configured order (e.g. parent organisations first)
+            if object_name in producers:
+                deps.add(producers[object_name][-1])
+
+            loader_file = self.resolve_import_file(import_config)
+            header = self.read_loader_header(loader_file) if loader_file else []
+            unresolved = []
+            for column in header:
+                column = column.strip()
+                if column.lower().startswith('ignore.') or column.lower().startswith('ingnore.'):
+                    continue
+                field = column.split('.', 1)[0]
+                if '.' in column and field not in reference_objects and field not in imported_objects:
+                    if field not in unresolved:
+                        unresolved.append(field)
+                    continue
+                referenced = reference_objects.get(field, field)
+                if referenced != object_name and referenced in producers:
+                    deps.update(producers[referenced])
+
+            if unresolved:
+                # The referenced object is unknown, so the import keeps its sequential position
+                print(f"⚠️ {name}: reference field(s) {', '.join(unresolved)} not mapped in "
+                      "import_settings.reference_objects, importing after all earlier imports")
+                deps.update(earlier)
+
+            dependencies[name] = deps
+            producers.setdefault(object_name, []).append(name)
+            earlier.append(name)
+        return dependencies
+
+    def get_preflight_mode(self):
+        """Return import_settings.preflight: 'off' (default), 'report' or 'quarantine'"""
+        mode = str(self.config.get('import_settings', {}).get('preflight', 'off')).lower()
+        if mode not in PREFLIGHT_MODES:
+            print(f"Warning: Unknown preflight mode '{mode}' (use {', '.join(PREFLIGHT_MODES)}), pre-flight check disabled")
+            return 'off'
+        return mode
+
+    def run_preflight(self, imports):
+        """
+        Check the loader files of the given imports against the latest target vault export.
+
+        Every 'field.attribute' column is looked up in a hash set of the attribute values
+        exported for the referenced object (exports/<dns>/, newest export manifest first),
+        extended by the values created by earlier imports of this run. Duplicate values in
+        the key columns (preflight_key_columns plus preflight_object_key_columns of the
+        object) are reported as well. The loader files are streamed, never loaded as a whole.
+        Bad rows are written to imports/<dns>/preflight/<loader>_PREFLIGHT.csv; in
+        'quarantine' mode they are also removed from the file that is imported.
+        Returns {import name: number of bad rows}.
+        """
+        mode = self.get_preflight_mode()
+        if mode == 'off':
+            return {}
+        import_settings = self.config.get('import_settings', {})
+        reference_objects = import_settings.get('reference_objects', {})
+        key_columns = import_settings.get('preflight_key_columns', DEFAULT_KEY_COLUMNS)
+        object_key_columns = import_settings.get('preflight_object_key_columns', {})
+        dns_folder = import_settings.get('dns', '').replace('https://', '').replace('/', '_')
+        export_folder = os.path.join(self.script_dir, 'exports', dns_folder)
+        manifest_dir = os.path.join(self.script_dir, 'logs', 'manifest')
+        report_folder = os.path.join(self.get_import_folder(), 'preflight')
+
+        print(f"🛫 Pre-flight check ({mode}) against exports in {export_folder}")
+        export_values = {}  # (object, attribute) -> set of values in the target vault, None if not exported
+        produced = {}  # object -> loader files of earlier imports creating it
+        results = {}
+        for import_config in imports:
+            name = import_config['name']
+            action, object_name, _ = self.get_import_action_and_object(import_config)
+            loader_file = self.resolve_import_file(import_config)
+            if not loader_file or not os.path.exists(loader_file):
+                continue
+            records = iter_csv_records(loader_file)
+            header = next(records, [])
+            records.close()
+
+            reference_indexes = {}
+            for column in header:
+                if '.' not in column or column.lower().startswith(('ignore.', 'ingnore.')):
+                    continue
+                field, attribute = column.split('.', 1)
+                referenced = reference_objects.get(field, field)
+                key = (referenced, attribute)
+                if key not in export_values:
+                    files = find_export_files(export_folder, referenced, manifest_dir)
+                    values = [read_column_values(f, attribute) for f in files]
+                    values = [v for v in values if v is not None]
+                    export_values[key] = set().union(*values) if values else None
+                index = export_values[key]
+                run_values = [read_column_values(f, attribute) for f in produced.get(referenced, [])]
+                run_values = [v for v in run_values if v is not None]
+                if index is None and not run_values:
+                    print(f"   {name}: no export of {referenced}, column {column} not checked")
+                    continue
+                reference_indexes[column] = (index or set()).union(*run_values)
+
+            checked_keys = list(key_columns) + [c for c in object_key_columns.get(object_name, []) if c not in key_columns]
+            duplicate_keys = find_duplicate_keys(loader_file, checked_keys)
+            loader_base = os.path.splitext(os.path.basename(loader_file))[0]
+            report_file = os.path.join(report_folder, f"{loader_base}_PREFLIGHT.csv")
+            clean_file = None
+            if mode == 'quarantine':
+                clean_folder = create_work_dir(self.get_work_root(), f"{name}_preflight")
+                clean_file = os.path.join(clean_folder, os.path.basename(loader_file))
+            total_rows, bad_rows, counts = self.write_preflight_files(
+                loader_file, reference_indexes, duplicate_keys, report_file + '.tmp', clean_file)
+            results[name] = bad_rows
+            if bad_rows:
+                print(f"⚠️ {name}: {bad_rows} of {total_rows} row(s) would fail")
+                for message, rows in counts.items():
+                    print(f"   - {message}: {rows} row(s)")
+                os.replace(report_file + '.tmp', report_file)
+                print(f"   Rows written to: {report_file}")
+                if clean_file:
+                    self.loader_overrides[name] = clean_file
+                    print(f"   Quarantined, importing the remaining {total_rows - bad_rows} row(s)")
+            else:
+                print(f"✅ {name}: {total_rows} row(s) passed")
+                for stale in (report_file + '.tmp', report_file):
+                    if os.path.exists(stale):
+                        os.remove(stale)
+                if clean_file:
+                    shutil.rmtree(os.path.dirname(clean_file), ignore_errors=True)
+
+            if action in ('create', 'upsert'):
+                produced.setdefault(object_name, []).append(self.resolve_import_file(import_config))
+        print("-" * 80)
+        return results
+
+    def write_preflight_files(self, loader_file, reference_indexes, duplicate_keys, report_file, clean_file=None):
+        """
+        Stream a loader file once, writing bad rows to report_file and, if given, good rows to clean_file.
+
+        Returns (total rows, bad rows, {check: number of rows}).
+        """
+        os.makedirs(os.path.dirname(report_file), exist_ok=True)
+        counts = {}
+        total_rows = bad_rows = 0
+        records = iter_csv_records(loader_file)
+        with open(report_file, 'w', encoding='utf-8', newline='') as report_out, \
+                open(clean_file or os.devnull, 'w', encoding='utf-8', newline='') as clean_out:
+            report_writer = csv.writer(report_out, lineterminator='\n')
+            clean_writer = csv.writer(clean_out, lineterminator='\n')
+            header = next(records, [])
+            report_writer.writerow(['preflight_errors'] + header)
+            clean_writer.writerow(header)
+            for record in records:
+                total_rows += 1
+                errors = check_loader_row(dict(zip(header, record)), reference_indexes, duplicate_keys)
+                if errors:
+                    bad_rows += 1
+                    for message in errors:
+                        counts[message] = counts.get(message, 0) + 1
+                    report_writer.writerow(['; '.join(errors)] + record)
+                else:
+                    clean_writer.writerow(record)
+        return total_rows, bad_rows, counts
+
+    def evaluate_import_result(self, import_config):
+        """Look up the result logs of an import in the run manifest; return (status, file) with status 'success' or 'failure'"""
+        entry = self.manifest.find_entry(import_config['name'])
+        matched_success = entry.get('success_log') if entry else None
+        matched_failure = entry.get('failure_log') if entry else None
+        # Decide result for this import
+        if matched_failure:
+            print("Failure file detected:")
+            print("-", matched_failure)
+            return 'failure', matched_failure
+        elif matched_success:
+            print("Success file detected (no failure file): Import counted as successful.")
+            print("-", matched_success)
+            return 'success', matched_success
+        else:
+            print("No failure or success file detected: Import counted as failed.")
+            loader_file = entry.get('loader_file') if entry else None
+            return 'failure', loader_file or import_config.get('name')
+
+    def predict_imports(self, imports):
+        """Return {name: (predicted seconds, has history)} from the run ledger and the loader file sizes"""
+        model = RuntimeModel(self.ledger.ledger_file, 'import')
+        predictions = {}
+        for import_config in imports:
+            loader_file = self.resolve_import_file(import_config)
+            byte_size = os.path.getsize(loader_file) if loader_file and os.path.exists(loader_file) else None
+            predictions[import_config['name']] = model.predict(import_config['name'], byte_size)
+        return predictions
+
+    def get_critical_path_seconds(self, dependencies, predictions):
+        """
+        Return {name: predicted seconds of the import plus its longest chain of dependent imports}.
+
+        Starting the ready import with the longest remaining chain first is
+        longest-processing-time-first scheduling that also respects the dependency order.
+        """
+        dependents = {name: [] for name in dependencies}
+        for name, deps in dependencies.items():
+            for dep in deps:
+                if dep in dependents:
+                    dependents[dep].append(name)
+        chain = {}
+
+        def longest(name, visiting=()):
+            if name not in chain:
+                if name in visiting:
+                    return 0.0
+                tail = max((longest(dependent, visiting + (name,)) for dependent in dependents[name]), default=0.0)
+                chain[name] = predictions.get(name, (0.0, False))[0] + tail
+            return chain[name]
+
+        for name in dependencies:
+            longest(name)
+        return chain
+
+    def run_imports_parallel(self, active_imports, max_parallel, predictions=None, progress=None):
+        """
+        Run imports concurrently as soon as all imports they depend on have succeeded.
+
+        Of the ready imports the one with the longest predicted chain of work starts first.
+        After an import with a failure file the user is asked whether to go on; on 'n'
+        no further import is started (status 'aborted'), running ones are finished.
+        """
+        dependencies = self.build_import_dependencies(active_imports)
+        by_name = {import_config['name']: import_config for import_config in active_imports}
+        pending = [import_config['name'] for import_config in active_imports]
+        results = {}  # name -> (status, file); status 'success', 'failure' or 'blocked'
+        predictions = predictions or {}
+        priority = self.get_critical_path_seconds(dependencies, predictions)
+
+        print("🔗 Import dependencies:")
+        for name in pending:
+            deps = dependencies[name]
+            estimate = f" (~{format_duration(predictions[name][0])})" if name in predictions else ""
+            print(f"   {name}{estimate} <- {', '.join(sorted(deps)) if deps else '(none)'}")
+
+        def run_one(import_config):
+            if progress:
+                progress.start(import_config['name'])
+            self.run_java_command(import_config)
+            return self.evaluate_import_result(import_config)
+
+        with ThreadPoolExecutor(max_workers=max_parallel) as executor:
+            running = {}
+            while pending or running:
+                # Imports whose dependency failed are not started
+                for name in list(pending):
+                    failed = [dep for dep in dependencies[name] if dep in results and results[dep][0] != 'success']
+                    if failed:
+                        pending.remove(name)
+                        results[name] = ('blocked', by_name[name].get('name'))
+                        if progress:
+                            progress.drop(name)
+                        print(f"⛔ Not starting '{name}': depends on failed import(s) {', '.join(failed)}")
+                        self.log_failure(by_name[name], f"Blocked by failed import(s): {', '.join(failed)}")
+
+                ready = [name for name in pending if all(results.get(dep, ('',))[0] == 'success' for dep in dependencies[name])]
+                ready.sort(key=lambda name: priority.get(name, 0.0), reverse=True)
+                for name in ready:
+                    if len(running) >= max_parallel:
+                        break
+                    pending.remove(name)
+                    print(f"\n▶️ Starting import ({len(results) + len(running) + 1}/{len(active_imports)}): {name}")
+                    running[executor.submit(run_one, by_name[name])] = name
+
+                if not running:
+                    # Dependencies on imports outside this run can never be satisfied
+                    for name in pending:
+                        results[name] = ('blocked', name)
+                        if progress:
+                            progress.drop(name)
+                        print(f"⛔ Not starting '{name}': unresolved dependencies {', '.join(sorted(dependencies[name]))}")
+                        self.log_failure(by_name[name], "Unresolved import dependencies")
+                    pending = []
+                    break
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = running.pop(future)
+                    try:
+                        results[name] = future.result()
+                    except Exception as e:
+                        print(f"Error running import '{name}': {e}")
+                        self.log_failure(by_name[name], f"Error running import: {e}")
+                        results[name] = ('failure', name)
+                    status = "✅" if results[name][0] == 'success' else "❌"
+                    print(f"{status} Finished import: {name}")
+                    if progress:
+                        progress.finish(name)
+                        print(progress.eta_line())
+                    print("-" * 40)
+                    result_file = results[name][1]
+                    if pending and results[name][0] == 'failure' and result_file and result_file.endswith('_FAILURE.csv'):
+                        # Same question as in sequential mode; running imports go on while it is open
+                        while True:
+                            proceed = input("Proceed with next imports? (y/n): ").strip().lower()
+                            if proceed in ('y', 'n'):
+                                break
+                            print("Please enter 'y' for yes or 'n' for no.")
+                        if proceed == 'n':
+                            print(f"Aborted by user, {len(pending)} import(s) not started"
+                                  f"{', waiting for ' + str(len(running)) + ' running import(s)' if running else ''}.")
+                            for pending_name in pending:
+                                results[pending_name] = ('aborted', pending_name)
+                                if progress:
+                                    progress.drop(pending_name)
+                            pending = []
+
+        return [results[import_config['name']] for import_config in active_imports]
+
+    def get_max_retry_passes(self):
+        """Return how often failed rows are re-imported (import_settings.max_retry_passes)"""
+        value = self.config.get('import_settings', {}).get('max_retry_passes', 3)
+        try:
+            return max(1, int(value))
+        except (TypeError, ValueError):
+            print(f"Warning: Invalid max_retry_passes '{value}', using 1")
+            return 1
+
+    def write_retry_loader_file(self, failure_file, header, retry_file):
+        """
+        Write the rows of a Vault Loader failure log as a loader file with the given header.
+
+        The 'errors' column added by Vault Loader is dropped; columns missing in the
+        failure log stay empty. Returns the number of rows written.
+        """
+        rows = 0
+        with open(failure_file, 'r', encoding='utf-8-sig', newline='') as src, \
+                open(retry_file, 'w', encoding='utf-8', newline='') as dst:
+            reader = csv.DictReader(src)
+            if not header:
+                header = [col for col in reader.fieldnames or [] if col.strip().lower() != 'errors']
+            writer = csv.writer(dst)
+            writer.writerow(header)
+            for row in reader:
+                writer.writerow([row.get(col) or '' for col in header])
+                rows += 1
+        return rows
+
+    def count_loader_rows(self, csv_file):
+        """Return the number of data rows of a loader or log CSV file"""
+        return count_csv_rows(csv_file)
+
+    def retry_failed_import(self, import_config, max_passes):
+        """
+        Re-import only the failed rows of an import until none fail or max_passes is reached.
+
+        Each pass builds a retry loader file from <loader>_FAILURE.csv in imports/<dns>/,
+        runs it in its own working directory, appends the retried successes to
+        <loader>_SUCCESS.csv and replaces <loader>_FAILURE.csv with the rows that still
+        fail. Earlier failure logs are kept in imports/<dns>/retries/. Returns the number
+        of rows still failing.
+        """
+        loader_file = self.resolve_import_file(import_config)
+        if not loader_file:
+            print(f"⚠️ No loader file configured for '{import_config['name']}'")
+            return 0
+        loader_name = os.path.basename(loader_file)
+        loader_base = os.path.splitext(loader_name)[0]
+        dest_folder = self.get_import_folder()
+        failure_file = os.path.join(dest_folder, loader_base + '_FAILURE.csv')
+        success_file = os.path.join(dest_folder, loader_base + '_SUCCESS.csv')
+        retries_folder = os.path.join(dest_folder, 'retries')
+        if not os.path.exists(failure_file):
+            print(f"✅ No failure file for '{import_config['name']}', nothing to retry")
+            return 0
+
+        # Retry loader files keep the column order of the original loader file
+        original = loader_file if os.path.exists(loader_file) else os.path.join(dest_folder, loader_name)
+        header = self.read_loader_header(original) if os.path.exists(original) else []
+
+        for retry_pass in range(1, max_passes + 1):
+            retry_name = f"{import_config['name']}_retry{retry_pass}"
+            work_dir = create_work_dir(self.get_work_root(), retry_name, self.script_dir)
+            retry_file = os.path.join(work_dir, f"{loader_base}_retry{retry_pass}.csv")
+            rows = self.write_retry_loader_file(failure_file, header, retry_file)
+            if rows == 0:
+                print(f"✅ {loader_base}_FAILURE.csv contains no rows, nothing to retry")
+                os.remove(failure_file)
+                shutil.rmtree(work_dir, ignore_errors=True)
+                break
+
+            print(f"\n🔁 Retry pass {retry_pass}/{max_passes} for '{import_config['name']}': {rows} failed row(s)")
+            retry_config = dict(import_config, name=retry_name)
+            succeeded = self.run_java_command(retry_config, loader_file=retry_file, work_dir=work_dir)
+            retry_base = os.path.splitext(os.path.basename(retry_file))[0]
+            retry_success = os.path.join(work_dir, retry_base + '_SUCCESS.csv')
+            retry_failure = os.path.join(work_dir, retry_base + '_FAILURE.csv')
+
+            if not os.path.exists(retry_success) and not os.path.exists(retry_failure):
+                # The loader did not run (or wrote no logs): the failure file is the only record of the rows
+                reason = "wrote no result logs" if succeeded else "failed without result logs"
+                print(f"❌ Retry pass {retry_pass}: loader {reason}, keeping {loader_base}_FAILURE.csv")
+                self.log_failure(retry_config, f"Retry pass {retry_pass}: loader {reason}, {rows} row(s) not retried")
+                shutil.rmtree(work_dir, ignore_errors=True)
+                break
+
+            # Keep the failure log this pass started from
+            os.makedirs(retries_folder, exist_ok=True)
+            replace_file(failure_file, os.path.join(retries_folder, f"{loader_base}_FAILURE_{self.run_timestamp}_pass{retry_pass}.csv"))
+            if os.path.exists(retry_success):
+                merge_csv_files([success_file, retry_success], success_file)
+            if os.path.exists(retry_failure):
+                replace_file(retry_failure, failure_file)
+            shutil.rmtree(work_dir, ignore_errors=True)
+            # The pass' logs were recorded in its work_dir; record where they ended up, so failure
+            # analysis attributes imports/<dns>/<loader>_FAILURE.csv to this run
+            self.record_invocation(
+                retry_config,
+                'failure' if os.path.exists(failure_file) else 'success',
+                retry_file,
+                success_log=success_file if os.path.exists(success_file) else None,
+                failure_log=failure_file if os.path.exists(failure_file) else None,
+                description=f"Retry pass {retry_pass}: result logs merged into {dest_folder}"
+            )
+
+            if not os.path.exists(failure_file):
+                print(f"✅ Retry pass {retry_pass}: all {rows} row(s) imported")
+                break
+            failed_rows = self.count_loader_rows(failure_file)
+            print(f"❌ Retry pass {retry_pass}: {failed_rows} of {rows} row(s) still failing")
+            self.log_failure(retry_config, f"Retry pass {retry_pass}: {failed_rows} of {rows} row(s) still failing")
+            if failed_rows >= rows:
+                # The same rows fail again (e.g. missing references), further passes will not help
+                print("⛔ No progress in this pass, stopping retries")
+                break
+
+        return self.count_loader_rows(failure_file) if os.path.exists(failure_file) else 0
+
+    def retry_failed_imports(self):
+        """Retry the failed rows of all active imports that have a <loader>_FAILURE.csv"""
+        max_passes = self.get_max_retry_passes()
+        active_imports = [imp for imp in self.config.get('imports', []) if imp.get('active', 1)]
+        self.start_ledger()
+        print(f"🔁 Retrying failed rows of {len(active_imports)} active import(s), up to {max_passes} pass(es) each")
+        print(f"📅 Run timestamp: {self.run_timestamp}")
+        print("-" * 80)
+        still_failing = {}
+        for import_config in active_imports:
+            remaining = self.retry_failed_import(import_config, max_passes)
+            if remaining:
+                still_failing[import_config['name']] = remaining
+            print("-" * 40)
+
+        self.close_worker_pool()
+
+        print(f"\n📊 Retry Summary:")
+        if still_failing:
+            print(f"❌ Imports with rows still failing: {len(still_failing)}")
+            for name, rows in still_failing.items():
+                print(f"   - {name}: {rows} row(s)")
+        else:
+            print("✅ No failed rows left")
+        self.manifest.finish()
+        self.finish_ledger()
+        print(f"🧾 Run manifest: {self.manifest.manifest_file}")
+
     def run_all_imports(self):
         """Execute all configured imports"""
         imports = self.config.get('imports', [])
@@ -410,79 +1247,96 @@ class VaultImportRunner:
             print("No imports configured!")
             return
         
+        self.start_ledger()
+        max_parallel = self.get_max_parallel_imports()
+
         print(f"🏁 Starting VaultLoader batch import process with {len(imports)} imports")
         print(f"📅 Run timestamp: {self.run_timestamp}")
+        if max_parallel > 1:
+            print(f"⚙️ Parallel imports: up to {max_parallel} VaultDataLoader processes (dependency order respected)")
         print("-" * 80)
         
         success_count = 0
         failure_count = 0
         skipped_count = 0
+        blocked_count = 0
+        aborted_count = 0
         success_files_list = []
         failure_files_list = []
 
+        active_imports = []
         for i, import_config in enumerate(imports, 1):
-            print(f"\n[{i}/{len(imports)}] Processing import: {import_config['name']}")
             # Check if import is active
             active = import_config.get('active', 1)
             if active == 0:
+                print(f"\n[{i}/{len(imports)}] Processing import: {import_config['name']}")
                 print(f"⏭️ Skipping '{import_config['name']}' (inactive)")
                 self.log_skipped(import_config)
                 skipped_count += 1
                 continue
-            success = self.run_java_command(import_config)
-            # Determine loader file (imported CSV) for this import
-            loader_file = import_config.get('import_path') or import_config.get('file') or import_config.get('import_file') or import_config.get('name')
-            # If run_java_command returns False, check for log files to determine real status
-            import_settings = self.config.get('import_settings', {})
-            dns = import_settings.get('dns', '').replace('https://', '').replace('/', '_')
-            dest_folder = os.path.join(self.script_dir, 'imports', dns)
-            failure_files = []
-            success_files = []
-            if os.path.isdir(dest_folder):
-                for f in os.listdir(dest_folder):
-                    if f.endswith('_FAILURE.csv'):
-                        failure_files.append(f)
-                    elif f.endswith('_SUCCESS.csv'):
-                        success_files.append(f)
-            # Try to match the log file to the loader file for this import
-            matched_success = None
-            matched_failure = None
-            if loader_file:
-                loader_base = os.path.splitext(os.path.basename(loader_file))[0]
-                for f in success_files:
-                    if loader_base in f:
-                        matched_success = os.path.join(dest_folder, f)
-                        break
-                for f in failure_files:
-                    if loader_base in f:
-                        matched_failure = os.path.join(dest_folder, f)
-                        break
-            # Decide result for this import
-            if matched_failure:
-                print("Failure file detected:")
-                print("-", matched_failure)
-                failure_files_list.append(matched_failure)
-                while True:
-                    proceed = input("Proceed with next import? (y/n): ").strip().lower()
-                    if proceed == 'y':
-                        break
-                    elif proceed == 'n':
-                        print("Aborted by user.")
-                        return
-                    else:
-                        print("Please enter 'y' for yes or 'n' for no.")
-                failure_count += 1
-            elif matched_success:
-                print("Success file detected (no failure file): Import counted as successful.")
-                print("-", matched_success)
-                success_files_list.append(matched_success)
-                success_count += 1
-            else:
-                print("No failure or success file detected: Import counted as failed.")
-                if loader_file:
-                    failure_files_list.append(loader_file)
-                failure_count += 1
-            print("-" * 40)
+            active_imports.append((i, import_config))
+
+        # Find unresolvable references and duplicate keys before any JVM is started
+        self.run_preflight([import_config for _, import_config in active_imports])
+
+        predictions = self.predict_imports([import_config for _, import_config in active_imports])
+        progress = BatchProgress({name: seconds for name, (seconds, _) in predictions.items()}, max_parallel)
+        print_prediction(
+            {name: seconds for name, (seconds, _) in predictions.items()},
+            sum(1 for _, known in predictions.values() if known),
+            max_parallel
+        )
+
+        if max_parallel <= 1:
+            for i, import_config in active_imports:
+                print(f"\n[{i}/{len(imports)}] Processing import: {import_config['name']}")
+                progress.start(import_config['name'])
+                self.run_java_command(import_config)
+                progress.finish(import_config['name'])
+                print(progress.eta_line())
+                status, result_file = self.evaluate_import_result(import_config)
+                if status == 'failure':
+                    if result_file:
+                        failure_files_list.append(result_file)
+                    failure_count += 1
+                    if result_file and result_file.endswith('_FAILURE.csv'):
+                        while True:
+                            proceed = input("Proceed with next import? (y/n): ").strip().lower()
+                            if proceed == 'y':
+                                break
+                            elif proceed == 'n':
+                                print("Aborted by user.")
+                                self.close_worker_pool()
+                                return
+                            else:
+                                print("Please enter 'y' for yes or 'n' for no.")
+                else:
+                    success_files_list.append(result_file)
+                    success_count += 1
+                print("-" * 40)
+        else:
+            results = self.run_imports_parallel(
+                [import_config for _, import_config in active_imports], max_parallel, predictions, progress
+            )
+            for status, result_file in results:
+                if status == 'success':
+                    success_files_list.append(result_file)
+                    success_count += 1
+                elif status == 'blocked':
+                    blocked_count += 1
+                    failure_count += 1
+                elif status == 'aborted':
+                    aborted_count += 1
+                else:
+                    if result_file:
+                        failure_files_list.append(result_file)
+                    failure_count += 1
+
+        self.close_worker_pool()
+
+        # Remove the quarantine-cleaned loader files of this run
+        for clean_file in self.loader_overrides.values():
+            shutil.rmtree(os.path.dirname(clean_file), ignore_errors=True)
 
         # Print summary
         print(f"\n📊 Batch Import Summary:")
@@ -496,8 +1350,14 @@ class VaultImportRunner:
             print("   Loader files counted as failed:")
             for f in failure_files_list:
                 print(f"   - {f}")
+        if blocked_count:
+            print(f"⛔ Not started (dependency failed): {blocked_count}")
+        if aborted_count:
+            print(f"⏹️ Not started (aborted by user): {aborted_count}")
         print(f"⏭️ Skipped imports: {skipped_count}")
-        print(f"📁 Log files created in logs/success/ and logs/failure/")
+        self.manifest.finish()
+        self.finish_ledger()
+        print(f"🧾 Run manifest: {self.manifest.manifest_file}")
         print(f"🕒 Run completed at: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
 
 def main():
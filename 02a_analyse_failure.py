@@ -1,84 +1,495 @@
 import pandas as pd
+from csv_utils import count_csv_rows
+from error_templates import TemplateMiner, get_template, WILDCARD
+from failure_history import FAILURE_HISTORY_FILE, connect as connect_history, file_sha256, is_ingested, \
+    ingest_failure_file, update_templates, print_failure_trends, normalize_vault
 
+import os
+import re
 import csv
+import json
 from collections import Counter
-import re
-bracket_pattern = re.compile(r'\[([^\]]*)\]')
-# IDs wie OOZ00000002K028: 15 Zeichen, Buchstaben und Ziffern
-id_pattern = re.compile(r'^[A-Za-z0-9]{15}$')
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+# Failure files are read in chunks of this many rows, so memory stays bounded
+CHUNK_ROWS = 100000
+
+# Error templates mined from all analysed failure files so far
+TEMPLATE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'logs', 'error_templates.json')
+
+# Templates and counts of every analysed failure file, for trends across runs
+HISTORY_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), FAILURE_HISTORY_FILE)
+
+# Import manifests: object, vault and run of a loader/failure file
+MANIFEST_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'logs', 'manifest')
+
+RED = '\033[31m'
+BLUE = '\033[34m'
+RESET = '\033[0m'
+
+# [feld=wert] -> [feld=***]
+key_value_pattern = r'\[\s*([^\]=]*)=[^\]]*\]'
+# IDs wie [OOZ00000002K028]: 15 Zeichen, Buchstaben und Ziffern
+id_bracket_pattern = r'\[\s*[A-Za-z0-9]{15}\s*\]'
+
+
+def normalise_errors(errors, color=True):
+    """
+    Mask variable parts of Vault Loader error messages (vectorised over a Series).
+
+    Values in [key=value] brackets and 15-character record IDs in brackets are
+    replaced by *** (coloured for the console unless color is False), whitespace
+    is collapsed. Returns a Series of the same index.
+    """
+    value_mask = f'{RED}***{RESET}' if color else '***'
+    id_mask = f'{BLUE}***{RESET}' if color else '***'
+    return (
+        errors
+        .str.replace(key_value_pattern, f'[\\1={value_mask}]', regex=True)
+        .str.replace(id_bracket_pattern, f'[{id_mask}]', regex=True)
+        .str.replace(r'\s+', ' ', regex=True)
+        .str.strip()
+    )
+
+
+def count_error_types(failure_file, chunk_rows=CHUNK_ROWS, color=True):
+    """
+    Return (number of failed rows, Counter of normalised error messages) of a failure file.
+
+    The file is read chunk by chunk (only the errors column). Each distinct raw
+    message of a chunk is normalised once and the counts are added up per chunk.
+    """
+    header = pd.read_csv(failure_file, nrows=0, encoding='utf-8').columns
+    if 'errors' not in header:
+        return count_csv_rows(failure_file), Counter()
+    error_counter = Counter()
+    error_rows = 0
+    reader = pd.read_csv(failure_file, usecols=['errors'], dtype=str, keep_default_na=False,
+                         encoding='utf-8', chunksize=chunk_rows)
+    for chunk in reader:
+        error_rows += len(chunk)
+        raw_counts = chunk['errors'][chunk['errors'] != ''].value_counts()
+        if raw_counts.empty:
+            continue
+        cleaned = normalise_errors(pd.Series(raw_counts.index, index=raw_counts.index), color)
+        counts = raw_counts.groupby(cleaned.values).sum()
+        error_counter.update({err: int(count) for err, count in counts.items() if err})
+    return error_rows, error_counter
+
 
-def analyse_failure(import_file, failure_file):
+def count_by_cluster(clusters):
+    """Return {template id: (failed rows, distinct messages)} of (cluster, count) pairs"""
+    counts = {}
+    for cluster, count in clusters:
+        rows, messages = counts.get(cluster['id'], (0, 0))
+        counts[cluster['id']] = (rows + count, messages + 1)
+    return counts
+
+
+def classify_error(miner, message, count, learn=True):
+    """Return the template cluster of a message; only new failure files (learn) add to the template counts"""
+    return miner.add(message, count) if learn else miner.match(message)
+
+
+def categorise_errors(error_counter, miner, learn=True):
+    """
+    Group masked error messages into mined templates.
+
+    With learn=False (failure file already in the failure history) the messages
+    are only matched against the templates, their counts are not added again.
+    Returns (Counter template -> failed rows, Counter template -> distinct messages,
+    {template id: (failed rows, distinct messages)}).
+    """
+    clusters = [(classify_error(miner, message, count, learn), count) for message, count in error_counter.items()]
+    categories = Counter()
+    messages = Counter()
+    for cluster, count in clusters:
+        template = get_template(cluster)
+        categories[template] += count
+        messages[template] += 1
+    return categories, messages, count_by_cluster(clusters)
+
+
+def record_failure_history(history, miner, failure_path, sha256, object_name, failure_run, cluster_counts,
+                           loader_file=None, total_rows=None, failed_rows=None):
+    """Store one analysed failure file in the failure history; returns False if its hash was already ingested"""
+    vault, run_timestamp = failure_run
+    added = ingest_failure_file(
+        history, sha256, vault, object_name, run_timestamp, cluster_counts, loader_file=loader_file,
+        failure_file=os.path.basename(failure_path), total_rows=total_rows, failed_rows=failed_rows
+    )
+    if added:
+        update_templates(history, {cluster['id']: get_template(cluster) for cluster in miner.clusters})
+    return added
+
+
+def analyse_failure(import_file, failure_file, history_file=HISTORY_FILE, manifest_dir=MANIFEST_DIR, miner=None):
     """
     Analyse a Vault Loader failure file and print an overview of error types.
+
+    Only a failure file whose hash is not yet in the failure history adds to the
+    template counts and the history; a known file is only matched for display.
     Args:
         import_file (str): Path to the original import CSV file.
         failure_file (str): Path to the *_FAILURE.csv file generated by Vault Loader.
+        history_file (str): Failure history the result is added to (None: not recorded).
+        miner (TemplateMiner): Shared templates of several analyses, saved by the caller
+            (None: loaded from and saved to logs/error_templates.json).
+    Returns:
+        (total_objects, error_rows, Counter of error types)
     """
-    # Count objects to import using pandas
+    # Count objects to import without parsing the loader file
     try:
-        df_import = pd.read_csv(import_file, encoding='utf-8')
-        total_objects = len(df_import)
+        total_objects = count_csv_rows(import_file)
     except Exception as e:
         print(f"Error reading import file: {e}")
         total_objects = 'N/A'
 
-    # Read failure file and collect errors using pandas
+    # Read failure file in chunks and collect errors
     error_counter = Counter()
     try:
-        df_failure = pd.read_csv(failure_file, encoding='utf-8')
-        error_rows = len(df_failure)
-        if 'errors' in df_failure.columns:
-            for errors in df_failure['errors'].fillna(''):
-                if errors:
-                    def bracket_replacer(match):
-                        content = match.group(1).strip()
-                        if '=' in content:
-                            before_eq, _ = content.split('=', 1)
-                            return f'[{before_eq}=\033[31m***\033[0m]'
-                        elif id_pattern.match(content):
-                            return '[\033[34m***\033[0m]'
-                        else:
-                            return match.group(0)
-                    err_clean = bracket_pattern.sub(bracket_replacer, errors)
-                    err_clean = re.sub(r'\s+', ' ', err_clean).strip()
-                    if err_clean:
-                        error_counter[err_clean] += 1
+        error_rows, error_counter = count_error_types(failure_file, color=False)
     except Exception as e:
         print(f"Error reading failure file: {e}")
         error_rows = 'N/A'
 
+    # One gate for template counts and history: only failure files not seen before count
+    sha256 = None
+    known = False
+    history = None
+    if history_file and error_rows != 'N/A':
+        sha256 = file_sha256(failure_file)
+        history = connect_history(history_file)
+        known = is_ingested(history, sha256)
+
     print("\n--- Import Failure Analysis ---")
     print(f"Objects in loader file (to import): {total_objects}")
     print(f"Errors occurred: {error_rows}")
-    print("\nError type overview:")
+    cluster_counts = {}
+    save_miner = miner is None
+    miner = miner or TemplateMiner(TEMPLATE_FILE)
     if error_counter:
-        for err, count in error_counter.most_common():
-            print(f"- {err}: {count}")
+        categories, messages, cluster_counts = categorise_errors(error_counter, miner, learn=not known)
+        if save_miner and not known:
+            miner.save()
+        print(f"\nError categories ({len(error_counter)} distinct messages in {len(categories)} categories):")
+        for template, count in categories.most_common():
+            highlighted = template.replace('***', f'{RED}***{RESET}').replace(WILDCARD, f'{BLUE}{WILDCARD}{RESET}')
+            print(f"- {highlighted}: {count} ({messages[template]} message{'s' if messages[template] != 1 else ''})")
     else:
-        print("No error details found in failure file.")
+        print("\nNo error details found in failure file.")
+
+    if history is not None:
+        try:
+            added = False
+            if not known:
+                object_names, failure_runs = load_import_manifests(manifest_dir)
+                added = record_failure_history(
+                    history, miner, failure_file, sha256, get_object_name(import_file, object_names),
+                    get_failure_run(failure_file, failure_runs), cluster_counts, loader_file=os.path.basename(import_file),
+                    total_rows=total_objects, failed_rows=error_rows
+                )
+        finally:
+            history.close()
+        if added:
+            print("✓ Added to the failure history")
+        else:
+            print("ℹ️ Failure file already in the failure history, not added again (template counts unchanged)")
+    return total_objects, error_rows, error_counter
 # Starte interaktiven Modus, wenn das Skript direkt ausgeführt wird
-import os
+
+# Object names like qms_unit__c / country__v in loader file names
+object_name_pattern = re.compile(r'[a-z][a-z0-9_]*?__[a-z]+')
+
+
+def find_failure_pairs(folder_path):
+    """Return (import_path, failure_path) of every *_FAILURE.csv in a folder whose loader file exists"""
+    pairs = []
+    for failure_file in sorted(f for f in os.listdir(folder_path) if f.endswith('_FAILURE.csv')):
+        # Import file: same name, but without _FAILURE
+        import_file = failure_file.replace('_FAILURE.csv', '.csv')
+        pairs.append((os.path.join(folder_path, import_file), os.path.join(folder_path, failure_file)))
+    return pairs
+
+
+def get_path_key(path):
+    return os.path.normcase(os.path.abspath(path))
+
+
+def load_import_manifests(manifest_dir):
+    """
+    Return ({loader file name: object name}, {failure file path: (vault, run timestamp)})
+    from the import manifests in manifest_dir; later runs win.
+
+    Failure files are keyed by the full path the run left them at, so logs of
+    other vaults or of chunk and retry runs with the same file name are not mixed up.
+    """
+    object_names = {}
+    failure_runs = {}
+    if not os.path.isdir(manifest_dir):
+        return object_names, failure_runs
+    for manifest_name in sorted(f for f in os.listdir(manifest_dir) if f.startswith('import_manifest_') and f.endswith('.json')):
+        try:
+            with open(os.path.join(manifest_dir, manifest_name), 'r', encoding='utf-8') as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            continue
+        for entry in manifest.get('entries', []):
+            if entry.get('loader_file') and entry.get('object_name'):
+                object_names[os.path.basename(entry['loader_file'])] = entry['object_name']
+            run_timestamp = entry.get('run_timestamp') or manifest.get('run_timestamp')
+            if entry.get('failure_log') and manifest.get('dns') and run_timestamp:
+                failure_runs[get_path_key(entry['failure_log'])] = (normalize_vault(manifest['dns']), run_timestamp)
+    return object_names, failure_runs
+
+
+def get_failure_run(failure_path, failure_runs):
+    """
+    Return (vault, run timestamp) of a failure file.
+
+    Taken from the import manifest that wrote it, else the vault folder
+    (imports/<dns>/, also for its retries/ subfolder) and the modification time of the file.
+    """
+    path_key = get_path_key(failure_path)
+    if path_key in failure_runs:
+        return failure_runs[path_key]
+    folders = os.path.dirname(os.path.abspath(failure_path)).split(os.sep)
+    folder = folders[-2] if folders[-1] == 'retries' and len(folders) > 1 else folders[-1]
+    return normalize_vault(folder), datetime.fromtimestamp(os.path.getmtime(failure_path)).strftime("%Y%m%d_%H%M%S")
+
+
+def get_object_name(import_path, object_names):
+    """Return the Vault object of a loader file (import manifest, else its file name)"""
+    file_name = os.path.basename(import_path)
+    if file_name in object_names:
+        return object_names[file_name]
+    match = object_name_pattern.search(os.path.splitext(file_name)[0])
+    return match.group(0) if match else os.path.splitext(file_name)[0]
+
+
+def analyse_pair(import_path, failure_path):
+    """Analyse one loader/failure file pair without printing (runs in a worker process)"""
+    result = {
+        'loader_file': os.path.basename(import_path),
+        'failure_file': os.path.basename(failure_path),
+        'total_rows': None,
+        'failed_rows': None,
+        'errors': {},
+        'error': None,
+        'sha256': None,
+    }
+    try:
+        result['sha256'] = file_sha256(failure_path)
+        if os.path.exists(import_path):
+            result['total_rows'] = count_csv_rows(import_path)
+        failed_rows, error_counter = count_error_types(failure_path, color=False)
+        result['failed_rows'] = failed_rows
+        result['errors'] = dict(error_counter)
+    except Exception as e:
+        result['error'] = str(e)
+    return result
+
+
+def build_failure_report(results, object_names, miner, known=()):
+    """
+    Aggregate per-pair results into (files, errors, cluster_counts).
+
+    Messages of failure files in known (failure file names already in the failure
+    history) are only matched against the templates, not counted again.
+
+    files: one row per loader file with its failure rate, highest rate first.
+    errors: one row per mined error template and object, most frequent first.
+    cluster_counts: {failure file name: {template id: (failed rows, distinct messages)}}.
+    """
+    files = []
+    clusters = []
+    for result in results:
+        object_name = get_object_name(result['loader_file'], object_names)
+        total = result['total_rows']
+        failed = result['failed_rows']
+        rate = round(failed / total, 4) if total and failed is not None else None
+        files.append({
+            'loader_file': result['loader_file'],
+            'object_name': object_name,
+            'total_rows': total,
+            'failed_rows': failed,
+            'failure_rate': rate,
+            'error_types': len(result['errors']),
+            'error': result['error'],
+        })
+        learn = result['failure_file'] not in known
+        for message, count in result['errors'].items():
+            clusters.append((classify_error(miner, message, count, learn), count, object_name, result['failure_file']))
+    # Templates are final only after all messages are added
+    per_template = Counter()
+    template_messages = Counter()
+    template_files = {}
+    file_clusters = {}
+    loader_files = {result['failure_file']: result['loader_file'] for result in results}
+    for cluster, count, object_name, failure_file in clusters:
+        key = (get_template(cluster), object_name)
+        per_template[key] += count
+        template_messages[key] += 1
+        template_files.setdefault(key, set()).add(loader_files[failure_file])
+        file_clusters.setdefault(failure_file, []).append((cluster, count))
+    files.sort(key=lambda row: (row['failure_rate'] is None, -(row['failure_rate'] or 0), -(row['failed_rows'] or 0)))
+    total_failed = sum(per_template.values())
+    errors = [
+        {
+            'error_template': template,
+            'object_name': object_name,
+            'count': count,
+            'share': round(count / total_failed, 4) if total_failed else None,
+            'messages': template_messages[(template, object_name)],
+            'loader_files': ';'.join(sorted(template_files[(template, object_name)])),
+        }
+        for (template, object_name), count in per_template.most_common()
+    ]
+    cluster_counts = {failure_file: count_by_cluster(pairs) for failure_file, pairs in file_clusters.items()
+                      if failure_file not in known}
+    return files, errors, cluster_counts
+
+
+def write_failure_report(report_dir, folder_path, files, errors):
+    """Write failure_report_<timestamp>.json plus _errors.csv / _files.csv; returns the written paths"""
+    os.makedirs(report_dir, exist_ok=True)
+    base = os.path.join(report_dir, f"failure_report_{datetime.now().strftime('%Y%m%d_%H%M%S')}")
+    with open(base + '.json', 'w', encoding='utf-8') as f:
+        json.dump({
+            'generated': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            'folder': os.path.abspath(folder_path),
+            'files': files,
+            'errors': errors,
+        }, f, indent=4, ensure_ascii=False)
+    for suffix, rows, header in (
+        ('_errors.csv', errors, ['error_template', 'object_name', 'count', 'share', 'messages', 'loader_files']),
+        ('_files.csv', files, ['loader_file', 'object_name', 'total_rows', 'failed_rows', 'failure_rate', 'error_types', 'error']),
+    ):
+        with open(base + suffix, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.DictWriter(f, fieldnames=header)
+            writer.writeheader()
+            writer.writerows(rows)
+    return [base + '.json', base + '_errors.csv', base + '_files.csv']
+
+
+def analyse_folder_parallel(folder_path, workers=None, report_dir=None, manifest_dir=MANIFEST_DIR,
+                            history_file=HISTORY_FILE):
+    """
+    Analyse all failure/loader file pairs of a folder in a process pool and write one aggregated report.
+
+    The report (JSON and CSV) ranks error templates per object by count and
+    loader files by failure rate. It is written to <folder>/failure_reports/ unless
+    report_dir is given; object names come from the import manifests if available.
+    Failure files not yet in the failure history are added to it; only these
+    add to the template counts, known files are just matched.
+    """
+    pairs = find_failure_pairs(folder_path)
+    if not pairs:
+        print("No *_FAILURE.csv files found in the folder.")
+        return None
+    workers = min(workers or os.cpu_count() or 1, len(pairs))
+    print(f"Analysing {len(pairs)} failure file(s) with {workers} process(es)...")
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        results = list(executor.map(analyse_pair, *zip(*pairs)))
+
+    # One ingest gate for template counts and history: failure files whose hash is new
+    # (the same file twice in the folder counts once)
+    new_files = set()
+    if history_file:
+        history = connect_history(history_file)
+        seen = set()
+        try:
+            for result in results:
+                sha256 = result['sha256']
+                if not result['error'] and sha256 and sha256 not in seen and not is_ingested(history, sha256):
+                    new_files.add(result['failure_file'])
+                seen.add(sha256)
+        finally:
+            history.close()
+    else:
+        new_files = {result['failure_file'] for result in results}
+    known = {result['failure_file'] for result in results} - new_files
+
+    object_names, failure_runs = load_import_manifests(manifest_dir)
+    miner = TemplateMiner(TEMPLATE_FILE)
+    files, errors, cluster_counts = build_failure_report(results, object_names, miner, known)
+    if new_files:
+        miner.save()
+
+    print("\n--- Failure Rate per Loader File ---")
+    for row in files:
+        rate = f"{row['failure_rate'] * 100:.1f}%" if row['failure_rate'] is not None else "N/A"
+        problem = f" ({row['error']})" if row['error'] else ""
+        total = row['total_rows'] if row['total_rows'] is not None else "N/A (loader file not found)"
+        print(f"- {row['loader_file']} [{row['object_name']}]: {row['failed_rows']} of {total} rows failed ({rate}){problem}")
+    print("\n--- Top Error Types ---")
+    for row in errors[:20]:
+        print(f"- {row['count']} x [{row['object_name']}] {row['error_template']}")
+    if len(errors) > 20:
+        print(f"... {len(errors) - 20} more in the report")
+
+    paths = write_failure_report(report_dir or os.path.join(folder_path, 'failure_reports'), folder_path, files, errors)
+    print("\nReport written:")
+    for path in paths:
+        print(f"- {path}")
+
+    if history_file:
+        history = connect_history(history_file)
+        added = 0
+        try:
+            for result, (_, failure_path) in zip(results, pairs):
+                if result['failure_file'] not in new_files:
+                    continue
+                added += record_failure_history(
+                    history, miner, failure_path, result['sha256'], get_object_name(result['loader_file'], object_names),
+                    get_failure_run(failure_path, failure_runs), cluster_counts.get(result['failure_file'], {}),
+                    loader_file=result['loader_file'], total_rows=result['total_rows'], failed_rows=result['failed_rows']
+                )
+        finally:
+            history.close()
+        print(f"\n{added} of {len(results)} failure file(s) added to the failure history, "
+              f"{len(results) - added} already known or unreadable")
+    return paths
+
 
 def analyse_folder(folder_path):
     # Suche alle *_FAILURE.csv im Ordner
-    files = [f for f in os.listdir(folder_path) if f.endswith('_FAILURE.csv')]
-    if not files:
+    pairs = find_failure_pairs(folder_path)
+    if not pairs:
         print("No *_FAILURE.csv files found in the folder.")
         return
-    for failure_file in files:
-        # Import file: same name, but without _FAILURE
-        import_file = failure_file.replace('_FAILURE.csv', '.csv')
-        import_path = os.path.join(folder_path, import_file)
-        failure_path = os.path.join(folder_path, failure_file)
+    # Templates are shared by all files and saved once at the end
+    miner = TemplateMiner(TEMPLATE_FILE)
+    for import_path, failure_path in pairs:
+        import_file = os.path.basename(import_path)
+        failure_file = os.path.basename(failure_path)
         print(f"\n\033[32m=== Analysis for: {import_file} / {failure_file} ===\033[0m")
         if not os.path.exists(import_path):
             print(f"Import file not found: {import_path}")
             continue
-        analyse_failure(import_path, failure_path)
+        analyse_failure(import_path, failure_path, miner=miner)
+    miner.save()
+
+def show_trends(history_file=HISTORY_FILE):
+    """Ask for optional filters and print failure trends from the failure history"""
+    if not os.path.exists(history_file):
+        print(f"No failure history yet ({history_file}). Analyse failure files first.")
+        return
+    vault = input("Vault DNS (Enter for all): ").strip() or None
+    object_name = input("Object name, e.g. qms_organization__qdm (Enter for all): ").strip() or None
+    error_filter = input("Only errors containing (Enter for all): ").strip() or None
+    history = connect_history(history_file)
+    try:
+        print_failure_trends(history, vault, object_name, error_filter)
+    finally:
+        history.close()
 
 if __name__ == "__main__":
-    print("Do you want to check a single file pair (1) or all pairs in a folder (2)?")
-    mode = input("Please enter 1 or 2: ").strip()
+    print("Do you want to check a single file pair (1), all pairs in a folder (2),")
+    print("all pairs in a folder in parallel with an aggregated report (3)")
+    print("or show failure trends across earlier runs (4)?")
+    mode = input("Please enter 1, 2, 3 or 4: ").strip()
     if mode == '1':
         import_file = input("Path to import (loader) file: ").strip()
         failure_file = input("Path to failure file: ").strip()
@@ -87,5 +498,10 @@ if __name__ == "__main__":
     elif mode == '2':
         folder = input("Path to the folder with the files: ").strip()
         analyse_folder(folder)
+    elif mode == '3':
+        folder = input("Path to the folder with the files: ").strip()
+        analyse_folder_parallel(folder)
+    elif mode == '4':
+        show_trends()
     else:
-        print("Cancelled. Please enter 1 or 2.")
\ No newline at end of file
+        print("Cancelled. Please enter 1, 2, 3 or 4.")
\ No newline at end of file
@@ -0,0 +1,90 @@
+import java.io.BufferedReader;
+import java.io.InputStreamReader;
+import java.lang.reflect.InvocationTargetException;
+import java.lang.reflect.Method;
+import java.nio.charset.StandardCharsets;
+import java.security.Permission;
+import java.util.Arrays;
+import java.util.jar.JarFile;
+
+/**
+ * Keeps one JVM with VaultDataLoader.jar loaded and runs several loader jobs in it.
+ *
+ * Started by vault_loader_worker.py as a single-file source program:
+ *   java -Djava.security.manager=allow -cp VaultDataLoader.jar VaultLoaderWorker.java VaultDataLoader.jar
+ *
+ * Every stdin line is one job: "<job id>\t<arg>\t<arg>...". The loader's main method
+ * is called with these arguments; afterwards "@@VAULT_LOADER_JOB_DONE <job id> <exit status>"
+ * is written to stderr and stdout. System.exit calls of the loader are turned into the job's exit
+ * status where the JVM still allows it; otherwise the JVM exits and the worker is restarted.
+ */
+public class VaultLoaderWorker {
+    static final String READY = "@@VAULT_LOADER_WORKER_READY";
+    static final String JOB_DONE = "@@VAULT_LOADER_JOB_DONE";
+
+    static class ExitTrappedException extends SecurityException {
+        final int status;
+
+        ExitTrappedException(int status) {
+            super("System.exit(" + status + ") trapped");
+            this.status = status;
+        }
+    }
+
+    @SuppressWarnings("removal")
+    static void trapExit() {
+        try {
+            System.setSecurityManager(new SecurityManager() {
+                @Override
+                public void checkPermission(Permission perm) {
+                }
+
+                @Override
+                public void checkExit(int status) {
+                    throw new ExitTrappedException(status);
+                }
+            });
+        } catch (UnsupportedOperationException | SecurityException e) {
+            System.err.println("VaultLoaderWorker: cannot trap System.exit, one job per JVM");
+        }
+    }
+
+    public static void main(String[] args) throws Exception {
+        String mainClass;
+        try (JarFile jar = new JarFile(args[0])) {
+            mainClass = jar.getManifest().getMainAttributes().getValue("Main-Class");
+        }
+        Method loaderMain = Class.forName(mainClass).getMethod("main", String[].class);
+        trapExit();
+
+        BufferedReader in = new BufferedReader(new InputStreamReader(System.in, StandardCharsets.UTF_8));
+        System.out.println(READY);
+        System.out.flush();
+        String line;
+        while ((line = in.readLine()) != null) {
+            if (line.isEmpty()) {
+                continue;
+            }
+            String[] parts = line.split("\t", -1);
+            String jobId = parts[0];
+            String[] jobArgs = Arrays.copyOfRange(parts, 1, parts.length);
+            int status = 0;
+            try {
+                loaderMain.invoke(null, (Object) jobArgs);
+            } catch (InvocationTargetException e) {
+                Throwable cause = e.getCause();
+                if (cause instanceof ExitTrappedException) {
+                    status = ((ExitTrappedException) cause).status;
+                } else {
+                    cause.printStackTrace();
+                    status = 1;
+                }
+            }
+            // On both streams, so the caller knows it has read all output of the job
+            System.err.println(JOB_DONE + " " + jobId + " " + status);
+            System.err.flush();
+            System.out.println(JOB_DONE + " " + jobId + " " + status);
+            System.out.flush();
+        }
+    }
+}
@@ -0,0 +1,197 @@
+import os
+import json
+import hashlib
+from datetime import datetime
+
+# Accepted column mappings, reused by later runs of the keyword/QMS join tools
+PROFILE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'logs', 'column_profiles.json')
+
+
+def _normalize_column_name(column_name):
+    normalized = str(column_name).strip().lower()
+    normalized = normalized.replace('ignore.', '')
+    for ch in [' ', '.', '_', '-']:
+        normalized = normalized.replace(ch, '')
+    return normalized
+
+
+def _get_candidate_columns(expected_column, available_columns, aliases=None):
+    aliases = aliases or []
+    expected_norm = _normalize_column_name(expected_column)
+    wanted = [expected_column] + aliases
+
+    candidates = []
+
+    for candidate in wanted:
+        if candidate in available_columns and candidate not in candidates:
+            candidates.append(candidate)
+
+    lower_map = {str(col).strip().lower(): col for col in available_columns}
+    for candidate in wanted:
+        key = str(candidate).strip().lower()
+        if key in lower_map:
+            mapped = lower_map[key]
+            if mapped not in candidates:
+                candidates.append(mapped)
+
+    for column in available_columns:
+        if _normalize_column_name(column) == expected_norm and column not in candidates:
+            candidates.append(column)
+
+    return candidates
+
+
+def header_fingerprint(columns):
+    """Return a short hash of a file header (column names in order)"""
+    return hashlib.sha256('\x1f'.join(str(col) for col in columns).encode('utf-8')).hexdigest()[:16]
+
+
+class ColumnProfiles:
+    """
+    Column mappings accepted for a file header, keyed by its fingerprint (logs/column_profiles.json).
+
+    A mapping chosen once for a header is applied automatically whenever a file
+    with exactly the same header is loaded again; the file is rewritten atomically.
+    """
+
+    def __init__(self, profile_file=PROFILE_FILE):
+        self.profile_file = profile_file
+        self.profiles = {}
+        if os.path.exists(profile_file):
+            try:
+                with open(profile_file, 'r', encoding='utf-8') as f:
+                    self.profiles = json.load(f)
+            except (OSError, ValueError) as e:
+                print(f"Warning: Ignoring unreadable column profiles {profile_file}: {e}")
+
+    def get(self, columns, expected_column):
+        """Return the saved column for expected_column in a file with this header, or None"""
+        profile = self.profiles.get(header_fingerprint(columns), {})
+        selected = profile.get('mappings', {}).get(expected_column)
+        return selected if selected in columns else None
+
+    def remember(self, columns, dataframe_label, mapping):
+        """Save the mapped (renamed) columns of a file with this header"""
+        fingerprint = header_fingerprint(columns)
+        profile = self.profiles.get(fingerprint, {})
+        # Files with the same header may need different columns, so mappings are merged
+        mappings = dict(profile.get('mappings', {}))
+        mappings.update({expected: selected for expected, selected in mapping.items() if expected != selected})
+        if not mappings or profile.get('mappings') == mappings:
+            return
+        self.profiles[fingerprint] = {
+            'label': dataframe_label,
+            'columns': list(columns),
+            'mappings': mappings,
+            'updated': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        }
+        os.makedirs(os.path.dirname(os.path.abspath(self.profile_file)), exist_ok=True)
+        tmp_file = self.profile_file + '.tmp'
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump(self.profiles, f, indent=4, ensure_ascii=False)
+        os.replace(tmp_file, self.profile_file)
+
+
+def _resolve_required_column(df, dataframe_label, expected_column, aliases=None, profiles=None, non_interactive=False):
+    columns = df.columns.tolist()
+
+    if expected_column in columns:
+        return expected_column
+
+    saved = profiles.get(columns, expected_column) if profiles else None
+    if saved:
+        print(f"✓ {dataframe_label}: using saved mapping '{expected_column}' <- '{saved}'")
+        return saved
+
+    candidates = _get_candidate_columns(expected_column, columns, aliases=aliases)
+
+    print("\n" + "-" * 80)
+    print(f"⚠ Required column '{expected_column}' not found in {dataframe_label}.")
+    print(f"Available columns: {', '.join(columns)}")
+
+    if candidates:
+        print(f"Suggested alternative columns: {', '.join(candidates)}")
+
+    if non_interactive:
+        print(f"❌ No saved mapping for header {header_fingerprint(columns)}. "
+              "Run once interactively to choose and save the mapping.")
+        return None
+
+    while True:
+        user_input = input(
+            f"Map '{expected_column}' to which column? "
+            "(enter name, number, or 'abort'): "
+        ).strip()
+
+        if user_input.lower() == 'abort':
+            return None
+
+        if user_input.isdigit():
+            column_index = int(user_input) - 1
+            if 0 <= column_index < len(columns):
+                return columns[column_index]
+            print(f"❌ Invalid selection '{user_input}'. Please select 1 to {len(columns)}.")
+            continue
+
+        if user_input in columns:
+            return user_input
+
+        for column in columns:
+            if column.strip().lower() == user_input.strip().lower():
+                return column
+
+        print("❌ Column not found. You can paste the exact header, enter a number, or type 'abort'.")
+
+
+def _apply_column_mapping(df, dataframe_label, mapping):
+    for expected_column, selected_column in mapping.items():
+        if selected_column is None:
+            continue
+
+        if expected_column == selected_column:
+            continue
+
+        if expected_column in df.columns:
+            print(
+                f"⚠ {dataframe_label}: '{expected_column}' already exists. "
+                f"Keeping it and ignoring mapped column '{selected_column}'."
+            )
+            continue
+
+        df = df.rename(columns={selected_column: expected_column})
+
+    return df
+
+
+def resolve_and_apply_required_columns(df, dataframe_label, required_columns, profiles=None, non_interactive=False):
+    """
+    Rename the columns of df to the required names and return it (None if a column could not be mapped).
+
+    Missing columns are taken from a saved profile for the file's header, else asked
+    for interactively; with non_interactive=True a missing mapping aborts instead.
+    Accepted mappings are saved to profiles.
+    """
+    mapping = {}
+
+    for config in required_columns:
+        expected = config['expected']
+        aliases = config.get('aliases', [])
+        selected = _resolve_required_column(
+            df, dataframe_label, expected, aliases=aliases, profiles=profiles, non_interactive=non_interactive
+        )
+
+        if selected is None:
+            print(f"❌ Aborted: required column '{expected}' could not be mapped for {dataframe_label}.")
+            return None
+
+        mapping[expected] = selected
+
+    print(f"\nColumn mapping for {dataframe_label}:")
+    for expected, selected in mapping.items():
+        print(f"  - {expected} <- {selected}")
+
+    if profiles:
+        profiles.remember(df.columns.tolist(), dataframe_label, mapping)
+
+    df = _apply_column_mapping(df, dataframe_label, mapping)
+    return df
@@ -1,126 +1,14 @@
 import pandas as pd
 import os
+import sys
+import argparse
 from datetime import datetime
 from get_keyword_qms_joins import build_keyword_qms_unit_joins_from_folder
+from export_cache import read_export_csv
+from column_mapping import ColumnProfiles, resolve_and_apply_required_columns
 
 
-def _normalize_column_name(column_name):
-    normalized = str(column_name).strip().lower()
-    normalized = normalized.replace('ignore.', '')
-    for ch in [' ', '.', '_', '-']:
-        normalized = normalized.replace(ch, '')
-    return normalized
-
-
-def _get_candidate_columns(expected_column, available_columns, aliases=None):
-    aliases = aliases or []
-    expected_norm = _normalize_column_name(expected_column)
-    wanted = [expected_column] + aliases
-
-    candidates = []
-
-    for candidate in wanted:
-        if candidate in available_columns and candidate not in candidates:
-            candidates.append(candidate)
-
-    lower_map = {str(col).strip().lower(): col for col in available_columns}
-    for candidate in wanted:
-        key = str(candidate).strip().lower()
-        if key in lower_map:
-            mapped = lower_map[key]
-            if mapped not in candidates:
-                candidates.append(mapped)
-
-    for column in available_columns:
-        if _normalize_column_name(column) == expected_norm and column not in candidates:
-            candidates.append(column)
-
-    return candidates
-
-
-def _resolve_required_column(df, dataframe_label, expected_column, aliases=None):
-    columns = df.columns.tolist()
-
-    if expected_column in columns:
-        return expected_column
-
-    candidates = _get_candidate_columns(expected_column, columns, aliases=aliases)
-
-    print("\n" + "-" * 80)
-    print(f"⚠ Required column '{expected_column}' not found in {dataframe_label}.")
-    print(f"Available columns: {', '.join(columns)}")
-
-    if candidates:
-        print(f"Suggested alternative columns: {', '.join(candidates)}")
-
-    while True:
-        user_input = input(
-            f"Map '{expected_column}' to which column? "
-            "(enter name, number, or 'abort'): "
-        ).strip()
-
-        if user_input.lower() == 'abort':
-            return None
-
-        if user_input.isdigit():
-            column_index = int(user_input) - 1
-            if 0 <= column_index < len(columns):
-                return columns[column_index]
-            print(f"❌ Invalid selection '{user_input}'. Please select 1 to {len(columns)}.")
-            continue
-
-        if user_input in columns:
-            return user_input
-
-        for column in columns:
-            if column.strip().lower() == user_input.strip().lower():
-                return column
-
-        print("❌ Column not found. You can paste the exact header, enter a number, or type 'abort'.")
-
-
-def _apply_column_mapping(df, dataframe_label, mapping):
-    for expected_column, selected_column in mapping.items():
-        if selected_column is None:
-            continue
-
-        if expected_column == selected_column:
-            continue
-
-        if expected_column in df.columns:
-            print(
-                f"⚠ {dataframe_label}: '{expected_column}' already exists. "
-                f"Keeping it and ignoring mapped column '{selected_column}'."
-            )
-            continue
-
-        df = df.rename(columns={selected_column: expected_column})
-
-    return df
-
-
-def _resolve_and_apply_required_columns(df, dataframe_label, required_columns):
-    mapping = {}
-
-    for config in required_columns:
-        expected = config['expected']
-        aliases = config.get('aliases', [])
-        selected = _resolve_required_column(df, dataframe_label, expected, aliases=aliases)
-
-        if selected is None:
-            print(f"❌ Aborted: required column '{expected}' could not be mapped for {dataframe_label}.")
-            return None
-
-        mapping[expected] = selected
-
-    print(f"\nColumn mapping for {dataframe_label}:")
-    for expected, selected in mapping.items():
-        print(f"  - {expected} <- {selected}")
-
-    df = _apply_column_mapping(df, dataframe_label, mapping)
-    return df
-
-def create_keyword_qms_join_loaderfile():
+def create_keyword_qms_join_loaderfile(source_folder=None, export_folder=None, non_interactive=False):
     """
     Creates a loader file by joining QMS unit data with keyword joins.
     
@@ -129,6 +17,10 @@ def create_keyword_qms_join_loaderfile():
     2. Loads the 10_qms_unit__c.csv file
     3. Loads the 22_keyword__c.csv file
     4. Joins the dataframes on matching name fields
+
+    Folders that are not given are asked for. With non_interactive=True nothing is
+    asked: both folders are required and a header without saved column mapping
+    (logs/column_profiles.json) aborts. Returns the output file, or None on error.
     """
     
     print("=" * 80)
@@ -138,13 +30,17 @@ def create_keyword_qms_join_loaderfile():
     # Step 1: Build 35_qms_unit_keywords_join__c_for_import.csv from source vault export folder
     print("\nStep 1: Build keyword-QMS-unit join blueprint from source vault export folder.")
     print("-" * 40)
-    source_folder = input(
-        "Please enter the vault export folder path "
-        "(e.g. C:\\souce_code\\iqms_md_exp_imp\\exports\\bayer-iqms.veevavault.com) "
-        "where these CSV files are located: "
-    ).strip()
+    if non_interactive and (not source_folder or not export_folder):
+        print("❌ Error: Source and target folder are required in non-interactive mode.")
+        return
+    if not source_folder:
+        source_folder = input(
+            "Please enter the vault export folder path "
+            "(e.g. C:\\souce_code\\iqms_md_exp_imp\\exports\\bayer-iqms.veevavault.com) "
+            "where these CSV files are located: "
+        ).strip()
 
-    join_file_path = build_keyword_qms_unit_joins_from_folder(source_folder)
+    join_file_path = build_keyword_qms_unit_joins_from_folder(source_folder, non_interactive=non_interactive)
     if not join_file_path:
         print("❌ Error: Could not generate 35_qms_unit_keywords_join__c_for_import.csv from source folder.")
         return
@@ -156,7 +52,8 @@ def create_keyword_qms_join_loaderfile():
     # Step 2: Get folder path for QMS Unit and Keyword files
     print("\nStep 2: Locate the TARGET vault export folder to get IDs of QMS units and Keywords.")
     print("-" * 40)
-    export_folder = input("Enter folder path containing 10_qms_unit__c.csv and 22_keyword__c.csv: ").strip()
+    if not export_folder:
+        export_folder = input("Enter folder path containing 10_qms_unit__c.csv and 22_keyword__c.csv: ").strip()
     
     if not os.path.isdir(export_folder):
         print(f"❌ Error: Folder not found: {export_folder}")
@@ -183,15 +80,15 @@ def create_keyword_qms_join_loaderfile():
     print("-" * 40)
     
     try:
-        df_join = pd.read_csv(join_file_path, encoding='utf-8')
+        df_join = read_export_csv(join_file_path, encoding='utf-8')
         print(f"✓ Loaded join file: {len(df_join)} rows")
         print(f"  Columns: {', '.join(df_join.columns.tolist())}")
         
-        df_qms = pd.read_csv(qms_unit_file, encoding='utf-8')
+        df_qms = read_export_csv(qms_unit_file, encoding='utf-8')
         print(f"✓ Loaded QMS unit file: {len(df_qms)} rows")
         print(f"  Columns: {', '.join(df_qms.columns.tolist())}")
         
-        df_keyword = pd.read_csv(keyword_file, encoding='utf-8')
+        df_keyword = read_export_csv(keyword_file, encoding='utf-8')
         print(f"✓ Loaded keyword file: {len(df_keyword)} rows")
         print(f"  Columns: {', '.join(df_keyword.columns.tolist())}")
         
@@ -199,38 +96,45 @@ def create_keyword_qms_join_loaderfile():
         print(f"❌ Error loading files: {e}")
         return
 
-    # Resolve required columns (interactive fallback if exact header is missing)
-    df_join = _resolve_and_apply_required_columns(
+    # Resolve required columns (saved profile or interactive fallback if exact header is missing)
+    profiles = ColumnProfiles()
+    df_join = resolve_and_apply_required_columns(
         df_join,
         "join file",
         [
             {'expected': 'keyword__c.name__v'},
             {'expected': 'keyword_type__c'},
             {'expected': 'qms_unit__c.name__v'}
-        ]
+        ],
+        profiles=profiles,
+        non_interactive=non_interactive
     )
     if df_join is None:
         return
 
-    df_qms = _resolve_and_apply_required_columns(
+    df_qms = resolve_and_apply_required_columns(
         df_qms,
         "QMS unit file",
         [
             {'expected': 'qms_unit__c.id', 'aliases': ['ignore.id', 'id']},
             {'expected': 'name__v'}
-        ]
+        ],
+        profiles=profiles,
+        non_interactive=non_interactive
     )
     if df_qms is None:
         return
 
-    df_keyword = _resolve_and_apply_required_columns(
+    df_keyword = resolve_and_apply_required_columns(
         df_keyword,
         "keyword file",
         [
             {'expected': 'keyword__c.id', 'aliases': ['ignore.id', 'id']},
             {'expected': 'name__v'},
             {'expected': 'keyword_type__c'}
-        ]
+        ],
+        profiles=profiles,
+        non_interactive=non_interactive
     )
     if df_keyword is None:
         return
@@ -374,10 +278,19 @@ def create_keyword_qms_join_loaderfile():
     print("=" * 80)
     
     # Ask if user wants to see preview
-    preview = input("\nShow preview of first 5 rows? (y/n): ").strip().lower()
-    if preview == 'y':
-        print("\nPreview of result:")
-        print(df_result.head())
+    if not non_interactive:
+        preview = input("\nShow preview of first 5 rows? (y/n): ").strip().lower()
+        if preview == 'y':
+            print("\nPreview of result:")
+            print(df_result.head())
+    return output_file
 
 if __name__ == "__main__":
-    create_keyword_qms_join_loaderfile()
+    parser = argparse.ArgumentParser(description="Create the keyword-QMS-unit join loader file")
+    parser.add_argument('--source', help="Source vault export folder (asked for if omitted)")
+    parser.add_argument('--target', help="Target vault export folder with 10_qms_unit__c.csv and 22_keyword__c.csv (asked for if omitted)")
+    parser.add_argument('--non-interactive', action='store_true',
+                        help="Never ask: requires --source/--target and saved column mappings, fails fast otherwise")
+    args = parser.parse_args()
+    output = create_keyword_qms_join_loaderfile(args.source, args.target, non_interactive=args.non_interactive)
+    sys.exit(0 if output else 1)
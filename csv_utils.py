@@ -0,0 +1,258 @@
+import os
+import csv
+import io
+import mmap
+import errno
+import shutil
+import hashlib
+
+# Block size for streaming copies and record counting (4 MiB)
+BLOCK_SIZE = 4 * 1024 * 1024
+
+
+class CsvRecordCounter:
+    """
+    Count CSV records in a byte stream fed block by block.
+
+    A newline only terminates a record when it is outside a quoted field, so
+    multiline values are counted once. Escaped quotes ("") toggle the quote
+    state twice and therefore need no special handling.
+    """
+
+    def __init__(self):
+        self.in_quotes = False
+        self.records = 0
+        self.last_byte = b''
+
+    def feed(self, block):
+        if not block:
+            return
+        if b'"' not in block:
+            if not self.in_quotes:
+                self.records += block.count(b'\n')
+        else:
+            parts = block.split(b'"')
+            last = len(parts) - 1
+            for index, part in enumerate(parts):
+                if not self.in_quotes:
+                    self.records += part.count(b'\n')
+                if index < last:
+                    self.in_quotes = not self.in_quotes
+        self.last_byte = block[-1:]
+
+    def finish(self):
+        """Return the record count, including a last record without trailing newline"""
+        if self.last_byte and self.last_byte != b'\n':
+            return self.records + 1
+        return self.records
+
+
+class PostprocessResult:
+    """Statistics collected while post-processing an exported CSV file"""
+
+    def __init__(self, path):
+        self.path = path
+        self.row_count = 0
+        self.byte_size = 0
+        self.sha256 = None
+        self.renamed_columns = []
+
+
+def _rename_header_line(header_line, rename_columns):
+    """Return (new header bytes, renamed 'old -> new' list) for a raw header line"""
+    line_ending = b'\r\n' if header_line.endswith(b'\r\n') else (b'\n' if header_line.endswith(b'\n') else b'')
+    text = header_line[:len(header_line) - len(line_ending)].decode('utf-8')
+    header = next(csv.reader([text]), [])
+    renamed = []
+    updated = []
+    for col in header:
+        # The UTF-8 BOM stays attached to the first column name
+        plain = col.lstrip('\ufeff')
+        if plain in rename_columns:
+            new_col = rename_columns[plain]
+            updated.append(col[:len(col) - len(plain)] + new_col)
+            renamed.append(f"{plain} -> {new_col}")
+        else:
+            updated.append(col)
+    if not renamed:
+        return header_line, renamed
+    buffer = io.StringIO()
+    csv.writer(buffer, lineterminator='').writerow(updated)
+    return buffer.getvalue().encode('utf-8') + line_ending, renamed
+
+
+def replace_file(source_path, dest_path):
+    """
+    Move a file to dest_path atomically, replacing an existing file.
+
+    Uses os.replace; across file systems the file is first copied next to the
+    destination and then renamed, so readers never see a half-written file.
+    """
+    try:
+        os.replace(source_path, dest_path)
+    except OSError as e:
+        if e.errno != errno.EXDEV:
+            raise
+        tmp_path = dest_path + '.tmp'
+        shutil.copy2(source_path, tmp_path)
+        os.replace(tmp_path, dest_path)
+        os.remove(source_path)
+
+
+def count_csv_rows(path, block_size=BLOCK_SIZE):
+    """
+    Return the number of data rows (records without the header) of a CSV file without parsing it.
+
+    The file is memory-mapped and scanned in blocks of block_size bytes for
+    newlines outside quoted fields (see CsvRecordCounter), so multiline values
+    count once and memory use does not depend on file size.
+    """
+    counter = CsvRecordCounter()
+    with open(path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return 0
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            for offset in range(0, len(mapped), block_size):
+                counter.feed(mapped[offset:offset + block_size])
+    return max(0, counter.finish() - 1)
+
+
+def iter_csv_records(path, encoding='utf-8-sig'):
+    """
+    Yield the records of a CSV file (header first) as lists of strings, one at a time.
+
+    The file is streamed through csv.reader, so multiline values stay in one
+    record and memory use does not depend on file size.
+    """
+    with open(path, 'r', encoding=encoding, newline='') as f:
+        for record in csv.reader(f):
+            yield record
+
+
+def postprocess_csv(source_path, dest_path, rename_columns=None, block_size=BLOCK_SIZE):
+    """
+    Move an exported CSV to dest_path, rename header columns and count its records in one pass.
+
+    Only the header line is rewritten; the body is copied in large blocks while
+    records, bytes and the SHA-256 of the final file are computed, so memory use
+    does not depend on file size. Without header changes the file is moved
+    (renamed) and only read once. Pass source_path == dest_path to just collect
+    the statistics of a file.
+    """
+    rename_columns = rename_columns or {}
+    result = PostprocessResult(dest_path)
+    counter = CsvRecordCounter()
+    digest = hashlib.sha256()
+    tmp_path = dest_path + '.tmp'
+
+    with open(source_path, 'rb') as src:
+        header_line = src.readline()
+        new_header, result.renamed_columns = _rename_header_line(header_line, rename_columns) if header_line else (header_line, [])
+
+        if result.renamed_columns:
+            with open(tmp_path, 'wb') as dst:
+                dst.write(new_header)
+                digest.update(new_header)
+                result.byte_size = len(new_header)
+                while True:
+                    block = src.read(block_size)
+                    if not block:
+                        break
+                    counter.feed(block)
+                    digest.update(block)
+                    dst.write(block)
+                    result.byte_size += len(block)
+        else:
+            digest.update(header_line)
+            result.byte_size = len(header_line)
+            while True:
+                block = src.read(block_size)
+                if not block:
+                    break
+                counter.feed(block)
+                digest.update(block)
+                result.byte_size += len(block)
+
+    if result.renamed_columns:
+        os.replace(tmp_path, dest_path)
+        if os.path.abspath(source_path) != os.path.abspath(dest_path):
+            os.remove(source_path)
+    elif os.path.abspath(source_path) != os.path.abspath(dest_path):
+        replace_file(source_path, dest_path)
+
+    result.row_count = counter.finish()
+    result.sha256 = digest.hexdigest()
+    return result
+
+
+def split_csv(source_path, dest_dir, chunk_rows, prefix=None):
+    """
+    Split a CSV file into files of at most chunk_rows records, each with the header line.
+
+    The file is streamed line by line and the bytes are copied unchanged; a
+    line only ends a record when it leaves no quoted field open, so multiline
+    values are never cut. Returns the list of chunk file paths.
+    """
+    prefix = prefix or os.path.splitext(os.path.basename(source_path))[0]
+    os.makedirs(dest_dir, exist_ok=True)
+    chunk_files = []
+    dst = None
+    rows_in_chunk = 0
+    in_quotes = False
+
+    with open(source_path, 'rb') as src:
+        header_line = src.readline()
+        try:
+            for line in src:
+                if dst is None:
+                    chunk_path = os.path.join(dest_dir, f"{prefix}_part{len(chunk_files) + 1:03d}.csv")
+                    chunk_files.append(chunk_path)
+                    dst = open(chunk_path, 'wb')
+                    dst.write(header_line)
+                dst.write(line)
+                if line.count(b'"') % 2:
+                    in_quotes = not in_quotes
+                if not in_quotes:
+                    rows_in_chunk += 1
+                    if rows_in_chunk >= chunk_rows:
+                        dst.close()
+                        dst = None
+                        rows_in_chunk = 0
+        finally:
+            if dst is not None:
+                dst.close()
+    return chunk_files
+
+
+def merge_csv_files(source_paths, dest_path, block_size=BLOCK_SIZE):
+    """
+    Concatenate CSV files with the same header into dest_path, keeping the header once.
+
+    Returns the number of files merged; dest_path is only written if at least one
+    source file exists.
+    """
+    sources = [path for path in source_paths if os.path.exists(path)]
+    if not sources:
+        return 0
+    tmp_path = dest_path + '.tmp'
+    last = b''
+    with open(tmp_path, 'wb') as dst:
+        for index, path in enumerate(sources):
+            with open(path, 'rb') as src:
+                header_line = src.readline()
+                if index == 0:
+                    dst.write(header_line)
+                    last = header_line[-1:]
+                first_block = True
+                while True:
+                    block = src.read(block_size)
+                    if not block:
+                        break
+                    if first_block and last and last != b'\n':
+                        # Previous file ended without a line break
+                        dst.write(b'\n')
+                    first_block = False
+                    dst.write(block)
+                    last = block[-1:]
+    os.replace(tmp_path, dest_path)
+    return len(sources)
@@ -0,0 +1,148 @@
+import os
+import re
+import json
+
+WILDCARD = '<*>'
+
+# Quoted values and tokens containing digits are parameters before any clustering
+quoted_pattern = re.compile(r"'[^']*'|\"[^\"]*\"")
+digit_pattern = re.compile(r'\d')
+# Brackets and punctuation around a token stay part of the template: "(max 128)" -> "(max <*>)"
+token_pattern = re.compile(r'^([(\[{]*)(.*?)([)\]}.,;:]*)$')
+
+# Parse tree: message length -> first (DEPTH - 2) tokens -> clusters
+DEFAULT_DEPTH = 4
+DEFAULT_SIMILARITY = 0.5
+DEFAULT_MAX_CHILDREN = 100
+
+LEAF = ''
+
+
+def mask_token(token):
+    """Return <*> (keeping surrounding brackets/punctuation) for tokens containing digits"""
+    if not digit_pattern.search(token):
+        return token
+    prefix, _, suffix = token_pattern.match(token).groups()
+    return prefix + WILDCARD + suffix
+
+
+def tokenize(message):
+    """Split a message into tokens; quoted values and tokens with digits become <*>"""
+    return [mask_token(token) for token in quoted_pattern.sub(WILDCARD, message).split()]
+
+
+def get_template(cluster):
+    return ' '.join(cluster['tokens'])
+
+
+class TemplateMiner:
+    """
+    Online error template miner (Drain: fixed-depth parse tree, He et al. 2017).
+
+    Messages are routed by their token count and first tokens to a small list of
+    clusters; a message joins the most similar cluster if at least `similarity` of
+    its tokens match the template, positions that differ become <*>. Otherwise it
+    starts a new cluster. Classifying a message costs O(message length) plus the
+    comparisons within one leaf. Templates and their counts are kept in state_file
+    and grow with every analysed failure file.
+    """
+
+    def __init__(self, state_file=None, depth=DEFAULT_DEPTH, similarity=DEFAULT_SIMILARITY,
+                 max_children=DEFAULT_MAX_CHILDREN):
+        self.state_file = state_file
+        self.depth = max(3, depth)
+        self.similarity = similarity
+        self.max_children = max_children
+        self.clusters = []
+        self.root = {}
+        if state_file and os.path.exists(state_file):
+            try:
+                with open(state_file, 'r', encoding='utf-8') as f:
+                    state = json.load(f)
+            except (OSError, ValueError) as e:
+                print(f"Warning: Ignoring unreadable template file {state_file}: {e}")
+                state = {}
+            for cluster in state.get('clusters', []):
+                self._insert({'id': cluster['id'], 'tokens': cluster['template'].split(), 'count': cluster['count']})
+
+    def _leaf(self, tokens):
+        node = self.root.setdefault(len(tokens), {})
+        for token in tokens[:self.depth - 2]:
+            if token not in node and len(node) >= self.max_children:
+                token = WILDCARD
+            node = node.setdefault(token, {})
+        return node.setdefault(LEAF, [])
+
+    def _find_leaf(self, tokens):
+        """Return the clusters of a message's leaf without adding nodes to the tree"""
+        node = self.root.get(len(tokens), {})
+        for token in tokens[:self.depth - 2]:
+            node = node.get(token, node.get(WILDCARD, {}))
+        return node.get(LEAF, [])
+
+    def _best_cluster(self, leaf, tokens):
+        """Return the most similar cluster of a leaf, or None below the similarity threshold"""
+        best = None
+        best_score = (-1.0, 0)
+        for cluster in leaf:
+            score = self._similarity(cluster['tokens'], tokens)
+            if score[0] > best_score[0] or (score[0] == best_score[0] and score[1] > best_score[1]):
+                best, best_score = cluster, score
+        return best if best is not None and best_score[0] >= self.similarity else None
+
+    def _insert(self, cluster):
+        self.clusters.append(cluster)
+        self._leaf(cluster['tokens']).append(cluster)
+        return cluster
+
+    def _similarity(self, template, tokens):
+        """Return (share of equal tokens, number of wildcards) of a template and a message"""
+        same = sum(1 for a, b in zip(template, tokens) if a == b and a != WILDCARD)
+        wildcards = template.count(WILDCARD)
+        return (same / len(tokens) if tokens else 1.0), wildcards
+
+    def add(self, message, count=1):
+        """
+        Classify a message (count times); returns its cluster.
+
+        The template of a cluster can still become more general with later
+        messages, so read it with get_template() after all messages are added.
+        """
+        tokens = tokenize(message)
+        best = self._best_cluster(self._leaf(tokens), tokens)
+        if best is None:
+            best = self._insert({'id': max((c['id'] for c in self.clusters), default=0) + 1, 'tokens': tokens, 'count': 0})
+        else:
+            best['tokens'] = [a if a == b else WILDCARD for a, b in zip(best['tokens'], tokens)]
+        best['count'] += count
+        return best
+
+    def match(self, message):
+        """
+        Return the cluster a message belongs to without changing any template or count.
+
+        Used for messages that were already counted (e.g. a failure file analysed
+        before). A message without a similar cluster gets a temporary cluster with
+        id None that is not stored.
+        """
+        tokens = tokenize(message)
+        best = self._best_cluster(self._find_leaf(tokens), tokens)
+        return best if best is not None else {'id': None, 'tokens': tokens, 'count': 0}
+
+    def save(self):
+        """Write the templates to state_file (atomically)"""
+        if not self.state_file:
+            return
+        os.makedirs(os.path.dirname(os.path.abspath(self.state_file)), exist_ok=True)
+        clusters = sorted(self.clusters, key=lambda cluster: cluster['count'], reverse=True)
+        tmp_file = self.state_file + '.tmp'
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump({
+                'depth': self.depth,
+                'similarity': self.similarity,
+                'clusters': [
+                    {'id': cluster['id'], 'template': get_template(cluster), 'count': cluster['count']}
+                    for cluster in clusters
+                ],
+            }, f, indent=4, ensure_ascii=False)
+        os.replace(tmp_file, self.state_file)
@@ -0,0 +1,127 @@
+import os
+import codecs
+import pandas as pd
+
+# Supported sidecar formats and their file extensions
+SIDECAR_FORMATS = {
+    'parquet': '.parquet',
+    'feather': '.feather',
+}
+
+# read_csv arguments a sidecar is written with; reads with other arguments bypass the cache
+SIDECAR_READ_ARGS = {'encoding': 'utf-8'}
+
+
+def pyarrow_available():
+    """Return True if pyarrow (needed for Parquet/Feather) is installed"""
+    try:
+        import pyarrow  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+def get_sidecar_path(csv_path, fmt='parquet'):
+    """Return the sidecar file path (<file>.parquet / <file>.feather) for a CSV file"""
+    return os.path.splitext(csv_path)[0] + SIDECAR_FORMATS[fmt]
+
+
+def cache_compatible(read_csv_kwargs):
+    """Return True if pd.read_csv with these arguments parses a CSV exactly like the sidecar was written"""
+    if set(read_csv_kwargs) - set(SIDECAR_READ_ARGS):
+        return False
+    encoding = read_csv_kwargs.get('encoding') or SIDECAR_READ_ARGS['encoding']
+    try:
+        return codecs.lookup(encoding).name == codecs.lookup(SIDECAR_READ_ARGS['encoding']).name
+    except LookupError:
+        return False
+
+
+def find_fresh_sidecar(csv_path):
+    """Return (path, format) of a sidecar that is at least as new as the CSV, or (None, None)"""
+    csv_mtime = os.path.getmtime(csv_path)
+    for fmt in SIDECAR_FORMATS:
+        sidecar = get_sidecar_path(csv_path, fmt)
+        if os.path.exists(sidecar) and os.path.getmtime(sidecar) >= csv_mtime:
+            return sidecar, fmt
+    return None, None
+
+
+def _encode_columns(df):
+    """Dictionary-encode repetitive text columns so the sidecar stays small and loads fast"""
+    for column in df.columns:
+        series = df[column]
+        is_text = series.dtype == object or pd.api.types.is_string_dtype(series.dtype)
+        if is_text and len(series) and series.nunique(dropna=True) <= len(series) // 2:
+            df[column] = series.astype('category')
+    return df
+
+
+def write_sidecar(csv_path, fmt='parquet', df=None):
+    """
+    Write a typed, dictionary-encoded columnar copy of an exported CSV file.
+
+    The CSV is parsed with SIDECAR_READ_ARGS, so a DataFrame read from the sidecar
+    matches pd.read_csv of the CSV with these arguments.
+    Returns the sidecar path, or None if pyarrow is missing or writing failed.
+    """
+    if fmt not in SIDECAR_FORMATS:
+        print(f"Warning: Unknown columnar cache format '{fmt}' (use {', '.join(SIDECAR_FORMATS)})")
+        return None
+    if not pyarrow_available():
+        print("Warning: pyarrow is not installed, columnar cache disabled")
+        return None
+
+    sidecar = get_sidecar_path(csv_path, fmt)
+    tmp_file = sidecar + '.tmp'
+    try:
+        if df is None:
+            df = pd.read_csv(csv_path, **SIDECAR_READ_ARGS)
+        table = _encode_columns(df.copy())
+        if fmt == 'parquet':
+            table.to_parquet(tmp_file, engine='pyarrow', index=False)
+        else:
+            table.reset_index(drop=True).to_feather(tmp_file)
+        os.replace(tmp_file, sidecar)
+        return sidecar
+    except Exception as e:
+        print(f"Warning: Could not write columnar cache for {os.path.basename(csv_path)}: {e}")
+        if os.path.exists(tmp_file):
+            os.remove(tmp_file)
+        return None
+
+
+def _decode_columns(df):
+    """Turn dictionary-encoded columns back into the text columns pd.read_csv returns"""
+    for column in df.columns:
+        if isinstance(df[column].dtype, pd.CategoricalDtype):
+            df[column] = df[column].astype(df[column].cat.categories.dtype)
+    return df
+
+
+def read_export_csv(csv_path, write_cache=False, cache_format='parquet', **read_csv_kwargs):
+    """
+    Read an exported CSV file, preferring a columnar sidecar that is newer than the CSV.
+
+    Sidecars are written by the export runner when general.columnar_cache is set.
+    On a cache miss the CSV is parsed with pd.read_csv and, only if write_cache is
+    set and pyarrow is installed, a sidecar is written for the next run. Reads with
+    read_csv arguments other than SIDECAR_READ_ARGS never use or write the cache.
+    """
+    use_cache = cache_compatible(read_csv_kwargs)
+    if use_cache and pyarrow_available():
+        sidecar, fmt = find_fresh_sidecar(csv_path)
+        if sidecar:
+            try:
+                if fmt == 'parquet':
+                    df = pd.read_parquet(sidecar, engine='pyarrow')
+                else:
+                    df = pd.read_feather(sidecar)
+                return _decode_columns(df)
+            except Exception as e:
+                print(f"Warning: Ignoring unreadable columnar cache {os.path.basename(sidecar)}: {e}")
+
+    df = pd.read_csv(csv_path, **read_csv_kwargs)
+    if use_cache and write_cache and pyarrow_available():
+        write_sidecar(csv_path, cache_format, df=df)
+    return df
@@ -0,0 +1,249 @@
+"""
+Failure history: SQLite database with the error templates of every analysed failure file (logs/failure_history.db).
+
+Tables
+- failure_files: one row per ingested *_FAILURE.csv (by SHA-256) with vault
+  (host name, see normalize_vault), object, run timestamp, loader rows and failed rows.
+- templates: error templates of logs/error_templates.json (id -> current text).
+- failure_counts: failed rows and distinct messages per failure file and template.
+
+02a_analyse_failure.py ingests every file it analyses; a file whose hash is
+already in the history is skipped. Template ids are the cluster ids of
+logs/error_templates.json, so both files belong together.
+
+Start Parameter
+- `trend [--vault DNS] [--object NAME] [--error TEXT] [--last N]`: failed rows per run
+  and the change of every error template since the previous run.
+"""
+import os
+import sys
+import hashlib
+import sqlite3
+import argparse
+from datetime import datetime
+from urllib.parse import urlparse
+from csv_utils import BLOCK_SIZE
+
+FAILURE_HISTORY_FILE = os.path.join('logs', 'failure_history.db')
+
+# Runs shown per object by default
+TREND_RUNS = 10
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS failure_files (
+    id INTEGER PRIMARY KEY,
+    sha256 TEXT NOT NULL UNIQUE,
+    vault TEXT NOT NULL,
+    object_name TEXT NOT NULL,
+    run_timestamp TEXT NOT NULL,
+    loader_file TEXT,
+    failure_file TEXT,
+    total_rows INTEGER,
+    failed_rows INTEGER,
+    ingested TEXT
+);
+CREATE TABLE IF NOT EXISTS templates (
+    id INTEGER PRIMARY KEY,
+    template TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS failure_counts (
+    file_id INTEGER NOT NULL REFERENCES failure_files(id),
+    template_id INTEGER NOT NULL REFERENCES templates(id),
+    count INTEGER NOT NULL,
+    messages INTEGER NOT NULL,
+    PRIMARY KEY (file_id, template_id)
+);
+CREATE INDEX IF NOT EXISTS failure_files_key ON failure_files(vault, object_name, run_timestamp);
+CREATE INDEX IF NOT EXISTS failure_counts_template ON failure_counts(template_id);
+"""
+
+
+def normalize_vault(vault):
+    """Return the host name of a vault given as DNS (https://host), host or folder name, lower case"""
+    vault = str(vault).strip()
+    host = urlparse(vault if '://' in vault else '//' + vault).hostname
+    return host or vault.lower()
+
+
+def file_sha256(path, block_size=BLOCK_SIZE):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        while True:
+            block = f.read(block_size)
+            if not block:
+                break
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def connect(history_file):
+    """Open the failure history (rows as sqlite3.Row), creating it if needed"""
+    os.makedirs(os.path.dirname(os.path.abspath(history_file)), exist_ok=True)
+    connection = sqlite3.connect(history_file, timeout=30)
+    connection.row_factory = sqlite3.Row
+    connection.executescript(SCHEMA)
+    return connection
+
+
+def is_ingested(connection, sha256):
+    return connection.execute("SELECT 1 FROM failure_files WHERE sha256 = ?", (sha256,)).fetchone() is not None
+
+
+def ingest_failure_file(connection, sha256, vault, object_name, run_timestamp, template_counts,
+                        loader_file=None, failure_file=None, total_rows=None, failed_rows=None):
+    """
+    Store one analysed failure file in a single transaction.
+
+    template_counts maps a template id to (failed rows, distinct messages).
+    Returns False if a file with this hash was already ingested.
+    """
+    if not isinstance(total_rows, int):
+        total_rows = None
+    if not isinstance(failed_rows, int):
+        failed_rows = None
+    with connection:
+        cursor = connection.execute(
+            "INSERT OR IGNORE INTO failure_files (sha256, vault, object_name, run_timestamp, loader_file, failure_file, "
+            "total_rows, failed_rows, ingested) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (sha256, vault, object_name, run_timestamp, loader_file, failure_file, total_rows, failed_rows,
+             datetime.now().strftime("%Y-%m-%d %H:%M:%S"))
+        )
+        if not cursor.rowcount:
+            return False
+        connection.executemany(
+            "INSERT INTO failure_counts (file_id, template_id, count, messages) VALUES (?, ?, ?, ?)",
+            [(cursor.lastrowid, template_id, count, messages) for template_id, (count, messages) in template_counts.items()]
+        )
+    return True
+
+
+def update_templates(connection, templates):
+    """Store the current text of the templates ({template id: template})"""
+    with connection:
+        connection.executemany(
+            "INSERT INTO templates (id, template) VALUES (?, ?) ON CONFLICT(id) DO UPDATE SET template = excluded.template",
+            list(templates.items())
+        )
+
+
+def object_runs(connection, vault=None, object_name=None, last=TREND_RUNS):
+    """
+    Return the last runs of every matching (vault, object), newest first.
+
+    Failure files of the same object and run (e.g. chunks) are added up.
+    """
+    conditions, params = [], []
+    if vault:
+        conditions.append("vault = ?")
+        params.append(normalize_vault(vault))
+    if object_name:
+        conditions.append("object_name = ?")
+        params.append(object_name)
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+    return connection.execute(
+        "SELECT vault, object_name, run_timestamp, files, total_rows, failed_rows FROM ("
+        "SELECT vault, object_name, run_timestamp, COUNT(*) AS files, SUM(total_rows) AS total_rows, "
+        "SUM(failed_rows) AS failed_rows, ROW_NUMBER() OVER (PARTITION BY vault, object_name "
+        f"ORDER BY run_timestamp DESC) AS run_number FROM failure_files {where} "
+        "GROUP BY vault, object_name, run_timestamp) WHERE run_number <= ? "
+        "ORDER BY vault, object_name, run_timestamp DESC",
+        params + [last]
+    ).fetchall()
+
+
+def template_counts(connection, vault, object_name, run_timestamps, error_filter=None):
+    """Return {template: {run timestamp: failed rows}} of one object for the given runs"""
+    if not run_timestamps:
+        return {}
+    query = (
+        "SELECT t.template, f.run_timestamp, SUM(c.count) AS count FROM failure_counts c "
+        "JOIN failure_files f ON f.id = c.file_id JOIN templates t ON t.id = c.template_id "
+        f"WHERE f.vault = ? AND f.object_name = ? AND f.run_timestamp IN ({', '.join('?' * len(run_timestamps))})"
+    )
+    params = [vault, object_name] + list(run_timestamps)
+    if error_filter:
+        query += " AND t.template LIKE ?"
+        params.append(f"%{error_filter}%")
+    query += " GROUP BY t.template, f.run_timestamp"
+    counts = {}
+    for row in connection.execute(query, params):
+        counts.setdefault(row['template'], {})[row['run_timestamp']] = row['count']
+    return counts
+
+
+def format_run_timestamp(run_timestamp):
+    try:
+        return datetime.strptime(run_timestamp, "%Y%m%d_%H%M%S").strftime("%Y-%m-%d %H:%M")
+    except ValueError:
+        return run_timestamp
+
+
+def print_failure_trends(connection, vault=None, object_name=None, error_filter=None, last=TREND_RUNS):
+    """
+    Print failed rows per run and the change of every error template since the previous run.
+
+    Returns the number of (vault, object) combinations shown.
+    """
+    runs = object_runs(connection, vault, object_name, last)
+    groups = {}
+    for run in runs:
+        groups.setdefault((run['vault'], run['object_name']), []).append(run)
+    if not groups:
+        print("No failure history found for this selection.")
+        return 0
+
+    for (group_vault, group_object), group_runs in groups.items():
+        print(f"\n\033[32m=== {group_object} on {group_vault} ===\033[0m")
+        for run in group_runs:
+            total = run['total_rows'] if run['total_rows'] is not None else "N/A"
+            print(f"- {format_run_timestamp(run['run_timestamp'])}: {run['failed_rows'] if run['failed_rows'] is not None else 'N/A'} "
+                  f"of {total} rows failed ({run['files']} file{'s' if run['files'] != 1 else ''})")
+
+        timestamps = [run['run_timestamp'] for run in group_runs]
+        counts = template_counts(connection, group_vault, group_object, timestamps, error_filter)
+        if not counts:
+            print("No matching error templates.")
+            continue
+        latest = timestamps[0]
+        previous = timestamps[1] if len(timestamps) > 1 else None
+        label = f"since {format_run_timestamp(previous)}" if previous else "(first run)"
+        print(f"\nError templates, latest run {label}:")
+        rows = sorted(counts.items(), key=lambda item: (-item[1].get(latest, 0), -item[1].get(previous, 0)))
+        for template, per_run in rows:
+            now = per_run.get(latest, 0)
+            if previous is None:
+                print(f"- {now}: {template}")
+                continue
+            delta = now - per_run.get(previous, 0)
+            marker = "🔺" if delta > 0 else ("🔻" if delta < 0 else "=")
+            # Oldest to newest, so the trend reads left to right
+            history = ' → '.join(str(per_run.get(timestamp, 0)) for timestamp in reversed(timestamps))
+            print(f"- {marker} {delta:+d} ({history}): {template}")
+    return len(groups)
+
+
+def main():
+    script_dir = os.path.dirname(os.path.abspath(__file__))
+    parser = argparse.ArgumentParser(description="Query the failure history of analysed failure files")
+    parser.add_argument('--history', default=os.path.join(script_dir, FAILURE_HISTORY_FILE),
+                        help="History database (default logs/failure_history.db)")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    trend_parser = subparsers.add_parser('trend', help="Failed rows and error templates per run")
+    trend_parser.add_argument('--vault', help="Only this vault (DNS)")
+    trend_parser.add_argument('--object', help="Only this object, e.g. qms_organization__qdm")
+    trend_parser.add_argument('--error', help="Only error templates containing this text")
+    trend_parser.add_argument('--last', type=int, default=TREND_RUNS, help=f"Runs per object (default {TREND_RUNS})")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.history):
+        print(f"Failure history not found: {args.history}")
+        return 1
+    connection = connect(args.history)
+    try:
+        return 0 if print_failure_trends(connection, args.vault, args.object, args.error, args.last) else 1
+    finally:
+        connection.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,6 +1,8 @@
 import os
 import pandas as pd
 from pathlib import Path
+from export_cache import read_export_csv
+from column_mapping import ColumnProfiles, resolve_and_apply_required_columns
 
 FOLDER_PROMPT_TEXT = (
     "Please enter the vault export folder path "
@@ -15,122 +17,6 @@ REQUIRED_FILES = [
 ]
 
 
-def _normalize_column_name(column_name):
-    normalized = str(column_name).strip().lower()
-    normalized = normalized.replace('ignore.', '')
-    for ch in [' ', '.', '_', '-']:
-        normalized = normalized.replace(ch, '')
-    return normalized
-
-
-def _get_candidate_columns(expected_column, available_columns, aliases=None):
-    aliases = aliases or []
-    expected_norm = _normalize_column_name(expected_column)
-    wanted = [expected_column] + aliases
-
-    candidates = []
-
-    for candidate in wanted:
-        if candidate in available_columns and candidate not in candidates:
-            candidates.append(candidate)
-
-    lower_map = {str(col).strip().lower(): col for col in available_columns}
-    for candidate in wanted:
-        key = str(candidate).strip().lower()
-        if key in lower_map:
-            mapped = lower_map[key]
-            if mapped not in candidates:
-                candidates.append(mapped)
-
-    for column in available_columns:
-        if _normalize_column_name(column) == expected_norm and column not in candidates:
-            candidates.append(column)
-
-    return candidates
-
-
-def _resolve_required_column(df, dataframe_label, expected_column, aliases=None):
-    columns = df.columns.tolist()
-
-    if expected_column in columns:
-        return expected_column
-
-    candidates = _get_candidate_columns(expected_column, columns, aliases=aliases)
-
-    print("\n" + "-" * 80)
-    print(f"⚠ Required column '{expected_column}' not found in {dataframe_label}.")
-    print(f"Available columns: {', '.join(columns)}")
-
-    if candidates:
-        print(f"Suggested alternative columns: {', '.join(candidates)}")
-
-    while True:
-        user_input = input(
-            f"Map '{expected_column}' to which column? "
-            "(enter name, number, or 'abort'): "
-        ).strip()
-
-        if user_input.lower() == 'abort':
-            return None
-
-        if user_input.isdigit():
-            column_index = int(user_input) - 1
-            if 0 <= column_index < len(columns):
-                return columns[column_index]
-            print(f"❌ Invalid selection '{user_input}'. Please select 1 to {len(columns)}.")
-            continue
-
-        if user_input in columns:
-            return user_input
-
-        for column in columns:
-            if column.strip().lower() == user_input.strip().lower():
-                return column
-
-        print("❌ Column not found. You can paste the exact header, enter a number, or type 'abort'.")
-
-
-def _apply_column_mapping(df, dataframe_label, mapping):
-    for expected_column, selected_column in mapping.items():
-        if selected_column is None:
-            continue
-
-        if expected_column == selected_column:
-            continue
-
-        if expected_column in df.columns:
-            print(
-                f"⚠ {dataframe_label}: '{expected_column}' already exists. "
-                f"Keeping it and ignoring mapped column '{selected_column}'."
-            )
-            continue
-
-        df = df.rename(columns={selected_column: expected_column})
-
-    return df
-
-
-def _resolve_and_apply_required_columns(df, dataframe_label, required_columns):
-    mapping = {}
-
-    for config in required_columns:
-        expected = config['expected']
-        aliases = config.get('aliases', [])
-        selected = _resolve_required_column(df, dataframe_label, expected, aliases=aliases)
-
-        if selected is None:
-            print(f"❌ Aborted: required column '{expected}' could not be mapped for {dataframe_label}.")
-            return None
-
-        mapping[expected] = selected
-
-    print(f"\nColumn mapping for {dataframe_label}:")
-    for expected, selected in mapping.items():
-        print(f"  - {expected} <- {selected}")
-
-    df = _apply_column_mapping(df, dataframe_label, mapping)
-    return df
-
 def ask_for_folder_path():
     """Ask user to provide folder path where CSV files can be found"""
     while True:
@@ -175,17 +61,17 @@ def load_csv_files(folder_path):
     try:
         # Load keyword CSV
         keyword_path = os.path.join(folder_path, "22_keyword__c.csv")
-        df_keyword = pd.read_csv(keyword_path)
+        df_keyword = read_export_csv(keyword_path)
         print(f"✓ Loaded 22_keyword__c.csv: {len(df_keyword)} rows")
         
         # Load QMS unit CSV
         qms_unit_path = os.path.join(folder_path, "10_qms_unit__c.csv")
-        df_qms_unit = pd.read_csv(qms_unit_path)
+        df_qms_unit = read_export_csv(qms_unit_path)
         print(f"✓ Loaded 10_qms_unit__c.csv: {len(df_qms_unit)} rows")
         
         # Load QMS unit keywords join CSV
         join_path = os.path.join(folder_path, "35_qms_unit_keywords_join__c.csv")
-        df_join = pd.read_csv(join_path)
+        df_join = read_export_csv(join_path)
         print(f"✓ Loaded 35_qms_unit_keywords_join__c.csv: {len(df_join)} rows")
         
         return df_keyword, df_qms_unit, df_join
@@ -194,42 +80,48 @@ def load_csv_files(folder_path):
         print(f"Error loading CSV files: {str(e)}")
         return None, None, None
 
-def perform_joins(df_keyword, df_qms_unit, df_join):
+def perform_joins(df_keyword, df_qms_unit, df_join, profiles=None, non_interactive=False):
     """Perform the specified left joins and return final dataframe"""
     print("\nPerforming data joins...")
     
     try:
         # Resolve required columns in each dataframe
-        df_join = _resolve_and_apply_required_columns(
+        df_join = resolve_and_apply_required_columns(
             df_join,
             "35_qms_unit_keywords_join__c.csv",
             [
                 {'expected': 'keyword__c'},
                 {'expected': 'qms_unit__c'}
-            ]
+            ],
+            profiles=profiles,
+            non_interactive=non_interactive
         )
         if df_join is None:
             return None
 
-        df_keyword = _resolve_and_apply_required_columns(
+        df_keyword = resolve_and_apply_required_columns(
             df_keyword,
             "22_keyword__c.csv",
             [
                 {'expected': 'keyword__c.id', 'aliases': ['ignore.id', 'id']},
                 {'expected': 'name__v'},
                 {'expected': 'keyword_type__c'}
-            ]
+            ],
+            profiles=profiles,
+            non_interactive=non_interactive
         )
         if df_keyword is None:
             return None
 
-        df_qms_unit = _resolve_and_apply_required_columns(
+        df_qms_unit = resolve_and_apply_required_columns(
             df_qms_unit,
             "10_qms_unit__c.csv",
             [
                 {'expected': 'qms_unit__c.id', 'aliases': ['ignore.id', 'id']},
                 {'expected': 'name__v'}
-            ]
+            ],
+            profiles=profiles,
+            non_interactive=non_interactive
         )
         if df_qms_unit is None:
             return None
@@ -336,8 +228,13 @@ def display_results(df_final, folder_path):
     return output_path
 
 
-def build_keyword_qms_unit_joins_from_folder(folder_path):
-    """Build 35_qms_unit_keywords_join__c_for_import.csv from a given folder and return output path."""
+def build_keyword_qms_unit_joins_from_folder(folder_path, non_interactive=False):
+    """
+    Build 35_qms_unit_keywords_join__c_for_import.csv from a given folder and return output path.
+
+    Column mappings are reused from logs/column_profiles.json; with non_interactive=True
+    a header without saved mapping aborts instead of asking.
+    """
     if not folder_path:
         print("Error: Empty folder path provided.")
         return None
@@ -375,7 +272,7 @@ def build_keyword_qms_unit_joins_from_folder(folder_path):
         print("Failed to load CSV files. Operation aborted.")
         return None
 
-    df_final = perform_joins(df_keyword, df_qms_unit, df_join)
+    df_final = perform_joins(df_keyword, df_qms_unit, df_join, profiles=ColumnProfiles(), non_interactive=non_interactive)
     if df_final is None:
         print("Failed to build join data. Operation aborted.")
         return None
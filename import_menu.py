@@ -139,6 +139,7 @@ def main_menu():
         print("3. Activate all imports")
         print("4. Deactivate all imports")
         print("5. Analyze Failure Files")
+        print("6. Retry Failed Rows")
         print("0. Exit")
         choice = input("Select an option: ").strip()
         
@@ -201,6 +202,16 @@ def main_menu():
             print(f"All imports deactivated. Backup saved as {backup_path}")
         elif choice == "5":
             analyze_failures()
+        elif choice == "6":
+            VaultImportRunner = get_vault_import_runner_class()
+            runner = VaultImportRunner(config_file=os.path.join('config', config_file))
+            max_passes = runner.get_max_retry_passes()
+            print(f"\nRe-import only the rows of <loader>_FAILURE.csv (up to {max_passes} pass(es) per import).")
+            proceed = input("Proceed with retry? (y/n): ").strip().lower()
+            if proceed == 'y':
+                runner.retry_failed_imports()
+            else:
+                print("Aborted by user.")
         elif choice == "0":
             print("Exiting.")
             break
@@ -0,0 +1,98 @@
+import os
+from csv_utils import iter_csv_records
+from run_manifest import load_manifest
+
+PREFLIGHT_MODES = ('off', 'report', 'quarantine')
+
+# Columns whose values must be unique within one loader file. name__v is not
+# unique for many objects; add it per object via preflight_object_key_columns.
+DEFAULT_KEY_COLUMNS = ['id', 'external_id__v']
+
+
+def find_export_files(export_folder, object_name, manifest_dir=None):
+    """
+    Return the CSV files of the latest export of object_name in export_folder.
+
+    The newest export manifest listing the object wins (all partitions of a
+    partitioned export); without a manifest every CSV in the folder whose name
+    contains the object name is used. Delta files are never included.
+    """
+    export_folder = os.path.normcase(os.path.abspath(export_folder))
+    if manifest_dir and os.path.isdir(manifest_dir):
+        manifests = sorted(f for f in os.listdir(manifest_dir) if f.startswith('export_manifest_') and f.endswith('.json'))
+        for manifest_name in reversed(manifests):
+            try:
+                manifest = load_manifest(os.path.join(manifest_dir, manifest_name))
+            except (OSError, ValueError):
+                continue
+            paths = []
+            for entry in manifest.get('entries', []):
+                path = entry.get('path')
+                if entry.get('status') != 'success' or entry.get('object_name') != object_name or not path:
+                    continue
+                if os.path.normcase(os.path.dirname(os.path.abspath(path))) == export_folder and os.path.exists(path):
+                    paths.append(path)
+            if paths:
+                return paths
+
+    if not os.path.isdir(export_folder):
+        return []
+    return [
+        os.path.join(export_folder, f) for f in sorted(os.listdir(export_folder))
+        if f.endswith('.csv') and object_name in f and not f.endswith('__delta.csv')
+    ]
+
+
+def read_column_values(csv_file, column):
+    """Return the set of non-empty values of column (or ignore.column) in a CSV file, or None if it is missing"""
+    records = iter_csv_records(csv_file)
+    try:
+        header = next(records, [])
+        for candidate in (column, f"ignore.{column}"):
+            if candidate in header:
+                position = header.index(candidate)
+                return {record[position] for record in records if len(record) > position and record[position] != ''}
+        return None
+    finally:
+        records.close()
+
+
+def find_duplicate_keys(csv_file, key_columns):
+    """Return {column: set of values occurring more than once} for the key columns present in a CSV file"""
+    records = iter_csv_records(csv_file)
+    try:
+        header = next(records, [])
+        positions = {column: header.index(column) for column in key_columns if column in header}
+        seen = {column: set() for column in positions}
+        duplicates = {column: set() for column in positions}
+        for record in records:
+            for column, position in positions.items():
+                value = record[position] if len(record) > position else ''
+                if value == '':
+                    continue
+                if value in seen[column]:
+                    duplicates[column].add(value)
+                else:
+                    seen[column].add(value)
+        return duplicates
+    finally:
+        records.close()
+
+
+def check_loader_row(row, reference_indexes, duplicate_keys):
+    """
+    Return the error texts of one loader file row (dict column -> str) before it is sent to Vault.
+
+    reference_indexes maps a column like 'country__v.name__v' to the set of values
+    existing in the target vault; duplicate_keys maps a key column to its values
+    occurring more than once in the file.
+    """
+    errors = []
+    for column, index in reference_indexes.items():
+        value = row.get(column, '')
+        if value != '' and value not in index:
+            errors.append(f"unresolved reference {column}")
+    for column, values in duplicate_keys.items():
+        if row.get(column, '') in values:
+            errors.append(f"duplicate key {column}")
+    return errors
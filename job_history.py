@@ -0,0 +1,61 @@
+import os
+import json
+import threading
+from datetime import datetime
+
+# Runs kept per job
+MAX_ENTRIES = 10
+
+
+class JobHistory:
+    """
+    Resource usage of previous VaultDataLoader runs, per job name (logs/export_job_history.json, logs/import_job_history.json).
+
+    Every finished job appends peak RSS, CPU seconds, wall time, the heap it ran
+    with, the heap it used (GC log) and whether it ran out of memory; the file is
+    rewritten atomically.
+    """
+
+    def __init__(self, history_file, max_entries=MAX_ENTRIES):
+        self.history_file = history_file
+        self.max_entries = max_entries
+        self.lock = threading.Lock()
+        self.jobs = {}
+        if os.path.exists(history_file):
+            try:
+                with open(history_file, 'r', encoding='utf-8') as f:
+                    self.jobs = json.load(f)
+            except (OSError, ValueError) as e:
+                print(f"Warning: Ignoring unreadable job history {history_file}: {e}")
+
+    def get(self, name):
+        """Return the recorded runs of a job, oldest first"""
+        with self.lock:
+            return list(self.jobs.get(name, []))
+
+    def record(self, name, result, wall_seconds=None, xmx_mb=None, heap_used_mb=None):
+        """Store the resource usage of a finished job (a LoaderProcessResult; heap_used_mb from its GC log)"""
+        if result.peak_rss_mb is None and result.cpu_seconds is None:
+            return
+        output = (result.stdout + '\n' + result.stderr).lower()
+        entry = {
+            'timestamp': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            'peak_rss_mb': result.peak_rss_mb,
+            'cpu_seconds': result.cpu_seconds,
+            'wall_seconds': round(wall_seconds, 3) if wall_seconds is not None else None,
+            'xmx_mb': xmx_mb,
+            'heap_used_mb': heap_used_mb,
+            'oom': 'outofmemoryerror' in output,
+        }
+        with self.lock:
+            runs = self.jobs.setdefault(name, [])
+            runs.append(entry)
+            del runs[:-self.max_entries]
+            self._write()
+
+    def _write(self):
+        os.makedirs(os.path.dirname(self.history_file), exist_ok=True)
+        tmp_file = self.history_file + '.tmp'
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump(self.jobs, f, indent=4)
+        os.replace(tmp_file, self.history_file)
@@ -0,0 +1,335 @@
+"""
+JVM options and Class Data Sharing (AppCDS) for VaultDataLoader.
+
+- build_jvm_options: general.jvm_options + per-job jvm_options, plus
+  -XX:SharedArchiveFile when a current CDS archive for the jar and java exists
+  (a stale one is rebuilt once) and -Xmx/GC
+  chosen from the job's recorded heap usage (job_history.py).
+- add_gc_log / read_gc_log_heap_mb: GC log of one JVM and the heap it used.
+- build_cds_archive: one-time run with -XX:ArchiveClassesAtExit that writes
+  the archive next to VaultDataLoader.jar (VaultDataLoader.jsa) and the java
+  it was built with (VaultDataLoader.jsa.json).
+- measure_startup: times JVM start-up of the loader with the JDK's default CDS
+  and with the archive.
+
+Start Parameter
+- `build-cds --config <config>`: build the archive (optionally train with `--args "<loader arguments>"`).
+- `measure --config <config> [--runs N]`: print the start-up time gain.
+"""
+import os
+import re
+import sys
+import json
+import math
+import time
+import shlex
+import shutil
+import argparse
+import threading
+import subprocess
+import statistics
+
+CDS_ARCHIVE_EXTENSION = '.jsa'
+# Java the archive was built with; an archive only loads with exactly that JVM
+CDS_STAMP_EXTENSION = '.json'
+SHARED_ARCHIVE_OPTION = '-XX:SharedArchiveFile='
+
+# Automatic heap sizing from the job history (the most recent HEAP_HISTORY_RUNS runs)
+HEAP_HEADROOM = 1.5
+HEAP_HISTORY_RUNS = 3
+HEAP_STEP_MB = 128
+DEFAULT_MIN_HEAP_MB = 256
+DEFAULT_MAX_HEAP_MB = 8192
+SERIAL_GC_MAX_HEAP_MB = 1024
+
+# Unified GC log (JDK 9+) written into the job's working directory
+GC_LOG_FILE = 'vault_loader_gc.log'
+# "GC(3) Pause Young (Normal) (G1 Evacuation Pause) 24M->3M(256M) 2.345ms": heap used before -> after (committed)
+gc_heap_pattern = re.compile(r'(\d+)([KMG])->(\d+)([KMG])\((\d+)([KMG])\)')
+GC_LOG_UNITS = {'K': 1 / 1024, 'M': 1, 'G': 1024}
+
+_java_versions = {}
+_cds_lock = threading.Lock()
+_cds_archives = {}
+
+
+def get_cds_archive(vault_loader):
+    """Return the CDS archive path belonging to a VaultDataLoader.jar"""
+    return os.path.splitext(vault_loader)[0] + CDS_ARCHIVE_EXTENSION
+
+
+def get_java_version(java_exe):
+    """Return the `java -version` output of a java executable or None; cached per executable"""
+    if java_exe not in _java_versions:
+        output = None
+        try:
+            output = subprocess.run([java_exe, '-version'], stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                                    text=True, timeout=30).stdout.strip()
+        except (OSError, subprocess.TimeoutExpired):
+            pass
+        _java_versions[java_exe] = output
+    return _java_versions[java_exe]
+
+
+def get_java_major_version(java_exe):
+    """Return the major version of a java executable (8, 11, 17, ...) or None"""
+    match = re.search(r'version "(\d+)(?:\.(\d+))?', get_java_version(java_exe) or '')
+    if not match:
+        return None
+    return int(match.group(2)) if match.group(1) == '1' and match.group(2) else int(match.group(1))
+
+
+def get_java_stamp(java_exe):
+    """Return what identifies a java installation for the CDS archive: resolved path, mtime and `java -version`"""
+    path = shutil.which(java_exe) or java_exe
+    path = os.path.realpath(path)
+    return {
+        'java_exe': path,
+        'java_mtime': os.path.getmtime(path) if os.path.exists(path) else None,
+        'java_version': get_java_version(java_exe),
+    }
+
+
+def cds_archive_usable(vault_loader, java_exe):
+    """
+    Return the archive path if it is current, else None.
+
+    Current means not older than the jar and built with this java (same path,
+    mtime and version, see build_cds_archive). A JVM given a foreign archive
+    prints a warning to stdout, which the runners count as unexpected output.
+    """
+    archive = get_cds_archive(vault_loader)
+    if not (os.path.exists(archive) and os.path.exists(vault_loader)
+            and os.path.getmtime(archive) >= os.path.getmtime(vault_loader)):
+        return None
+    try:
+        with open(archive + CDS_STAMP_EXTENSION, 'r', encoding='utf-8') as f:
+            stamp = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return archive if stamp == get_java_stamp(java_exe) else None
+
+
+def get_current_cds_archive(java_exe, vault_loader, jvm_options=None):
+    """
+    Return the CDS archive to use for this java and jar, or None.
+
+    An existing archive that is older than the jar or was built with another
+    java is rebuilt once per process (without training arguments).
+    """
+    key = (java_exe, vault_loader)
+    with _cds_lock:
+        if key not in _cds_archives:
+            archive = cds_archive_usable(vault_loader, java_exe)
+            if not archive and os.path.exists(get_cds_archive(vault_loader)):
+                print("⚠ CDS archive is older than the jar or was built with another java, rebuilding it")
+                archive = build_cds_archive(java_exe, vault_loader, jvm_options)
+            _cds_archives[key] = archive
+        return _cds_archives[key]
+
+
+def add_gc_log(java_command, cwd):
+    """
+    Return (java_command with -Xlog:gc written to cwd, log path).
+
+    The command is returned unchanged with path None if the JVM is older than
+    JDK 9 (no unified logging) or already logs GC.
+    """
+    jar_index = java_command.index('-jar')
+    if any(opt.startswith('-Xlog:gc') or opt.startswith('-Xloggc') for opt in java_command[:jar_index]):
+        return java_command, None
+    version = get_java_major_version(java_command[0])
+    if not version or version < 9:
+        return java_command, None
+    gc_log = os.path.join(cwd, GC_LOG_FILE)
+    return java_command[:jar_index] + [f'-Xlog:gc:file={gc_log}'] + java_command[jar_index:], gc_log
+
+
+def read_gc_log_heap_mb(gc_log):
+    """Return the highest heap occupancy before a GC in a unified GC log in MB, or None (no GC or no log)"""
+    if not gc_log or not os.path.exists(gc_log):
+        return None
+    peak = None
+    try:
+        with open(gc_log, 'r', encoding='utf-8', errors='replace') as f:
+            for line in f:
+                match = gc_heap_pattern.search(line)
+                if match:
+                    used = float(match.group(1)) * GC_LOG_UNITS[match.group(2)]
+                    peak = used if peak is None else max(peak, used)
+    except OSError:
+        return None
+    return round(peak, 1) if peak is not None else None
+
+
+def get_xmx_mb(options):
+    """Return the -Xmx of a JVM option list in MB, or None"""
+    for opt in reversed(options):
+        if opt.startswith('-Xmx'):
+            value = opt[4:].lower()
+            units = {'k': 1 / 1024, 'm': 1, 'g': 1024, 't': 1024 * 1024}
+            try:
+                if value and value[-1] in units:
+                    return int(float(value[:-1]) * units[value[-1]])
+                return int(int(value) / (1024 * 1024))
+            except ValueError:
+                return None
+    return None
+
+
+def recent_runs(runs):
+    """Return the runs heap sizing and memory admission look at (the last HEAP_HISTORY_RUNS)"""
+    return (runs or [])[-HEAP_HISTORY_RUNS:]
+
+
+def recommend_heap_options(runs, general):
+    """
+    Return [-Xmx, GC flag] for the next run of a job from its recorded runs (see job_history.py).
+
+    The heap is the highest heap usage of the last HEAP_HISTORY_RUNS runs times
+    HEAP_HEADROOM, at least twice the heap of the last run if that one ran out of
+    memory, rounded up to HEAP_STEP_MB and kept within general.min_heap_mb /
+    max_heap_mb. Heap usage is the peak occupancy from the GC log; runs without GC
+    (small heaps) count with their peak RSS. Sizing from the heap actually used,
+    rather than RSS (which grows with the -Xmx given), lets the heap shrink again.
+    Small heaps use the Serial GC (less memory and threads per JVM), larger ones G1.
+    """
+    recent = recent_runs(runs)
+    used = [run.get('heap_used_mb') or run.get('peak_rss_mb') for run in recent]
+    used = [value for value in used if value]
+    if not used:
+        return []
+    heap_mb = max(used) * HEAP_HEADROOM
+    last = runs[-1]
+    if last.get('oom') and last.get('xmx_mb'):
+        heap_mb = max(heap_mb, last['xmx_mb'] * 2)
+    heap_mb = max(general.get('min_heap_mb', DEFAULT_MIN_HEAP_MB), min(general.get('max_heap_mb', DEFAULT_MAX_HEAP_MB), heap_mb))
+    heap_mb = int(math.ceil(heap_mb / HEAP_STEP_MB) * HEAP_STEP_MB)
+    gc_flag = '-XX:+UseSerialGC' if heap_mb <= SERIAL_GC_MAX_HEAP_MB else '-XX:+UseG1GC'
+    return [f'-Xmx{heap_mb}m', gc_flag]
+
+
+def build_jvm_options(general, job_config=None, vault_loader=None, history=None):
+    """
+    Return the JVM options for one VaultDataLoader invocation.
+
+    Global general.jvm_options come first so per-job jvm_options can override them.
+    With vault_loader given, the CDS archive is added automatically if it is current
+    for general.java_exe and general.use_cds is not false. With history (the job's recorded runs) given,
+    -Xmx and the GC are chosen from it unless the options already set them or
+    general.auto_jvm_sizing is false.
+    """
+    options = list(general.get('jvm_options', [])) + list((job_config or {}).get('jvm_options', []))
+    if history and general.get('auto_jvm_sizing', True) and not any(
+            opt.startswith('-Xmx') or (opt.startswith('-XX:+Use') and opt.endswith('GC')) for opt in options):
+        options.extend(recommend_heap_options(history, general))
+    if vault_loader and general.get('use_cds', True) and not any(opt.startswith(SHARED_ARCHIVE_OPTION) for opt in options):
+        archive = get_current_cds_archive(general['java_exe'], vault_loader, general.get('jvm_options'))
+        if archive:
+            options.append(SHARED_ARCHIVE_OPTION + archive)
+    return options
+
+
+def build_cds_archive(java_exe, vault_loader, jvm_options=None, training_args=None, cwd=None, timeout=600):
+    """
+    Build the CDS archive with -XX:ArchiveClassesAtExit (JDK 13+).
+
+    The loader is run once with training_args (default: no arguments, which loads
+    the start-up classes); all classes loaded until the JVM exits are archived.
+    The java it was built with is stored next to the archive (.jsa.json).
+    Returns the archive path or None.
+    """
+    archive = get_cds_archive(vault_loader)
+    stamp_file = archive + CDS_STAMP_EXTENSION
+    for path in (archive, stamp_file):
+        if os.path.exists(path):
+            os.remove(path)
+    command = [java_exe] + list(jvm_options or []) + [f'-XX:ArchiveClassesAtExit={archive}', '-jar', vault_loader] + list(training_args or [])
+    print(f"Building CDS archive: {' '.join(command)}")
+    try:
+        subprocess.run(command, cwd=cwd, timeout=timeout, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+    except (OSError, subprocess.TimeoutExpired) as e:
+        print(f"❌ Could not build CDS archive: {e}")
+        return None
+    if not os.path.exists(archive):
+        print("❌ No CDS archive was written (JDK 13 or newer is required)")
+        return None
+    with open(stamp_file, 'w', encoding='utf-8') as f:
+        json.dump(get_java_stamp(java_exe), f, indent=4)
+    print(f"✓ CDS archive written: {archive} ({os.path.getsize(archive) / (1024 * 1024):.1f} MB)")
+    return archive
+
+
+def time_startup(command, runs, cwd=None):
+    """Return the wall times in seconds of runs executions of command"""
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run(command, cwd=cwd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        times.append(time.perf_counter() - start)
+    return times
+
+
+def measure_startup(java_exe, vault_loader, jvm_options=None, runs=5, cwd=None):
+    """
+    Measure JVM start-up of the loader (started without arguments) without and with the CDS archive.
+
+    The baseline is a plain invocation, so the JDK's default CDS archive of its
+    own classes is in use there too and only the gain of the loader archive counts.
+    Returns {'without_cds': median seconds, 'with_cds': median seconds or None}.
+    """
+    options = list(jvm_options or [])
+    result = {'without_cds': None, 'with_cds': None}
+    baseline = time_startup([java_exe] + options + ['-jar', vault_loader], runs, cwd)
+    result['without_cds'] = statistics.median(baseline)
+    print(f"Without loader archive: median {result['without_cds']:.3f} s over {runs} runs")
+
+    archive = cds_archive_usable(vault_loader, java_exe)
+    if not archive:
+        print("No usable CDS archive found, run 'python jvm_options.py build-cds' first")
+        return result
+    with_cds = time_startup([java_exe] + options + [SHARED_ARCHIVE_OPTION + archive, '-jar', vault_loader], runs, cwd)
+    result['with_cds'] = statistics.median(with_cds)
+    gain = result['without_cds'] - result['with_cds']
+    print(f"With loader archive:    median {result['with_cds']:.3f} s over {runs} runs")
+    print(f"Gain:                   {gain:.3f} s per invocation ({gain / result['without_cds'] * 100:.0f}%)")
+    return result
+
+
+def load_general(config_path):
+    """Return (java_exe, absolute vault_loader path, general section) of a runner configuration"""
+    script_dir = os.path.dirname(os.path.abspath(__file__))
+    if not os.path.isabs(config_path) and not os.path.exists(config_path):
+        config_path = os.path.join(script_dir, config_path)
+    with open(config_path, 'r', encoding='utf-8') as f:
+        general = json.load(f)['general']
+    vault_loader = general['vault_loader']
+    if not os.path.isabs(vault_loader):
+        vault_loader = os.path.join(script_dir, vault_loader)
+    return general['java_exe'], vault_loader, general
+
+
+def main():
+    parser = argparse.ArgumentParser(description="JVM tools for VaultDataLoader (Class Data Sharing archive, start-up measurement)")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    build_parser = subparsers.add_parser('build-cds', help="Build the CDS archive next to VaultDataLoader.jar")
+    build_parser.add_argument('--config', required=True, help="Runner configuration (e.g. config/vault_loader_config_basis.json)")
+    build_parser.add_argument('--args', default='', help="Loader arguments for the training run (default: none)")
+    measure_parser = subparsers.add_parser('measure', help="Measure start-up time without and with the CDS archive")
+    measure_parser.add_argument('--config', required=True, help="Runner configuration")
+    measure_parser.add_argument('--runs', type=int, default=5, help="Runs per variant (default 5)")
+    args = parser.parse_args()
+
+    java_exe, vault_loader, general = load_general(args.config)
+    jvm_options = general.get('jvm_options', [])
+    if args.command == 'build-cds':
+        archive = build_cds_archive(java_exe, vault_loader, jvm_options, shlex.split(args.args))
+        if archive:
+            measure_startup(java_exe, vault_loader, jvm_options, runs=3)
+        return 0 if archive else 1
+    measure_startup(java_exe, vault_loader, jvm_options, runs=args.runs)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,127 @@
+import os
+import threading
+from vault_loader_process import read_proc_usage
+from jvm_options import recent_runs
+
+MEMINFO_FILE = '/proc/meminfo'
+
+# Expected peak of a job without history or -Xmx, and memory always left free
+DEFAULT_JOB_MEMORY_MB = 1024
+DEFAULT_MEMORY_RESERVE_MB = 512
+
+# Seconds between checks while a job waits for memory
+ADMISSION_POLL_INTERVAL = 2.0
+
+# Upper limit for max_parallel_exports / max_parallel_imports = "auto" (general.max_parallel_ceiling)
+DEFAULT_PARALLEL_CEILING = os.cpu_count() or 1
+
+
+def read_available_memory_mb():
+    """Return MemAvailable from /proc/meminfo in MB, or None if not available"""
+    try:
+        with open(MEMINFO_FILE, 'r') as f:
+            for line in f:
+                if line.startswith('MemAvailable:'):
+                    return int(line.split()[1]) / 1024
+    except (OSError, ValueError, IndexError):
+        pass
+    return None
+
+
+def expected_job_memory_mb(runs, xmx_mb=None, default_mb=DEFAULT_JOB_MEMORY_MB):
+    """
+    Return the expected peak RSS of a job in MB.
+
+    The highest peak of the job's last HEAP_HISTORY_RUNS recorded runs (see
+    job_history.py) wins, the same window the -Xmx is sized from, so an old
+    outlier does not hold the job back after its heap has shrunk. Without
+    history the -Xmx of the job is used, else default_mb.
+    """
+    peaks = [run['peak_rss_mb'] for run in recent_runs(runs) if run.get('peak_rss_mb')]
+    if peaks:
+        return max(peaks)
+    if xmx_mb:
+        return xmx_mb
+    return default_mb
+
+
+def auto_parallel_limit(ceiling, reserve_mb=DEFAULT_MEMORY_RESERVE_MB, job_memory_mb=DEFAULT_JOB_MEMORY_MB,
+                        admission=False):
+    """
+    Return the number of concurrent jobs for max_parallel_exports / max_parallel_imports = "auto".
+
+    With admission (a MemoryAdmission gates every job start) the pool is sized
+    to ceiling and the free memory decides at each start how many jobs run. Without
+    it, as many jobs of job_memory_mb as fit into MemAvailable minus reserve_mb, at
+    most ceiling. Without /proc/meminfo jobs run sequentially.
+    """
+    available = read_available_memory_mb()
+    if available is None:
+        return 1
+    if admission:
+        return ceiling
+    return max(1, min(ceiling, int((available - reserve_mb) // job_memory_mb)))
+
+
+class MemoryAdmission:
+    """
+    Admission control for concurrent VaultDataLoader processes.
+
+    It only limits: the runner's thread pool (max_parallel_*) caps concurrency,
+    so the pool has to be larger than 1 ("auto", see auto_parallel_limit) for
+    memory to decide how many jobs run. A job is started only if MemAvailable minus the memory the running jobs are
+    still expected to allocate minus the job's own expected peak leaves at least
+    reserve_mb free. A running job is expected to allocate its expected peak minus
+    its current RSS. One job is always admitted when nothing runs, so an oversized
+    job runs alone instead of never. Without /proc/meminfo every job is admitted.
+    """
+
+    def __init__(self, reserve_mb=DEFAULT_MEMORY_RESERVE_MB, poll_interval=ADMISSION_POLL_INTERVAL):
+        self.reserve_mb = reserve_mb
+        self.poll_interval = poll_interval
+        self.condition = threading.Condition()
+        self.running = {}
+        self.next_ticket = 0
+
+    def outstanding_mb(self):
+        """Return the memory the running jobs are still expected to allocate"""
+        total = 0
+        for ticket in self.running.values():
+            usage = read_proc_usage(ticket['pid']) if ticket['pid'] else None
+            rss_mb = usage[0] if usage else 0
+            total += max(0, ticket['expected_mb'] - rss_mb)
+        return total
+
+    def acquire(self, expected_mb, label=''):
+        """Wait until the job fits into memory; returns a ticket for set_pid() and release()"""
+        prefix = f"[{label}] " if label else ""
+        waiting = False
+        with self.condition:
+            while self.running:
+                available = read_available_memory_mb()
+                if available is None:
+                    break
+                outstanding = self.outstanding_mb()
+                if available - outstanding - expected_mb >= self.reserve_mb:
+                    break
+                if not waiting:
+                    print(f"⏳ {prefix}Waiting for memory: {available:.0f} MB available, "
+                          f"{outstanding:.0f} MB still expected by {len(self.running)} running job(s), {expected_mb:.0f} MB needed")
+                    waiting = True
+                self.condition.wait(self.poll_interval)
+            if waiting:
+                print(f"▶️ {prefix}Memory available, starting job")
+            self.next_ticket += 1
+            self.running[self.next_ticket] = {'expected_mb': expected_mb, 'pid': None}
+            return self.next_ticket
+
+    def set_pid(self, ticket, pid):
+        """Attach the started process to a ticket so its current RSS is taken into account"""
+        with self.condition:
+            if ticket in self.running:
+                self.running[ticket]['pid'] = pid
+
+    def release(self, ticket):
+        with self.condition:
+            self.running.pop(ticket, None)
+            self.condition.notify_all()
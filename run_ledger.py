@@ -0,0 +1,307 @@
+"""
+Run ledger: SQLite database with every export/import run (logs/run_ledger.db).
+
+Tables
+- runs: one row per runner run (run_id = <run_type>_<run timestamp>).
+- jobs: one row per export/import result (success, failure or skipped) with
+  file name, row count, timings and failure text.
+- attempts: one row per VaultDataLoader invocation with return code, duration,
+  peak RSS and CPU time.
+
+Rows are buffered and written in batched transactions. The success/failure CSV
+logs of earlier versions can be exported from the ledger on demand.
+
+Start Parameter
+- `runs [--type export|import] [--last N]`: list recent runs.
+- `stats <job name> [--last N]`: durations and row counts of a job over its last runs.
+- `export-csv <run timestamp> [--type export|import]`: write logs/success|failure/*_<run timestamp>.csv.
+"""
+import os
+import sys
+import csv
+import time
+import sqlite3
+import argparse
+import threading
+from datetime import datetime
+
+LEDGER_FILE = os.path.join('logs', 'run_ledger.db')
+
+# Buffered rows are written once this many are pending or after FLUSH_INTERVAL seconds
+BATCH_SIZE = 50
+FLUSH_INTERVAL = 5.0
+
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    run_id TEXT PRIMARY KEY,
+    run_type TEXT NOT NULL,
+    run_timestamp TEXT NOT NULL,
+    config_file TEXT,
+    dns TEXT,
+    started TEXT,
+    finished TEXT
+);
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY,
+    run_id TEXT NOT NULL REFERENCES runs(run_id),
+    name TEXT NOT NULL,
+    object_name TEXT,
+    file_name TEXT,
+    status TEXT NOT NULL,
+    row_count INTEGER,
+    byte_size INTEGER,
+    start_time TEXT,
+    end_time TEXT,
+    duration_seconds REAL,
+    failure_description TEXT
+);
+CREATE TABLE IF NOT EXISTS attempts (
+    id INTEGER PRIMARY KEY,
+    run_id TEXT NOT NULL REFERENCES runs(run_id),
+    name TEXT NOT NULL,
+    attempt INTEGER NOT NULL,
+    status TEXT NOT NULL,
+    return_code INTEGER,
+    failure_marker TEXT,
+    start_time TEXT,
+    end_time TEXT,
+    duration_seconds REAL,
+    peak_rss_mb REAL,
+    cpu_seconds REAL,
+    xmx_mb INTEGER
+);
+CREATE INDEX IF NOT EXISTS jobs_name ON jobs(name, end_time);
+CREATE INDEX IF NOT EXISTS jobs_run ON jobs(run_id);
+CREATE INDEX IF NOT EXISTS attempts_name ON attempts(name, end_time);
+"""
+
+SUCCESS_LOG_HEADER = ['file_name', 'object_name', 'row_count', 'timestamp']
+FAILURE_LOG_HEADER = ['name', 'object_name', 'failure_description', 'timestamp']
+
+
+def get_run_id(run_type, run_timestamp):
+    return f"{run_type}_{run_timestamp}"
+
+
+class RunLedger:
+    """
+    Write side of the run ledger, shared by the threads of one runner.
+
+    start_run() registers the run, record_job() / record_attempt() buffer rows and
+    finish_run() flushes them and stamps the run as finished.
+    """
+
+    def __init__(self, ledger_file):
+        self.ledger_file = ledger_file
+        os.makedirs(os.path.dirname(ledger_file), exist_ok=True)
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(ledger_file, check_same_thread=False, timeout=30)
+        self.connection.executescript(SCHEMA)
+        self.pending = []
+        self.last_flush = time.monotonic()
+        self.attempt_numbers = {}
+        self.run_id = None
+
+    def start_run(self, run_type, run_timestamp, config_file=None, dns=None):
+        self.run_id = get_run_id(run_type, run_timestamp)
+        with self.lock:
+            with self.connection:
+                self.connection.execute(
+                    "INSERT OR REPLACE INTO runs (run_id, run_type, run_timestamp, config_file, dns, started) VALUES (?, ?, ?, ?, ?, ?)",
+                    (self.run_id, run_type, run_timestamp, config_file, dns, datetime.now().strftime(TIMESTAMP_FORMAT))
+                )
+        return self.run_id
+
+    def set_dns(self, dns):
+        self._add("UPDATE runs SET dns = ? WHERE run_id = ?", (dns, self.run_id))
+
+    def record_job(self, name, status, object_name=None, file_name=None, row_count=None, byte_size=None,
+                   start_time=None, duration_seconds=None, failure_description=None):
+        """Buffer the result of one export/import job"""
+        end_time = datetime.now().strftime(TIMESTAMP_FORMAT)
+        if duration_seconds is None and start_time:
+            try:
+                duration_seconds = (datetime.now() - datetime.strptime(start_time, TIMESTAMP_FORMAT)).total_seconds()
+            except ValueError:
+                pass
+        if not isinstance(row_count, int):
+            row_count = None
+        self._add(
+            "INSERT INTO jobs (run_id, name, object_name, file_name, status, row_count, byte_size, start_time, end_time, "
+            "duration_seconds, failure_description) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (self.run_id, name, object_name, file_name, status, row_count, byte_size, start_time, end_time,
+             duration_seconds, failure_description)
+        )
+
+    def record_attempt(self, name, result, duration_seconds, xmx_mb=None):
+        """Buffer one VaultDataLoader invocation (a LoaderProcessResult)"""
+        with self.lock:
+            attempt = self.attempt_numbers.get(name, 0) + 1
+            self.attempt_numbers[name] = attempt
+        if result.timed_out:
+            status = 'timeout'
+        elif result.return_code == 0 and result.failure_marker is None:
+            status = 'success'
+        else:
+            status = 'failure'
+        end = datetime.now()
+        start_time = datetime.fromtimestamp(end.timestamp() - duration_seconds).strftime(TIMESTAMP_FORMAT)
+        self._add(
+            "INSERT INTO attempts (run_id, name, attempt, status, return_code, failure_marker, start_time, end_time, "
+            "duration_seconds, peak_rss_mb, cpu_seconds, xmx_mb) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (self.run_id, name, attempt, status, result.return_code, result.failure_marker, start_time,
+             end.strftime(TIMESTAMP_FORMAT), round(duration_seconds, 3), result.peak_rss_mb, result.cpu_seconds, xmx_mb)
+        )
+
+    def finish_run(self):
+        self._add("UPDATE runs SET finished = ? WHERE run_id = ?", (datetime.now().strftime(TIMESTAMP_FORMAT), self.run_id))
+        self.flush()
+
+    def _add(self, sql, params):
+        with self.lock:
+            self.pending.append((sql, params))
+            if len(self.pending) < BATCH_SIZE and time.monotonic() - self.last_flush < FLUSH_INTERVAL:
+                return
+            self._flush()
+
+    def flush(self):
+        """Write all buffered rows in one transaction"""
+        with self.lock:
+            self._flush()
+
+    def _flush(self):
+        if self.pending:
+            try:
+                with self.connection:
+                    for sql, params in self.pending:
+                        self.connection.execute(sql, params)
+            except sqlite3.Error as e:
+                print(f"Warning: Could not write to run ledger {self.ledger_file}: {e}")
+                return
+            self.pending = []
+        self.last_flush = time.monotonic()
+
+    def close(self):
+        self.flush()
+        self.connection.close()
+
+
+def connect(ledger_file):
+    """Open the ledger for queries (rows as sqlite3.Row)"""
+    connection = sqlite3.connect(ledger_file, timeout=30)
+    connection.row_factory = sqlite3.Row
+    connection.executescript(SCHEMA)
+    return connection
+
+
+def job_runs(connection, name, last=10, status='success'):
+    """Return the last job results of a job name, newest first"""
+    return connection.execute(
+        "SELECT * FROM jobs WHERE name = ? AND status = ? ORDER BY end_time DESC, id DESC LIMIT ?",
+        (name, status, last)
+    ).fetchall()
+
+
+def job_stats(connection, name, last=10):
+    """Return count, average/min/max duration and average row count of a job's last successful runs"""
+    return connection.execute(
+        "SELECT COUNT(*) AS runs, AVG(duration_seconds) AS avg_seconds, MIN(duration_seconds) AS min_seconds, "
+        "MAX(duration_seconds) AS max_seconds, AVG(row_count) AS avg_rows "
+        "FROM (SELECT * FROM jobs WHERE name = ? AND status = 'success' ORDER BY end_time DESC, id DESC LIMIT ?)",
+        (name, last)
+    ).fetchone()
+
+
+def export_csv_logs(connection, run_id, logs_dir):
+    """Write the success/failure CSV logs of one run in the format of logs/success|failure; returns the paths written"""
+    run = connection.execute("SELECT * FROM runs WHERE run_id = ?", (run_id,)).fetchone()
+    if run is None:
+        return []
+    jobs = connection.execute("SELECT * FROM jobs WHERE run_id = ? ORDER BY id", (run_id,)).fetchall()
+    written = []
+    success_rows = [
+        ['SKIPPED' if job['status'] == 'skipped' else job['file_name'], job['object_name'],
+         'N/A' if job['row_count'] is None else job['row_count'], job['end_time']]
+        for job in jobs if job['status'] in ('success', 'skipped')
+    ]
+    failure_rows = [
+        [job['name'], job['object_name'], job['failure_description'], job['end_time']]
+        for job in jobs if job['status'] == 'failure'
+    ]
+    for kind, header, rows in (('success', SUCCESS_LOG_HEADER, success_rows), ('failure', FAILURE_LOG_HEADER, failure_rows)):
+        if not rows:
+            continue
+        log_file = os.path.join(logs_dir, kind, f"{kind}_{run['run_timestamp']}.csv")
+        os.makedirs(os.path.dirname(log_file), exist_ok=True)
+        with open(log_file, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f)
+            writer.writerow(header)
+            writer.writerows(rows)
+        written.append(log_file)
+    return written
+
+
+def main():
+    script_dir = os.path.dirname(os.path.abspath(__file__))
+    parser = argparse.ArgumentParser(description="Query the export/import run ledger")
+    parser.add_argument('--ledger', default=os.path.join(script_dir, LEDGER_FILE), help="Ledger database (default logs/run_ledger.db)")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    runs_parser = subparsers.add_parser('runs', help="List recent runs")
+    runs_parser.add_argument('--type', choices=['export', 'import'], help="Only runs of this type")
+    runs_parser.add_argument('--last', type=int, default=20, help="Number of runs (default 20)")
+    stats_parser = subparsers.add_parser('stats', help="Duration and row count statistics of one job")
+    stats_parser.add_argument('name', help="Export/import name, e.g. 04_part__v_03")
+    stats_parser.add_argument('--last', type=int, default=10, help="Number of runs (default 10)")
+    csv_parser = subparsers.add_parser('export-csv', help="Write the success/failure CSV logs of a run")
+    csv_parser.add_argument('run_timestamp', help="Run timestamp, e.g. 20250801_120000")
+    csv_parser.add_argument('--type', choices=['export', 'import'], default='export', help="Run type (default export)")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.ledger):
+        print(f"Run ledger not found: {args.ledger}")
+        return 1
+    connection = connect(args.ledger)
+
+    if args.command == 'runs':
+        query = (
+            "SELECT r.*, SUM(j.status = 'success') AS succeeded, SUM(j.status = 'failure') AS failed, "
+            "SUM(j.status = 'skipped') AS skipped FROM runs r LEFT JOIN jobs j ON j.run_id = r.run_id"
+        )
+        params = []
+        if args.type:
+            query += " WHERE r.run_type = ?"
+            params.append(args.type)
+        query += " GROUP BY r.run_id ORDER BY r.started DESC LIMIT ?"
+        params.append(args.last)
+        for run in connection.execute(query, params):
+            print(f"{run['run_id']:<32} {run['started']} - {run['finished'] or 'not finished':<19} "
+                  f"✅ {run['succeeded'] or 0}  ❌ {run['failed'] or 0}  ⏭️ {run['skipped'] or 0}  {run['config_file'] or ''}")
+        return 0
+
+    if args.command == 'stats':
+        stats = job_stats(connection, args.name, args.last)
+        if not stats['runs']:
+            print(f"No successful runs of '{args.name}' in the ledger")
+            return 1
+        print(f"{args.name}: last {stats['runs']} successful run(s)")
+        print(f"Duration: avg {stats['avg_seconds'] or 0:.1f} s, min {stats['min_seconds'] or 0:.1f} s, max {stats['max_seconds'] or 0:.1f} s")
+        if stats['avg_rows'] is not None:
+            print(f"Rows:     avg {stats['avg_rows']:.0f}")
+        for job in job_runs(connection, args.name, args.last):
+            duration = f"{job['duration_seconds']:.1f} s" if job['duration_seconds'] is not None else "N/A"
+            print(f"- {job['end_time']}: {duration}, {job['row_count'] if job['row_count'] is not None else 'N/A'} rows")
+        return 0
+
+    written = export_csv_logs(connection, get_run_id(args.type, args.run_timestamp), os.path.join(script_dir, 'logs'))
+    if not written:
+        print(f"No jobs recorded for {args.type} run {args.run_timestamp}")
+        return 1
+    for log_file in written:
+        print(f"✓ Written: {log_file}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,64 @@
+import os
+import json
+import threading
+from datetime import datetime
+
+
+class RunManifest:
+    """
+    Machine-readable record of one export/import run.
+
+    Every job adds one entry; the JSON file is rewritten atomically after each
+    entry so it is complete even if the run is aborted.
+    """
+
+    def __init__(self, manifest_file, run_type, run_timestamp, config_file=None, dns=None):
+        self.manifest_file = manifest_file
+        self.lock = threading.Lock()
+        self.data = {
+            'run_type': run_type,
+            'run_timestamp': run_timestamp,
+            'config_file': config_file,
+            'dns': dns,
+            'started': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            'finished': None,
+            'entries': [],
+        }
+
+    @property
+    def entries(self):
+        return self.data['entries']
+
+    def add_entry(self, **entry):
+        """Append one job entry and persist the manifest"""
+        with self.lock:
+            self.data['entries'].append(entry)
+            self._write()
+
+    def find_entry(self, name):
+        """Return the latest entry recorded for a job name, or None"""
+        with self.lock:
+            for entry in reversed(self.data['entries']):
+                if entry.get('name') == name:
+                    return entry
+        return None
+
+    def finish(self):
+        """Mark the run as finished and persist the manifest"""
+        with self.lock:
+            self.data['finished'] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            self._write()
+
+    def _write(self):
+        os.makedirs(os.path.dirname(self.manifest_file), exist_ok=True)
+        tmp_file = self.manifest_file + '.tmp'
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump(self.data, f, indent=4)
+        os.replace(tmp_file, self.manifest_file)
+
+
+def load_manifest(manifest_file):
+    """Load a manifest written by RunManifest"""
+    with open(manifest_file, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
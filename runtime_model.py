@@ -0,0 +1,159 @@
+import os
+import heapq
+import sqlite3
+import statistics
+import threading
+import time
+from datetime import datetime, timedelta
+
+# Runs of a job taken into account, and the prediction without any history
+HISTORY_RUNS = 10
+DEFAULT_JOB_SECONDS = 60.0
+
+# Limits for scaling a job's duration by the size of its file
+MIN_SIZE_FACTOR = 0.25
+MAX_SIZE_FACTOR = 4.0
+
+
+def format_duration(seconds):
+    """Return seconds as '1h 05m', '4m 10s' or '12s'"""
+    seconds = int(round(seconds))
+    if seconds >= 3600:
+        return f"{seconds // 3600}h {seconds % 3600 // 60:02d}m"
+    if seconds >= 60:
+        return f"{seconds // 60}m {seconds % 60:02d}s"
+    return f"{seconds}s"
+
+
+def simulate_makespan(durations, workers):
+    """Return the wall time of running durations in the given order on workers slots (list scheduling)"""
+    slots = [0.0] * max(1, workers)
+    for duration in durations:
+        heapq.heapreplace(slots, slots[0] + duration)
+    return max(slots)
+
+
+class RuntimeModel:
+    """
+    Predicts the duration of export/import jobs from the run ledger (logs/run_ledger.db).
+
+    A job with history is predicted by the median duration of its last successful
+    runs, scaled by the size of its file when the size is known (file bytes relative
+    to the median size of earlier runs). A job without history gets the median
+    seconds per MB of all jobs of the same run type times its size, else the median
+    duration of all jobs, else DEFAULT_JOB_SECONDS.
+    """
+
+    def __init__(self, ledger_file, run_type, history_runs=HISTORY_RUNS):
+        self.jobs = {}
+        self.median_seconds = None
+        self.seconds_per_mb = None
+        if not os.path.exists(ledger_file):
+            return
+        try:
+            connection = sqlite3.connect(ledger_file, timeout=30)
+            try:
+                rows = connection.execute(
+                    "SELECT j.name, j.duration_seconds, j.byte_size FROM jobs j JOIN runs r ON r.run_id = j.run_id "
+                    "WHERE r.run_type = ? AND j.status = 'success' AND j.duration_seconds IS NOT NULL "
+                    "ORDER BY j.end_time DESC, j.id DESC",
+                    (run_type,)
+                ).fetchall()
+            finally:
+                connection.close()
+        except sqlite3.Error as e:
+            print(f"Warning: Could not read run ledger {ledger_file}: {e}")
+            return
+        for name, duration, byte_size in rows:
+            runs = self.jobs.setdefault(name, [])
+            if len(runs) < history_runs:
+                runs.append((duration, byte_size))
+
+        all_runs = [run for runs in self.jobs.values() for run in runs]
+        self.median_seconds = statistics.median(d for d, _ in all_runs) if all_runs else None
+        rates = [d / (b / (1024 * 1024)) for d, b in all_runs if b]
+        self.seconds_per_mb = statistics.median(rates) if rates else None
+
+    def predict(self, name, byte_size=None):
+        """Return (predicted seconds, True if the job itself has history)"""
+        runs = self.jobs.get(name)
+        if runs:
+            duration = statistics.median(d for d, _ in runs)
+            sizes = [b for _, b in runs if b]
+            if byte_size and sizes:
+                factor = byte_size / statistics.median(sizes)
+                duration *= min(MAX_SIZE_FACTOR, max(MIN_SIZE_FACTOR, factor))
+            return duration, True
+        if byte_size and self.seconds_per_mb:
+            return self.seconds_per_mb * byte_size / (1024 * 1024), False
+        if self.median_seconds:
+            return self.median_seconds, False
+        return DEFAULT_JOB_SECONDS, False
+
+
+def print_prediction(predictions, known, max_parallel):
+    """Print the predicted total work and wall time of a batch (predictions in start order)"""
+    if not predictions:
+        return
+    total = sum(predictions.values())
+    wall = simulate_makespan(list(predictions.values()), max_parallel)
+    print(f"🔮 Predicted: {format_duration(total)} of loader time, about {format_duration(wall)} wall time "
+          f"({known}/{len(predictions)} jobs with history)")
+
+
+class BatchProgress:
+    """
+    Live ETA for a batch of jobs with predicted durations.
+
+    Remaining time is the larger of the longest remaining job and the remaining work
+    divided by the parallel slots. Predictions are corrected by the median ratio of
+    actual to predicted duration of the jobs finished so far.
+    """
+
+    def __init__(self, predictions, max_parallel):
+        self.predictions = dict(predictions)
+        self.max_parallel = max(1, max_parallel)
+        self.started = {}
+        self.finished = {}
+        self.lock = threading.Lock()
+
+    def start(self, name):
+        with self.lock:
+            self.started[name] = time.monotonic()
+
+    def finish(self, name):
+        with self.lock:
+            started = self.started.pop(name, None)
+            self.finished[name] = time.monotonic() - started if started is not None else None
+
+    def drop(self, name):
+        """Remove a job that will not run (blocked or skipped)"""
+        with self.lock:
+            self.predictions.pop(name, None)
+
+    def remaining_seconds(self):
+        with self.lock:
+            ratios = [
+                actual / self.predictions[name] for name, actual in self.finished.items()
+                if actual is not None and self.predictions.get(name)
+            ]
+            correction = statistics.median(ratios) if ratios else 1.0
+            now = time.monotonic()
+            remaining = []
+            for name, predicted in self.predictions.items():
+                if name in self.finished:
+                    continue
+                expected = predicted * correction
+                if name in self.started:
+                    expected = max(0.0, expected - (now - self.started[name]))
+                remaining.append(expected)
+        if not remaining:
+            return 0.0
+        return max(max(remaining), sum(remaining) / self.max_parallel)
+
+    def eta_line(self):
+        done = len(self.finished)
+        total = len(self.predictions)
+        remaining = self.remaining_seconds()
+        finish_at = (datetime.now() + timedelta(seconds=remaining)).strftime("%H:%M:%S")
+        return f"⏱️ {done}/{total} done, about {format_duration(remaining)} remaining (ETA {finish_at})"
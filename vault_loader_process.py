@@ -0,0 +1,266 @@
+import os
+import re
+import shutil
+import subprocess
+import tempfile
+import threading
+import queue
+import time
+from collections import deque
+
+# Markers in Vault Loader console output that indicate a failed job
+DEFAULT_FAILURE_MARKERS = [
+    "failure:",
+    "error making request",
+    "exception",
+    "unknown relationship",
+]
+
+DEFAULT_BUFFER_LINES = 200
+
+# Seconds between two /proc samples of a running JVM
+SAMPLE_INTERVAL = 0.5
+CLOCK_TICKS = os.sysconf('SC_CLK_TCK') if hasattr(os, 'sysconf') and 'SC_CLK_TCK' in getattr(os, 'sysconf_names', {}) else 0
+
+
+DEFAULT_WORK_ROOT = 'work'
+
+
+# Vault Loader settings file that is read from the working directory
+LOADER_CONFIG_FILE = 'vl-config.xml'
+
+
+def create_work_dir(work_root, label, seed_dir=None):
+    """
+    Create a new, uniquely named scratch directory for one VaultDataLoader job under work_root.
+
+    If seed_dir contains a Vault Loader settings file (vl-config.xml) it is copied
+    into the new directory, as the loader reads it from its working directory.
+    """
+    os.makedirs(work_root, exist_ok=True)
+    safe_label = re.sub(r'[^A-Za-z0-9_.-]', '_', label)
+    work_dir = tempfile.mkdtemp(prefix=f"{safe_label}_", dir=work_root)
+    if seed_dir:
+        loader_config = os.path.join(seed_dir, LOADER_CONFIG_FILE)
+        if os.path.exists(loader_config):
+            shutil.copy2(loader_config, work_dir)
+    return work_dir
+
+
+# Banner VaultDataLoader prints on stdout; any other stdout line is unexpected
+LOADER_HEADER = "Vault Loader. (c)Veeva Systems 2014-2021. All rights reserved."
+
+
+class LoaderProcessResult:
+    """Outcome of one VaultDataLoader process run by run_loader_process"""
+
+    def __init__(self):
+        self.return_code = None
+        self.stdout_tail = deque()
+        self.stderr_tail = deque()
+        self.stdout_line_count = 0
+        self.stderr_line_count = 0
+        # Set while the output streams, so they do not depend on what is left in the ring buffers
+        self.header_seen = False
+        self.extra_stdout_lines = 0
+        self.failure_marker = None
+        self.failure_line = ''
+        self.killed_on_marker = False
+        self.timed_out = False
+        # Sampled from /proc while the JVM runs (None where /proc is not available)
+        self.peak_rss_mb = None
+        self.cpu_seconds = None
+
+    @property
+    def stdout(self):
+        return '\n'.join(self.stdout_tail)
+
+    @property
+    def stderr(self):
+        return '\n'.join(self.stderr_tail)
+
+
+def read_proc_usage(pid):
+    """Return (rss_mb, peak_rss_mb, cpu_seconds) of a process from /proc, or None if not available"""
+    try:
+        rss_kb = hwm_kb = 0
+        with open(f'/proc/{pid}/status', 'r') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    rss_kb = int(line.split()[1])
+                elif line.startswith('VmHWM:'):
+                    hwm_kb = int(line.split()[1])
+        with open(f'/proc/{pid}/stat', 'r') as f:
+            stat = f.read()
+        # Fields after the command name: state is field 3, utime/stime are fields 14/15
+        fields = stat[stat.rindex(')') + 2:].split()
+        cpu_ticks = int(fields[11]) + int(fields[12])
+        return rss_kb / 1024, hwm_kb / 1024, cpu_ticks / CLOCK_TICKS
+    except (OSError, ValueError, IndexError, ZeroDivisionError):
+        return None
+
+
+class ResourceSampler:
+    """
+    Sample peak RSS and CPU time of a JVM from /proc in a background thread.
+
+    For a process started for one job the kernel's high-water mark (VmHWM) is used;
+    for a shared worker JVM (whole_process=False) only the RSS seen and the CPU time
+    used while the job runs are counted.
+    """
+
+    def __init__(self, pid, whole_process=True, interval=SAMPLE_INTERVAL):
+        self.pid = pid
+        self.whole_process = whole_process
+        self.interval = interval
+        self.peak_rss_mb = None
+        self.cpu_start = None
+        self.cpu_seconds = None
+        self.stop_event = threading.Event()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        if CLOCK_TICKS and os.path.exists(f'/proc/{self.pid}'):
+            usage = read_proc_usage(self.pid)
+            if usage:
+                self.cpu_start = 0.0 if self.whole_process else usage[2]
+                self._add(usage)
+                self.thread.start()
+        return self
+
+    def _add(self, usage):
+        rss_mb, hwm_mb, cpu_seconds = usage
+        peak = max(rss_mb, hwm_mb) if self.whole_process else rss_mb
+        self.peak_rss_mb = max(self.peak_rss_mb or 0, peak)
+        self.cpu_seconds = max(0.0, cpu_seconds - self.cpu_start)
+
+    def _run(self):
+        while not self.stop_event.wait(self.interval):
+            usage = read_proc_usage(self.pid)
+            if usage is None:
+                break
+            self._add(usage)
+
+    def stop(self, result):
+        """Stop sampling and store peak RSS and CPU seconds in a LoaderProcessResult"""
+        self.stop_event.set()
+        if self.thread.is_alive():
+            self.thread.join()
+        usage = read_proc_usage(self.pid)
+        if usage is not None and self.cpu_start is not None:
+            self._add(usage)
+        result.peak_rss_mb = round(self.peak_rss_mb, 1) if self.peak_rss_mb is not None else None
+        result.cpu_seconds = round(self.cpu_seconds, 2) if self.cpu_seconds is not None else None
+
+
+def _pump_stream(stream, name, line_queue):
+    """Forward lines of a pipe to the queue; None marks the end of the stream"""
+    try:
+        for line in iter(stream.readline, ''):
+            line_queue.put((name, line.rstrip('\r\n')))
+    finally:
+        stream.close()
+        line_queue.put((name, None))
+
+
+def handle_output_line(result, name, line, prefix, failure_markers, fatal_markers):
+    """
+    Echo one output line, keep it in the ring buffer and check it for failure markers.
+
+    Returns True when a fatal marker is seen for the first time; the caller then
+    stops the process.
+    """
+    if name == 'stdout':
+        result.stdout_tail.append(line)
+        result.stdout_line_count += 1
+        if line.strip() == LOADER_HEADER:
+            result.header_seen = True
+        elif line.strip():
+            result.extra_stdout_lines += 1
+        print(f"{prefix}{line}")
+    else:
+        result.stderr_tail.append(line)
+        result.stderr_line_count += 1
+        print(f"{prefix}stderr: {line}")
+
+    lowered = line.lower()
+    if result.failure_marker is None:
+        for marker in failure_markers:
+            if marker in lowered:
+                result.failure_marker = marker
+                result.failure_line = line
+                break
+    if not result.killed_on_marker and any(marker in lowered for marker in fatal_markers):
+        print(f"{prefix}⛔ Fatal output detected, stopping process: {line}")
+        result.killed_on_marker = True
+        return True
+    return False
+
+
+def run_loader_process(java_command, cwd, timeout, label='', failure_markers=None,
+                       fatal_markers=None, buffer_lines=DEFAULT_BUFFER_LINES, on_start=None):
+    """
+    Run a VaultDataLoader command and stream its output line by line.
+
+    Output is echoed to the console (prefixed with label) and kept in bounded
+    ring buffers; peak RSS and CPU time are sampled from /proc where available.
+    Failure markers are checked per line; when a fatal marker appears the process
+    is killed immediately instead of waiting for it to exit. The process is also
+    killed once timeout seconds have elapsed. on_start is called with the pid of
+    the started process.
+    """
+    failure_markers = DEFAULT_FAILURE_MARKERS if failure_markers is None else failure_markers
+    fatal_markers = failure_markers if fatal_markers is None else fatal_markers
+    result = LoaderProcessResult()
+    result.stdout_tail = deque(maxlen=buffer_lines)
+    result.stderr_tail = deque(maxlen=buffer_lines)
+    prefix = f"[{label}] " if label else ""
+
+    process = subprocess.Popen(
+        java_command,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        text=True,
+        bufsize=1,
+        cwd=cwd
+    )
+    line_queue = queue.Queue()
+    readers = [
+        threading.Thread(target=_pump_stream, args=(process.stdout, 'stdout', line_queue), daemon=True),
+        threading.Thread(target=_pump_stream, args=(process.stderr, 'stderr', line_queue), daemon=True),
+    ]
+    for reader in readers:
+        reader.start()
+    sampler = ResourceSampler(process.pid).start()
+    if on_start:
+        on_start(process.pid)
+
+    deadline = time.monotonic() + timeout
+    open_streams = len(readers)
+    try:
+        while open_streams:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                result.timed_out = True
+                process.kill()
+                break
+            try:
+                name, line = line_queue.get(timeout=min(remaining, 1.0))
+            except queue.Empty:
+                continue
+            if line is None:
+                open_streams -= 1
+                continue
+
+            if handle_output_line(result, name, line, prefix, failure_markers, fatal_markers):
+                process.kill()
+    except KeyboardInterrupt:
+        process.kill()
+        sampler.stop(result)
+        process.wait()
+        raise
+
+    # Read the final CPU time before the process is reaped
+    sampler.stop(result)
+    result.return_code = process.wait()
+    return result
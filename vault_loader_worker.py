@@ -0,0 +1,268 @@
+import os
+import queue
+import shutil
+import subprocess
+import threading
+import time
+from collections import deque
+from csv_utils import replace_file
+from jvm_options import get_java_major_version
+from vault_loader_process import (
+    LoaderProcessResult, ResourceSampler, _pump_stream, handle_output_line, run_loader_process, create_work_dir,
+    DEFAULT_FAILURE_MARKERS, DEFAULT_BUFFER_LINES, LOADER_CONFIG_FILE
+)
+
+EXECUTION_MODES = ('process', 'worker')
+
+WORKER_SOURCE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'VaultLoaderWorker.java')
+READY_MARKER = '@@VAULT_LOADER_WORKER_READY'
+JOB_DONE_MARKER = '@@VAULT_LOADER_JOB_DONE'
+
+# Seconds a new worker JVM may take to compile the worker and load the jar
+WORKER_START_TIMEOUT = 120
+
+# Seconds to wait after a job's exit status for the rest of its stderr output
+WORKER_DRAIN_TIMEOUT = 5
+
+# Java versions on which the worker can trap System.exit of the loader: it needs
+# -Djava.security.manager=allow, and Java 24 removed the Security Manager
+WORKER_JAVA_VERSIONS = (17, 23)
+
+_java_checked = {}
+
+
+def worker_java_supported(java_exe):
+    """Return True if java_exe can run warm workers; warns once per executable if not"""
+    if java_exe not in _java_checked:
+        major = get_java_major_version(java_exe)
+        low, high = WORKER_JAVA_VERSIONS
+        supported = major is not None and low <= major <= high
+        if not supported:
+            found = f"Java {major}" if major is not None else "an unknown Java version"
+            print(f"⚠️ execution_mode 'worker' needs Java {low} to {high}, {java_exe} is {found}: "
+                  f"using one process per job")
+        _java_checked[java_exe] = supported
+    return _java_checked[java_exe]
+
+
+class LoaderWorker:
+    """
+    One long-running JVM with VaultDataLoader.jar loaded (see VaultLoaderWorker.java).
+
+    Jobs run one after another in the same JVM, so JVM start-up, class loading and
+    JIT warm-up are paid once per worker instead of once per job. The worker has its
+    own working directory; files a job leaves there are moved to the job's directory.
+    """
+
+    def __init__(self, java_exe, vault_loader, work_dir, jvm_options=None):
+        self.work_dir = work_dir
+        self.alive = False
+        self.jobs = 0
+        self.process = subprocess.Popen(
+            [java_exe] + list(jvm_options or []) + ['-Djava.security.manager=allow', '-cp', vault_loader, WORKER_SOURCE, vault_loader],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            text=True,
+            encoding='utf-8',
+            bufsize=1,
+            cwd=work_dir
+        )
+        self.line_queue = queue.Queue()
+        for stream, name in ((self.process.stdout, 'stdout'), (self.process.stderr, 'stderr')):
+            threading.Thread(target=_pump_stream, args=(stream, name, self.line_queue), daemon=True).start()
+
+        deadline = time.monotonic() + WORKER_START_TIMEOUT
+        while time.monotonic() < deadline:
+            try:
+                name, line = self.line_queue.get(timeout=1.0)
+            except queue.Empty:
+                continue
+            if line is None:
+                break
+            if name == 'stdout' and line.strip() == READY_MARKER:
+                self.alive = True
+                return
+            print(f"[worker] {line}")
+        self.kill()
+        raise RuntimeError("VaultDataLoader worker JVM did not start")
+
+    def kill(self):
+        self.alive = False
+        if self.process.poll() is None:
+            self.process.kill()
+            self.process.wait()
+
+    def close(self):
+        """Let the worker finish after its current job and stop it"""
+        self.alive = False
+        try:
+            self.process.stdin.close()
+            self.process.wait(timeout=30)
+        except (OSError, subprocess.TimeoutExpired):
+            self.kill()
+
+    def run_job(self, args, cwd, timeout, label='', failure_markers=None, fatal_markers=None,
+                buffer_lines=DEFAULT_BUFFER_LINES, on_start=None):
+        """
+        Run one loader job (the arguments after -jar VaultDataLoader.jar); returns a LoaderProcessResult.
+
+        on_start is called with the pid of the worker JVM.
+        """
+        failure_markers = DEFAULT_FAILURE_MARKERS if failure_markers is None else failure_markers
+        fatal_markers = failure_markers if fatal_markers is None else fatal_markers
+        result = LoaderProcessResult()
+        result.stdout_tail = deque(maxlen=buffer_lines)
+        result.stderr_tail = deque(maxlen=buffer_lines)
+        prefix = f"[{label}] " if label else ""
+
+        # Files already in the worker directory do not belong to this job
+        existing = {f: os.path.getmtime(os.path.join(self.work_dir, f)) for f in os.listdir(self.work_dir)}
+        self.jobs += 1
+        job_id = str(self.jobs)
+        # The JVM is shared: count only the RSS seen and CPU used while this job runs
+        sampler = ResourceSampler(self.process.pid, whole_process=False).start()
+        if on_start:
+            on_start(self.process.pid)
+        self.process.stdin.write('\t'.join([job_id] + list(args)) + '\n')
+        self.process.stdin.flush()
+
+        deadline = time.monotonic() + timeout
+        done_prefix = f"{JOB_DONE_MARKER} {job_id} "
+        # The marker is written to stderr and stdout; stderr lines read after the stdout marker still belong to this job
+        done = {'stdout': False, 'stderr': False}
+        while not all(done.values()):
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                if done['stdout']:
+                    break
+                result.timed_out = True
+                self.kill()
+                break
+            try:
+                name, line = self.line_queue.get(timeout=min(remaining, 1.0))
+            except queue.Empty:
+                continue
+            if line is None:
+                # The JVM ended (System.exit could not be trapped): its exit code is the job's
+                result.return_code = self.process.wait()
+                self.alive = False
+                break
+            # The loader's last output may lack a trailing newline, so the marker can follow it on the same line
+            marker_index = line.find(done_prefix)
+            if marker_index >= 0:
+                if line[:marker_index].strip():
+                    handle_output_line(result, name, line[:marker_index], prefix, failure_markers, fatal_markers)
+                done[name] = True
+                if name == 'stdout':
+                    result.return_code = int(line[marker_index + len(done_prefix):].strip() or 1)
+                    deadline = min(deadline, time.monotonic() + WORKER_DRAIN_TIMEOUT)
+                continue
+            if handle_output_line(result, name, line, prefix, failure_markers, fatal_markers):
+                self.kill()
+                result.return_code = self.process.returncode
+                break
+
+        sampler.stop(result)
+
+        # Hand the files written by this job over to the job's working directory
+        for file_name in os.listdir(self.work_dir):
+            if file_name == LOADER_CONFIG_FILE:
+                continue
+            path = os.path.join(self.work_dir, file_name)
+            if os.path.isfile(path) and existing.get(file_name) != os.path.getmtime(path):
+                replace_file(path, os.path.join(cwd, file_name))
+        return result
+
+
+class LoaderWorkerPool:
+    """
+    Pool of warm VaultDataLoader worker JVMs shared by the jobs of one run.
+
+    run() has the same result as run_loader_process(). Jobs fall back to a separate
+    java -jar process when a worker cannot be started or the arguments cannot be
+    passed on one line; a worker that dies is replaced by a new one on demand.
+    """
+
+    def __init__(self, java_exe, vault_loader, size, work_root, seed_dir=None, jvm_options=None):
+        self.java_exe = java_exe
+        self.jvm_options = jvm_options or []
+        self.vault_loader = vault_loader
+        self.size = max(1, size)
+        self.work_root = work_root
+        self.seed_dir = seed_dir
+        self.idle = queue.Queue()
+        self.lock = threading.Lock()
+        self.started = 0
+        self.workers = []
+        self.disabled = False
+
+    def _acquire(self):
+        """Return an idle worker, start a new one, or wait for one; None if workers are unavailable"""
+        while True:
+            try:
+                return self.idle.get_nowait()
+            except queue.Empty:
+                pass
+            with self.lock:
+                if self.disabled:
+                    return None
+                start_new = self.started < self.size
+                if start_new:
+                    self.started += 1
+            if not start_new:
+                # All workers are busy; a dead worker frees its slot instead of returning
+                try:
+                    return self.idle.get(timeout=1.0)
+                except queue.Empty:
+                    continue
+            work_dir = create_work_dir(self.work_root, 'worker', self.seed_dir)
+            try:
+                worker = LoaderWorker(self.java_exe, self.vault_loader, work_dir, self.jvm_options)
+            except Exception as e:
+                print(f"Warning: Could not start VaultDataLoader worker ({e}), using one process per job")
+                shutil.rmtree(work_dir, ignore_errors=True)
+                with self.lock:
+                    self.started -= 1
+                    self.disabled = True
+                return None
+            with self.lock:
+                self.workers.append(worker)
+            return worker
+
+    def _release(self, worker):
+        if worker.alive:
+            self.idle.put(worker)
+            return
+        shutil.rmtree(worker.work_dir, ignore_errors=True)
+        with self.lock:
+            self.started -= 1
+            self.workers.remove(worker)
+
+    def run(self, java_command, cwd, timeout, label='', failure_markers=None, fatal_markers=None,
+            buffer_lines=DEFAULT_BUFFER_LINES, on_start=None):
+        """Run a 'java [options] -jar VaultDataLoader.jar ...' command in a warm worker; on_start gets the JVM's pid"""
+        args = java_command[java_command.index('-jar') + 2:]
+        if any('\t' in arg or '\n' in arg for arg in args):
+            return run_loader_process(java_command, cwd, timeout, label, failure_markers, fatal_markers, buffer_lines,
+                                      on_start)
+        worker = self._acquire()
+        if worker is None:
+            return run_loader_process(java_command, cwd, timeout, label, failure_markers, fatal_markers, buffer_lines,
+                                      on_start)
+        try:
+            return worker.run_job(args, cwd, timeout, label, failure_markers, fatal_markers, buffer_lines, on_start)
+        except Exception:
+            worker.kill()
+            raise
+        finally:
+            self._release(worker)
+
+    def close(self):
+        """Stop all worker JVMs"""
+        with self.lock:
+            workers = list(self.workers)
+            self.workers = []
+        for worker in workers:
+            worker.close()
+            shutil.rmtree(worker.work_dir, ignore_errors=True)
@@ -0,0 +1,121 @@
+"""
+General Purpose
+- Compare the speed of the shared CSV row counter (`csv_utils.count_csv_rows`) with
+    the approaches it replaced: iterating a `csv.reader` / `csv.DictReader` and
+    `pd.read_csv(...)` plus `len()`.
+- Check that all approaches return the same row count.
+
+Input Prerequisites
+- Python environment with `pandas` installed.
+- Either an existing CSV file (`--csv`) or nothing: a test file with multiline
+    quoted fields and escaped quotes is generated in a temporary folder.
+
+Output
+- One line per approach with its row count, best time of `--repeat` runs and the
+    speedup relative to `count_csv_rows`.
+
+Start Parameter
+- `--csv` (optional): CSV file to count instead of a generated one.
+- `--rows` (optional): rows of the generated file (default 500000).
+- `--repeat` (optional): runs per approach, the fastest is reported (default 3).
+
+Function
+- `generate_csv`: writes the test file.
+- `count_with_reader`, `count_with_dictreader`, `count_with_pandas`: former counting approaches.
+- `run_benchmark`: times all approaches and prints the comparison.
+"""
+
+from __future__ import annotations
+
+import argparse
+import csv
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from csv_utils import count_csv_rows  # noqa: E402
+
+
+def generate_csv(path: Path, rows: int) -> None:
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["id", "name__v", "description__c", "status__v"])
+        for index in range(rows):
+            if index % 10 == 0:
+                description = f'Line one of record {index}\nLine two with "quotes", and a comma'
+            else:
+                description = f"Plain description {index}"
+            writer.writerow([f"V{index:08d}", f"Object {index}", description, "active__v"])
+
+
+def count_with_reader(path: Path) -> int:
+    with open(path, "r", encoding="utf-8", newline="") as f:
+        return max(0, sum(1 for _ in csv.reader(f)) - 1)
+
+
+def count_with_dictreader(path: Path) -> int:
+    with open(path, "r", encoding="utf-8-sig", newline="") as f:
+        return sum(1 for _ in csv.DictReader(f))
+
+
+def count_with_pandas(path: Path) -> int:
+    return len(pd.read_csv(path, dtype=str, keep_default_na=False, encoding="utf-8-sig"))
+
+
+def time_best(function, path: Path, repeat: int) -> tuple[int, float]:
+    best = None
+    result = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = function(path)
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return result, best
+
+
+def run_benchmark(path: Path, repeat: int) -> None:
+    size_mb = os.path.getsize(path) / (1024 * 1024)
+    print(f"File: {path} ({size_mb:.1f} MB)")
+    approaches = [
+        ("count_csv_rows (mmap)", count_csv_rows),
+        ("csv.reader", count_with_reader),
+        ("csv.DictReader", count_with_dictreader),
+        ("pd.read_csv + len", count_with_pandas),
+    ]
+    baseline = None
+    counts = set()
+    for label, function in approaches:
+        rows, seconds = time_best(function, path, repeat)
+        counts.add(rows)
+        baseline = baseline or seconds
+        print(f"{label:<24} {rows:>12} rows {seconds:>9.3f} s  {seconds / baseline:>6.1f}x")
+    if len(counts) > 1:
+        print(f"Row counts differ: {sorted(counts)}")
+    else:
+        print("All approaches return the same row count")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark CSV row counting approaches")
+    parser.add_argument("--csv", help="CSV file to count (default: generated test file)")
+    parser.add_argument("--rows", type=int, default=500000, help="Rows of the generated test file")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per approach")
+    args = parser.parse_args()
+
+    if args.csv:
+        run_benchmark(Path(args.csv), args.repeat)
+        return
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = Path(tmp_dir) / "benchmark_rows.csv"
+        print(f"Generating {args.rows} rows...")
+        generate_csv(path, args.rows)
+        run_benchmark(path, args.repeat)
+
+
+if __name__ == "__main__":
+    main()